@@ -0,0 +1,267 @@
+"""
+Cross-upload analytics (/api/analytics/) served from rollup tables.
+
+When an upload finishes ingesting, its readings are folded into:
+
+    UploadTypeRollup      count, sum, min, max per numeric column, per type
+    UploadTopEquipment    the ANALYTICS_TOP_K hottest readings (by temperature)
+
+and the user's DailyTypeRollup rows for that upload's day are rebuilt from the
+upload rollups of that day only. Deleting an upload rebuilds its day the same
+way. Queries over any date range therefore read a few rows per day and type
+and never touch EquipmentData; top-N across uploads merges the per-upload
+top-K lists (exact for N <= ANALYTICS_TOP_K).
+
+Uploads ingested before the rollups existed are left out until rolled up
+with ``python manage.py backfill_rollups`` (one scan each, off the request
+path).
+"""
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .columnar import equipment_chunks
+from .filters import NUMERIC_FIELDS
+from .models import DailyTypeRollup, EquipmentType, UploadHistory, UploadTopEquipment, UploadTypeRollup
+
+AGGREGATES = ('sum', 'min', 'max')
+GROUPS = ('day', 'upload')
+TYPE_NAME = F('equipment_type__name')
+
+
+class RollupAccumulator:
+    """Per-type count/sum/min/max and a running top-K by temperature, chunk by chunk."""
+
+    def __init__(self, top_k=None):
+        self.top_k = top_k or settings.ANALYTICS_TOP_K
+        self.types = {}  # type -> {'count': int, 'sum'/'min'/'max': array per numeric column}
+        self.top = (np.empty(0), np.empty(0, dtype=object), np.empty(0, dtype=object))
+
+    def update(self, df):
+        """Fold a cleaned ingest frame (EquipmentData field names) into the totals."""
+        self.update_arrays(df['equipment_name'].to_numpy(dtype=object), df['equipment_type'].to_numpy(dtype=object),
+                           df[list(NUMERIC_FIELDS)].to_numpy(dtype='float64'))
+
+    def update_arrays(self, names, types, values):
+        if not len(values):
+            return
+        labels, inverse, counts = np.unique(types.astype(str), return_inverse=True, return_counts=True)
+        # Group the chunk's rows by type so each type is one contiguous run for reduceat
+        order = np.argsort(inverse, kind='stable')
+        grouped = values[order]
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        reduced = {
+            'sum': np.add.reduceat(grouped, starts, axis=0),
+            'min': np.minimum.reduceat(grouped, starts, axis=0),
+            'max': np.maximum.reduceat(grouped, starts, axis=0),
+        }
+        for j, label in enumerate(labels.tolist()):
+            entry = self.types.get(label)
+            if entry is None:
+                self.types[label] = {'count': int(counts[j]), **{a: reduced[a][j] for a in AGGREGATES}}
+                continue
+            entry['count'] += int(counts[j])
+            entry['sum'] = entry['sum'] + reduced['sum'][j]
+            entry['min'] = np.minimum(entry['min'], reduced['min'][j])
+            entry['max'] = np.maximum(entry['max'], reduced['max'][j])
+
+        temperatures = values[:, NUMERIC_FIELDS.index('temperature')]
+        if len(temperatures) > self.top_k:
+            candidates = np.argpartition(temperatures, -self.top_k)[-self.top_k:]
+        else:
+            candidates = np.arange(len(temperatures))
+        top_t, top_names, top_types = self.top
+        merged_t = np.concatenate([top_t, temperatures[candidates]])
+        keep = np.argsort(-merged_t, kind='stable')[:self.top_k]
+        self.top = (merged_t[keep],
+                    np.concatenate([top_names, names[candidates]])[keep],
+                    np.concatenate([top_types, types[candidates]])[keep])
+
+
+def save_rollups(upload, accumulator):
+    """Store an upload's rollups and rebuild its day; call inside the ingest's final transaction."""
+    if not upload.user_id:
+        return
+    day = timezone.localdate(upload.uploaded_at)
+    labels = list(accumulator.types)
+    type_ids = dict(zip(labels, EquipmentType.objects.ids_for(labels).tolist())) if labels else {}
+
+    UploadTypeRollup.objects.filter(upload=upload).delete()
+    UploadTypeRollup.objects.bulk_create([
+        UploadTypeRollup(upload=upload, user_id=upload.user_id, day=day, equipment_type_id=type_ids[label],
+                         count=entry['count'], **_columns(entry))
+        for label, entry in accumulator.types.items()
+    ])
+    UploadTopEquipment.objects.filter(upload=upload).delete()
+    temperatures, names, types = accumulator.top
+    if len(temperatures):
+        ids = EquipmentType.objects.ids_for(types)
+        UploadTopEquipment.objects.bulk_create([
+            UploadTopEquipment(upload=upload, user_id=upload.user_id, day=day, equipment_name=name,
+                               equipment_type_id=type_id, temperature=temperature)
+            for temperature, name, type_id in zip(temperatures.tolist(), names.tolist(), ids.tolist())
+        ])
+    rebuild_day(upload.user_id, day)
+
+
+def copy_rollups(source, upload):
+    """Give a duplicate upload the rollups of the upload whose data it shares."""
+    if not upload.user_id:
+        return
+    day = timezone.localdate(upload.uploaded_at)
+    for model in (UploadTypeRollup, UploadTopEquipment):
+        rows = list(model.objects.filter(upload=source))
+        for row in rows:
+            row.pk = None
+            row.upload, row.user_id, row.day = upload, upload.user_id, day
+        model.objects.bulk_create(rows)
+    rebuild_day(upload.user_id, day)
+
+
+def _columns(entry):
+    return {f'{field}_{aggregate}': float(entry[aggregate][i])
+            for aggregate in AGGREGATES for i, field in enumerate(NUMERIC_FIELDS)}
+
+
+def rebuild_day(user_id, day):
+    """
+    Recompute one user-day of DailyTypeRollup from that day's upload rollups.
+
+    The user's row is locked first, so concurrent rebuilds for the same user
+    run one after the other and each aggregates the rollups the previous one
+    committed; otherwise two ingests could each write totals missing the
+    other's upload.
+    """
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(pk=user_id).values_list('pk'))
+        totals = list(UploadTypeRollup.objects.filter(user_id=user_id, day=day)
+                      .values('equipment_type').order_by()
+                      .annotate(uploads=Count('id'), count=Sum('count'), **_aggregates()))
+        DailyTypeRollup.objects.filter(user_id=user_id, day=day).delete()
+        DailyTypeRollup.objects.bulk_create([
+            DailyTypeRollup(user_id=user_id, day=day, equipment_type_id=row.pop('equipment_type'), **row)
+            for row in totals
+        ])
+
+
+def _aggregates():
+    functions = {'sum': Sum, 'min': Min, 'max': Max}
+    return {f'{field}_{aggregate}': functions[aggregate](f'{field}_{aggregate}')
+            for aggregate in AGGREGATES for field in NUMERIC_FIELDS}
+
+
+def uploads_without_rollups():
+    """Ingested uploads that predate the rollups; see the backfill_rollups command."""
+    return (UploadHistory.objects.filter(user__isnull=False, total_records__gt=0, type_rollups__isnull=True)
+            .only('id', 'user', 'uploaded_at', 'storage', 'source').order_by('id'))
+
+
+def compute_rollups(upload):
+    """Roll up an upload ingested before rollups were kept (one scan)."""
+    accumulator = RollupAccumulator()
+    fields = ('equipment_name', 'equipment_type') + NUMERIC_FIELDS
+    for chunk in equipment_chunks(upload, QueryDict(), fields):
+        names, types, *columns = zip(*chunk)
+        accumulator.update_arrays(np.array(names, dtype=object), np.array(types, dtype=object),
+                                  np.column_stack(columns).astype('float64'))
+    with transaction.atomic():
+        save_rollups(upload, accumulator)
+
+
+def _date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: "Must be a date (YYYY-MM-DD)."})
+
+
+def _top(params):
+    value = params.get('top')
+    if not value:
+        return min(settings.ANALYTICS_TOP_DEFAULT, settings.ANALYTICS_TOP_K)
+    try:
+        top = int(value)
+    except ValueError:
+        raise ValidationError({'top': "Must be an integer."})
+    if not 0 <= top <= settings.ANALYTICS_TOP_K:
+        raise ValidationError({'top': f"Must be between 0 and {settings.ANALYTICS_TOP_K}."})
+    return top
+
+
+def _summarise(row):
+    """Turn a rollup row's sums into averages."""
+    count = row.pop('count')
+    result = {'count': count}
+    for field in NUMERIC_FIELDS:
+        total = row.pop(f'{field}_sum')
+        result[f'avg_{field}'] = total / count if count else None
+        result[f'min_{field}'] = row.pop(f'{field}_min')
+        result[f'max_{field}'] = row.pop(f'{field}_max')
+    return {**row, **result}
+
+
+def analytics(user, params):
+    """
+    Build the /api/analytics/ payload for ``user``.
+
+    ``start``/``end`` bound the upload day (inclusive), ``equipment_type``
+    filters types (repeat or comma separate), ``group=day|upload`` picks the
+    trend granularity and ``top`` the number of hottest readings.
+    """
+    start, end = _date(params, 'start'), _date(params, 'end')
+    group = params.get('group') or 'day'
+    if group not in GROUPS:
+        raise ValidationError({'group': f"Must be one of {', '.join(GROUPS)}."})
+    top = _top(params)
+    types = [t.strip() for value in params.getlist('equipment_type') for t in value.split(',') if t.strip()]
+
+    def in_range(queryset):
+        queryset = queryset.filter(user=user)
+        if start:
+            queryset = queryset.filter(day__gte=start)
+        if end:
+            queryset = queryset.filter(day__lte=end)
+        if types:
+            queryset = queryset.filter(equipment_type__name__in=types)
+        return queryset
+
+    columns = [f'{field}_{aggregate}' for aggregate in AGGREGATES for field in NUMERIC_FIELDS]
+    if group == 'day':
+        trend = in_range(DailyTypeRollup.objects).values(
+            'day', 'uploads', 'count', *columns, type=TYPE_NAME).order_by('day', 'equipment_type__name')
+    else:
+        trend = in_range(UploadTypeRollup.objects).values(
+            'day', 'upload_id', 'count', *columns, type=TYPE_NAME).order_by('day', 'upload_id', 'equipment_type__name')
+    by_type = in_range(DailyTypeRollup.objects).values(type=TYPE_NAME).order_by('equipment_type__name').annotate(
+        uploads=Sum('uploads'), count=Sum('count'), **_aggregates())
+    hottest = in_range(UploadTopEquipment.objects).order_by('-temperature', 'id').values(
+        'upload_id', 'day', 'equipment_name', 'temperature', type=TYPE_NAME)[:top]
+    uploads = in_range(UploadTypeRollup.objects).values('upload_id').distinct().count()
+
+    return {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'group': group,
+        'uploads': uploads,
+        'total_count': sum(row['count'] for row in by_type),
+        'by_type': [_rename(_summarise(row)) for row in by_type],
+        'trend': [_rename(_summarise(row)) for row in trend],
+        'hottest': [_rename(row) for row in hottest],
+    }
+
+
+def _rename(row):
+    row['equipment_type'] = row.pop('type')
+    if 'day' in row:
+        row['day'] = row['day'].isoformat()
+    return row
@@ -0,0 +1,128 @@
+"""
+Batch uploads (/api/upload/batch/).
+
+One multipart request carries any number of ``files``: CSVs, or zip/tar
+archives of CSVs which are expanded here (non-CSV members, directories and
+hidden files are skipped). Every CSV becomes its own UploadHistory and
+IngestJob, exactly as if it had been uploaded alone, so identical files are
+deduplicated (core/uploads.py) and each gets its own per-file result. The
+CSVs are then parsed in parallel on the parser process pool (core/jobs.py).
+"""
+import hashlib
+import io
+import posixpath
+import tarfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from rest_framework.exceptions import ValidationError
+
+from .parsers import DECODE_ERRORS
+from .parsing import open_csv
+
+READ_CHUNK_SIZE = 1024 * 1024
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def is_archive(name):
+    name = name.lower()
+    return name.endswith('.zip') or name.endswith(TAR_SUFFIXES)
+
+
+def _wanted(path):
+    parts = path.split('/')
+    return path.lower().endswith('.csv') and not any(p.startswith('.') or p == '__MACOSX' for p in parts)
+
+
+def _zip_members(archive):
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and _wanted(info.filename):
+                    yield info.filename, lambda info=info: zf.open(info)
+    except zipfile.BadZipFile as e:
+        raise ValidationError({'files': f"{archive.name}: not a valid zip archive ({e})."})
+
+
+def _tar_members(archive):
+    try:
+        with tarfile.open(fileobj=archive, mode='r:*') as tf:
+            for member in tf:
+                if member.isfile() and _wanted(member.name):
+                    yield member.name, lambda member=member: tf.extractfile(member)
+    except tarfile.TarError as e:
+        raise ValidationError({'files': f"{archive.name}: not a valid tar archive ({e})."})
+
+
+def batch_files(files, content_hashes):
+    """
+    Yield ``(name, content, content_hash)`` for every CSV in the request's ``files``.
+
+    ``content_hashes`` are the streamed hashes of ``files`` (HashingUploadHandler);
+    archive members are hashed as they are extracted, one at a time. Raises
+    ValidationError once the batch exceeds BATCH_MAX_FILES or BATCH_MAX_BYTES,
+    so callers should be ready to undo what they stored for the earlier files.
+    Sizes are counted decompressed, as the bytes are read: the sizes archives
+    list and the size of a gzip/zstd CSV say nothing about what it expands to.
+    """
+    count = total = 0
+    for uploaded, content_hash in zip(files, content_hashes):
+        if not is_archive(uploaded.name):
+            _check_count(count)
+            count, total = count + 1, total + _csv_size(uploaded, settings.BATCH_MAX_BYTES - total)
+            yield uploaded.name, uploaded, content_hash
+            continue
+        members = _zip_members(uploaded) if uploaded.name.lower().endswith('.zip') else _tar_members(uploaded)
+        for name, open_member in members:
+            _check_count(count)
+            with open_member() as member:
+                data = _read_limited(member, settings.BATCH_MAX_BYTES - total)
+            count, total = count + 1, total + _csv_size(io.BytesIO(data), settings.BATCH_MAX_BYTES - total)
+            yield posixpath.basename(name), ContentFile(data), hashlib.sha256(data).hexdigest()
+    if not count:
+        raise ValidationError({'files': "No CSV files found in the upload."})
+
+
+def _check_count(count):
+    if count >= settings.BATCH_MAX_FILES:
+        raise ValidationError({'files': f"A batch may hold at most {settings.BATCH_MAX_FILES} CSV files."})
+
+
+def _too_large():
+    return ValidationError({'files': f"A batch may hold at most {settings.BATCH_MAX_BYTES} bytes of CSV data."})
+
+
+def _read_limited(stream, limit):
+    """Read ``stream`` to the end, giving up as soon as it is longer than ``limit`` bytes."""
+    chunks, size = [], 0
+    while chunk := stream.read(READ_CHUNK_SIZE):
+        size += len(chunk)
+        if size > limit:
+            raise _too_large()
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def _csv_size(fileobj, limit):
+    """
+    The size of the CSV in ``fileobj`` once decompressed (parsing.open_csv),
+    counted chunk by chunk without keeping the data; raises past ``limit``.
+    """
+    try:
+        stream = open_csv(fileobj)
+        if stream is fileobj:
+            size = fileobj.seek(0, io.SEEK_END)
+        else:
+            size = 0
+            while chunk := stream.read(READ_CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    break
+    except (ValueError, OSError, EOFError, zipfile.BadZipFile, *DECODE_ERRORS):
+        # Not readable as a CSV: its ingest fails with the reason, just count the bytes
+        size = fileobj.seek(0, io.SEEK_END)
+    fileobj.seek(0)
+    if size > limit:
+        raise _too_large()
+    return size
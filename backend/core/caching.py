@@ -0,0 +1,168 @@
+"""
+Response caching for the read endpoints (summary, history, data, chart).
+
+An upload never changes once ingested, so its responses are cached per user
+and per upload in the default Django cache (LocMemCache, LRU + TTL; see
+CACHES in settings). Instead of hunting down individual keys, every cache key
+embeds a version stamp kept in the database, so every worker process sees a
+bump at once whatever the cache backend:
+
+    upload version   UploadHistory.cache_version; bumped when the upload's
+                     statistics are (re)written or the upload is saved
+                     (core/signals.py)
+    user version     UserCacheVersion; bumped whenever one of the user's
+                     uploads is created, updated or deleted; used by the
+                     history listing and analytics
+
+Bumping a version orphans all old entries at once; the LRU evicts them. The
+same stamps give each response an ETag and Last-Modified, so clients holding
+a current copy get a 304 without the view running. The upload version is read
+together with the ownership check, so another user's upload id is passed to
+the view (and its 404) without a cache lookup or a 304.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Floor, Greatest
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from .models import UploadHistory, UserCacheVersion
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def _count(scope, outcome):
+    with _counters_lock:
+        scope_counters = _counters.setdefault(scope, {'hits': 0, 'misses': 0, 'not_modified': 0})
+        scope_counters[outcome] += 1
+
+
+def cache_stats():
+    """Hit/miss counters for this process, per scope and in total."""
+    with _counters_lock:
+        scopes = {scope: dict(values) for scope, values in _counters.items()}
+    totals = {'hits': 0, 'misses': 0, 'not_modified': 0}
+    for values in scopes.values():
+        for outcome, count in values.items():
+            totals[outcome] += count
+    lookups = totals['hits'] + totals['misses']
+    totals['hit_ratio'] = round(totals['hits'] / lookups, 4) if lookups else None
+    return {
+        'backend': settings.CACHES['default']['BACKEND'],
+        'ttl': settings.CACHE_TTL,
+        'scopes': scopes,
+        'totals': totals,
+    }
+
+
+def upload_version(user, upload_id):
+    """The upload's version stamp, or None unless it exists and belongs to ``user``."""
+    return UploadHistory.objects.filter(pk=upload_id, user=user).values_list('cache_version', flat=True).first()
+
+
+def user_version(user_id):
+    """The version stamp of the user's listings, creating one if missing."""
+    stamp = UserCacheVersion.objects.filter(user_id=user_id).values_list('stamp', flat=True).first()
+    if stamp is None:
+        UserCacheVersion.objects.bulk_create([UserCacheVersion(user_id=user_id)], ignore_conflicts=True)
+        stamp = UserCacheVersion.objects.filter(user_id=user_id).values_list('stamp', flat=True).first()
+    return stamp
+
+
+def _next_stamp(field):
+    # Always move on to a later whole second so Last-Modified (1 s resolution)
+    # changes too, even for two bumps within the same second
+    return Greatest(Floor(F(field)) + 1, Value(time.time()))
+
+
+def invalidate_upload(upload):
+    UploadHistory.objects.filter(pk=upload.pk).update(cache_version=_next_stamp('cache_version'))
+    if upload.user_id:
+        if not UserCacheVersion.objects.filter(user_id=upload.user_id).update(stamp=_next_stamp('stamp')):
+            UserCacheVersion.objects.bulk_create([UserCacheVersion(user_id=upload.user_id)], ignore_conflicts=True)
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return None
+    return header.strip() == '*' or etag in [t.strip() for t in header.split(',')]
+
+
+def _not_modified_since(request, stamp):
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(stamp) <= since
+
+
+def cached_response(scope, per_upload=True):
+    """
+    Cache a view's successful ``get`` responses.
+
+    The key covers the user, the upload (``upload_id`` URL kwarg) when
+    ``per_upload``, the full query string and the negotiated format. Only 200
+    responses that are not streamed are stored; errors and binary streams pass
+    straight through.
+    """
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            user_id = request.user.pk
+            if per_upload:
+                stamp = upload_version(request.user, kwargs['upload_id'])
+                if stamp is None:
+                    # Not the user's upload: the view answers with its usual error, uncached
+                    return get(view, request, *args, **kwargs)
+                owner = f"{user_id}:{kwargs['upload_id']}"
+            else:
+                stamp = user_version(user_id)
+                owner = str(user_id)
+            renderer = getattr(request, 'accepted_renderer', None)
+            fingerprint = hashlib.sha1(
+                f"{owner}:{stamp!r}:{getattr(renderer, 'format', '')}:{request.get_full_path()}".encode()
+            ).hexdigest()
+            key = f'core:response:{scope}:{owner}:{fingerprint}'
+            etag = f'"{fingerprint[:20]}"'
+
+            matches = _etag_matches(request, etag)
+            if matches or (matches is None and _not_modified_since(request, stamp)):
+                _count(scope, 'not_modified')
+                return _with_validators(HttpResponseNotModified(), etag, stamp)
+
+            entry = cache.get(key)
+            if entry is not None:
+                _count(scope, 'hits')
+                kind, body, content_type = entry
+                response = Response(body) if kind == 'data' else HttpResponse(body, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return _with_validators(response, etag, stamp)
+
+            _count(scope, 'misses')
+            response = get(view, request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            if isinstance(response, Response):
+                entry = ('data', response.data, None)
+            else:
+                entry = ('raw', response.content, response['Content-Type'])
+            cache.set(key, entry, settings.CACHE_TTL)
+            response['X-Cache'] = 'MISS'
+            return _with_validators(response, etag, stamp)
+        return wrapper
+    return decorator
+
+
+def _with_validators(response, etag, stamp):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stamp)
+    # Private per-user data: browsers may keep it but must revalidate each time
+    response['Cache-Control'] = 'private, no-cache'
+    response['Vary'] = 'Accept, Authorization, Cookie'
+    return response
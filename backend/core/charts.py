@@ -0,0 +1,97 @@
+"""
+Server-side chart data: downsampled parameter series, histograms and type
+distributions whose size depends on the requested bucket/bin counts, never on
+the number of rows in the upload.
+
+Series use min/max/mean bucketing over row order, which keeps spikes visible
+(unlike plain striding). Everything is reduced chunk by chunk from one DB
+cursor, or from the upload's memory-mapped column files; bucket boundaries and
+histogram edges come from the precomputed upload statistics, so the rows never
+have to be held in memory together.
+"""
+import numpy as np
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from .columnar import numeric_chunks
+from .filters import NUMERIC_FIELDS
+from .stats import get_statistics
+
+
+def _bounded_int(params, name, default, maximum):
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+    if not 1 <= value <= maximum:
+        raise ValidationError({name: f"Must be between 1 and {maximum}."})
+    return value
+
+
+def _edges(column_stats, bins):
+    low, high = column_stats['min'], column_stats['max']
+    if low is None:
+        low = high = 0.0
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def chart_data(upload, params):
+    """Build the /api/chart/ payload for ``upload``."""
+    buckets = _bounded_int(params, 'buckets', settings.CHART_BUCKETS, settings.CHART_MAX_BUCKETS)
+    bins = _bounded_int(params, 'bins', settings.CHART_BINS, settings.CHART_MAX_BINS)
+
+    stats = get_statistics(upload)
+    total = stats.total_count
+    buckets = min(buckets, total)
+    width = len(NUMERIC_FIELDS)
+
+    mins = np.full((buckets, width), np.inf)
+    maxs = np.full((buckets, width), -np.inf)
+    sums = np.zeros((buckets, width))
+    counts = np.zeros(buckets)
+    edges = [_edges(stats.columns[field], bins) for field in NUMERIC_FIELDS]
+    histograms = np.zeros((width, bins), dtype=np.int64)
+
+    offset = 0
+    for values in numeric_chunks(upload):
+        # Row i of the upload falls into bucket i * buckets // total; rows arrive in
+        # order, so each bucket is a contiguous run and reduceat can fold it.
+        bucket = np.arange(offset, offset + len(values)) * buckets // total
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ids = bucket[starts]
+        mins[ids] = np.minimum(mins[ids], np.minimum.reduceat(values, starts, axis=0))
+        maxs[ids] = np.maximum(maxs[ids], np.maximum.reduceat(values, starts, axis=0))
+        sums[ids] += np.add.reduceat(values, starts, axis=0)
+        counts[ids] += np.diff(np.r_[starts, len(values)])
+        for i in range(width):
+            histograms[i] += np.histogram(values[:, i], bins=edges[i])[0]
+        offset += len(values)
+
+    means = sums / np.maximum(counts, 1)[:, None]
+    return {
+        "upload_id": upload.pk,
+        "total_count": total,
+        "buckets": buckets,
+        # First row index of each bucket, for the x axis: the smallest i with
+        # i * buckets // total == b, i.e. ceil(b * total / buckets)
+        "index": ((np.arange(buckets) * total + buckets - 1) // buckets).tolist() if buckets else [],
+        "series": {
+            field: {
+                "min": mins[:, i].tolist(),
+                "max": maxs[:, i].tolist(),
+                "mean": means[:, i].tolist(),
+            }
+            for i, field in enumerate(NUMERIC_FIELDS)
+        },
+        "histograms": {
+            field: {"edges": edges[i].tolist(), "counts": histograms[i].tolist()}
+            for i, field in enumerate(NUMERIC_FIELDS)
+        },
+        "type_distribution": stats.type_distribution(),
+        "type_means": stats.type_means,
+    }
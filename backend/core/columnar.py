@@ -0,0 +1,329 @@
+"""
+Columnar storage for equipment readings.
+
+Besides (or instead of) EquipmentData rows, an upload can be kept as packed
+little-endian column files under MEDIA_ROOT/columns/<upload_id>/:
+
+    flowrate.f8, pressure.f8, temperature.f8    float64 per row
+    equipment_type.i4                           int32 code into meta.json "types"
+    equipment_name.off, equipment_name.bin      int64 offsets (rows + 1) into a UTF-8 blob
+    meta.json                                   format version, row count, type dictionary
+
+That is 36 bytes per row plus the names, against two 255-char columns and
+their indexes per row in the table. Readers open the files with numpy.memmap,
+so a chart or export touches only the columns it needs and the OS pages them
+in on demand. Filters and ordering run vectorised over the arrays, and the
+last few filtered, sorted selections are kept per process
+(COLUMN_SELECTION_CACHE_SIZE), so paging through a sorted upload sorts it once
+rather than once per page.
+
+Which copy is written is chosen by EQUIPMENT_STORAGE and recorded per upload
+in UploadHistory.storage:
+
+    'orm'       EquipmentData rows only (the original layout)
+    'columnar'  column files only; the data endpoints read them
+    'both'      both; readers that need row ids use the table, the rest the files
+
+In the column store a row's id is its 1-based position in the upload.
+"""
+import json
+import mmap
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .filters import (
+    NUMERIC_FIELDS, cursor_position, encode_cursor, filter_equipment, iter_chunks, order_equipment,
+    paginate_values as paginate_table_values, parse_filters, parse_limit, parse_ordering, parse_search,
+)
+from .models import EquipmentData, UploadHistory
+
+FORMAT_VERSION = 1
+NUMERIC_FILES = {field: f'{field}.f8' for field in NUMERIC_FIELDS}
+TYPE_FILE = 'equipment_type.i4'
+NAME_OFFSETS_FILE = 'equipment_name.off'
+NAME_BLOB_FILE = 'equipment_name.bin'
+
+# (store path, meta.json identity, filters, search, ordering field) -> ascending (positions, keys)
+_selections = OrderedDict()
+_selections_lock = threading.Lock()
+
+
+def store_path(upload):
+    return Path(settings.MEDIA_ROOT) / 'columns' / str(upload.pk)
+
+
+class ColumnWriter:
+    """
+    Appends cleaned ingest frames to a new column store.
+
+    Files are written to a temporary directory that replaces the store in one
+    rename on ``close()``, so readers never see a half-written upload.
+    """
+
+    def __init__(self, upload):
+        self.path = store_path(upload)
+        self.tmp = self.path.with_name(f'{upload.pk}.{os.getpid()}.{threading.get_ident()}.tmp')
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        self.tmp.mkdir(parents=True)
+        names = list(NUMERIC_FILES.values()) + [TYPE_FILE, NAME_OFFSETS_FILE, NAME_BLOB_FILE]
+        self.files = {name: open(self.tmp / name, 'wb') for name in names}
+        self.types = {}  # label -> code, in order of first appearance
+        self.rows = 0
+        self.name_bytes = 0
+        self.files[NAME_OFFSETS_FILE].write(np.zeros(1, dtype='<i8').tobytes())
+
+    def append(self, df):
+        for field, name in NUMERIC_FILES.items():
+            self.files[name].write(df[field].to_numpy(dtype='<f8').tobytes())
+
+        labels, inverse = np.unique(df['equipment_type'].to_numpy(dtype=str), return_inverse=True)
+        codes = np.array([self.types.setdefault(str(label), len(self.types)) for label in labels], dtype='<i4')
+        self.files[TYPE_FILE].write(codes[inverse].tobytes())
+
+        encoded = [name.encode() for name in df['equipment_name']]
+        offsets = self.name_bytes + np.cumsum(np.fromiter(map(len, encoded), dtype='<i8', count=len(encoded)))
+        self.files[NAME_OFFSETS_FILE].write(offsets.astype('<i8').tobytes())
+        self.files[NAME_BLOB_FILE].write(b''.join(encoded))
+        if len(offsets):
+            self.name_bytes = int(offsets[-1])
+        self.rows += len(df)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        meta = {'version': FORMAT_VERSION, 'rows': self.rows, 'types': list(self.types)}
+        (self.tmp / 'meta.json').write_text(json.dumps(meta))
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class ColumnStore:
+    """Read-only, memory-mapped view of one upload's column files."""
+
+    def __init__(self, path):
+        self.path = path
+        stat = (path / 'meta.json').stat()
+        # A rewritten store replaces meta.json, so this tells its versions apart
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        meta = json.loads((path / 'meta.json').read_text())
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported column store version {meta['version']} in {path}")
+        self.rows = meta['rows']
+        self.types = np.array(meta['types'], dtype=str)
+
+    @classmethod
+    def open(cls, upload):
+        """The upload's store, or None if it has none (yet)."""
+        path = store_path(upload)
+        if not (path / 'meta.json').exists():
+            return None
+        return cls(path)
+
+    def _map(self, name, dtype, length=None):
+        length = self.rows if length is None else length
+        if not length:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path / name, dtype=dtype, mode='r', shape=(length,))
+
+    def numeric(self, field):
+        return self._map(NUMERIC_FILES[field], '<f8')
+
+    def type_codes(self):
+        return self._map(TYPE_FILE, '<i4')
+
+    def names(self, positions):
+        offsets = self._map(NAME_OFFSETS_FILE, '<i8', self.rows + 1)
+        starts, ends = offsets[positions].tolist(), offsets[positions + 1].tolist()
+        if not self.rows or not offsets[-1]:
+            return [''] * len(starts)
+        # Plain mmap: slicing it gives bytes directly, far cheaper per row than a memmap view
+        with open(self.path / NAME_BLOB_FILE, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+            return [blob[s:e].decode() for s, e in zip(starts, ends)]
+
+    def column(self, field, positions):
+        """Values of ``field`` at ``positions`` as a NumPy array."""
+        if field == 'id':
+            return positions + 1
+        if field == 'equipment_type':
+            return self.types[self.type_codes()[positions]]
+        if field == 'equipment_name':
+            return np.array(self.names(positions), dtype=str)
+        return self.numeric(field)[positions]
+
+    def numeric_block(self, start, stop):
+        """Rows ``start:stop`` of the numeric columns as one (n, 3) float64 array."""
+        return np.column_stack([self.numeric(field)[start:stop] for field in NUMERIC_FIELDS])
+
+    def rows_at(self, positions, fields):
+        """``values_list``-style tuples for ``positions``."""
+        return list(zip(*(self.column(field, positions).tolist() for field in fields)))
+
+    def select(self, params):
+        """
+        Positions of the rows matching the filters in ``params``, in the
+        requested order, plus the ordering keys (None when ordering by id).
+
+        The arrays are shared through the selection cache; don't modify them.
+        """
+        types, ranges = parse_filters(params)
+        search = parse_search(params)
+        field, descending = parse_ordering(params)
+        key = (str(self.path), self.identity, tuple(sorted(set(types))), tuple(ranges.items()),
+               search.lower(), field)
+        with _selections_lock:
+            selection = _selections.get(key)
+            if selection is not None:
+                _selections.move_to_end(key)
+        if selection is None:
+            selection = self._select(types, ranges, search, field)
+            size = settings.COLUMN_SELECTION_CACHE_SIZE
+            with _selections_lock:
+                _selections[key] = selection
+                while len(_selections) > size:
+                    _selections.popitem(last=False)
+        positions, keys = selection
+        if descending:
+            # Reversed views, no copy
+            positions = positions[::-1]
+            keys = keys[::-1] if keys is not None else None
+        return positions, keys
+
+    def _select(self, types, ranges, search, field):
+        """Ascending ``select``, computed from the column files."""
+        mask = np.ones(self.rows, dtype=bool)
+        if types:
+            wanted = np.flatnonzero(np.isin(self.types, types))
+            mask &= np.isin(self.type_codes(), wanted)
+        for name, (low, high) in ranges.items():
+            if low is not None:
+                mask &= self.numeric(name) >= low
+            if high is not None:
+                mask &= self.numeric(name) <= high
+        positions = np.flatnonzero(mask)
+        if search:
+            positions = positions[self._matches(positions, search.lower())]
+
+        keys = None
+        if field != 'id':
+            keys = self.column(field, positions)
+            order = np.lexsort((positions, keys))  # (field, id), like order_equipment
+            positions, keys = positions[order], keys[order]
+            keys.flags.writeable = False
+        positions.flags.writeable = False
+        return positions, keys
+
+    def _matches(self, positions, text):
+        """Mask over ``positions`` of the rows whose type or name contains lower-cased ``text``."""
+        if not len(positions):
+            return np.zeros(0, dtype=bool)
+        hit = (np.char.find(np.char.lower(self.types), text) >= 0)[self.type_codes()[positions]]
+        # Names are only read for rows their type did not already match
+        rest = np.flatnonzero(~hit)
+        if len(rest):
+            names = np.char.lower(np.array(self.names(positions[rest]), dtype=str))
+            hit[rest] = np.char.find(names, text) >= 0
+        return hit
+
+    def seek(self, positions, keys, params, cursor):
+        """Index into ``positions`` of the first row after ``cursor``."""
+        if not cursor:
+            return 0
+        field, descending = parse_ordering(params)
+        value, last_id = cursor_position(cursor, field)
+        if descending:
+            # Search the ascending arrays these are reversed views of
+            positions = positions[::-1]
+            keys = keys[::-1] if keys is not None else None
+        # Rows are sorted by (key, id), ids ascending within equal keys: binary search both
+        low, high = 0, len(positions)
+        if keys is not None:
+            low, high = np.searchsorted(keys, value, 'left'), np.searchsorted(keys, value, 'right')
+        tied, last = positions[low:high], last_id - 1  # ids are positions + 1
+        if descending:
+            # The rows before the cursor in ascending order, counted from the end
+            return len(positions) - int(low + np.searchsorted(tied, last, 'left'))
+        return int(low + np.searchsorted(tied, last, 'right'))
+
+    def paginate_values(self, params, fields):
+        """Same contract as ``filters.paginate_values``, served from the arrays."""
+        positions, keys = self.select(params)
+        start = self.seek(positions, keys, params, params.get('cursor'))
+        limit = parse_limit(params)
+        page = positions[start:start + limit + 1]
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            field = parse_ordering(params)[0]
+            last = start + limit - 1
+            value = keys[last].item() if keys is not None else None
+            next_cursor = encode_cursor(field, value, int(page[-1]) + 1)
+        return self.rows_at(page, fields), next_cursor
+
+    def iter_chunks(self, params, fields, chunk_size=None, limit=None):
+        chunk_size = chunk_size or settings.DATA_STREAM_CHUNK_SIZE
+        positions = self.select(params)[0][:limit]
+        for start in range(0, len(positions), chunk_size):
+            yield self.rows_at(positions[start:start + chunk_size], fields)
+
+    def iter_numeric(self, chunk_size=None):
+        """(n, 3) float64 blocks of flowrate/pressure/temperature in row order."""
+        chunk_size = chunk_size or settings.DATA_STREAM_CHUNK_SIZE
+        for start in range(0, self.rows, chunk_size):
+            yield self.numeric_block(start, start + chunk_size)
+
+
+def column_store(upload, fields=()):
+    """
+    The store reads of ``fields`` should use, or None to read EquipmentData.
+
+    With 'both', row ids only match the table, so requests for ``id`` stay there.
+    Duplicate uploads read the data of the upload they share it with.
+    """
+    upload = upload.data_upload
+    if upload.storage == UploadHistory.STORAGE_ORM:
+        return None
+    if upload.storage == UploadHistory.STORAGE_BOTH and 'id' in fields:
+        return None
+    return ColumnStore.open(upload)
+
+
+# Storage-neutral readers used by the views, charts, reports and statistics
+
+def equipment_page(upload, params, fields):
+    """One keyset page of ``values_list`` tuples and the next cursor."""
+    store = column_store(upload, fields)
+    if store is not None:
+        return store.paginate_values(params, fields)
+    return paginate_table_values(EquipmentData.objects.filter(upload=upload.data_upload), params, fields)
+
+
+def equipment_chunks(upload, params, fields, limit=None):
+    """The filtered, ordered upload as lists of ``values_list`` tuples."""
+    store = column_store(upload, fields)
+    if store is not None:
+        return store.iter_chunks(params, fields, limit=limit)
+    equipment = order_equipment(filter_equipment(EquipmentData.objects.filter(upload=upload.data_upload), params),
+                                parse_ordering(params))
+    return iter_chunks(equipment[:limit] if limit else equipment, fields)
+
+
+def numeric_chunks(upload):
+    """All rows' flowrate/pressure/temperature as (n, 3) float64 arrays, in row order."""
+    store = column_store(upload, NUMERIC_FIELDS)
+    if store is not None:
+        yield from store.iter_numeric()
+        return
+    equipment = EquipmentData.objects.filter(upload=upload.data_upload).order_by('id')
+    for chunk in iter_chunks(equipment, NUMERIC_FIELDS):
+        yield np.asarray(chunk, dtype='float64')
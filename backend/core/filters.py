@@ -0,0 +1,235 @@
+"""
+Query-string filtering, ordering and keyset pagination for equipment rows.
+
+Supported parameters:
+
+    equipment_type=Pump&equipment_type=Valve   (or a comma separated list)
+    flowrate_min=, flowrate_max=, pressure_min=, ... (inclusive numeric ranges)
+    search=pum                                  (name or type contains, case-insensitive)
+    ordering=flowrate | -flowrate | id | ...
+    fields=equipment_name,flowrate              (projection; id is always kept)
+    limit=500, cursor=<opaque token from the previous page>
+
+Pages are keyset (cursor) paginated on ``(ordering field, id)``, so fetching
+page N costs the same as page 1. In id order that cost is also independent of
+the upload size: rows come straight off the (upload, ...) indexes. There is no
+index per sortable column, though (each would slow every ingest), so a page
+in any other order sorts the upload's matching EquipmentData rows each time;
+uploads read from column files sort once and page from a cached selection
+(core/columnar.py).
+"""
+import base64
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+FIELDS = ('id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+NUMERIC_FIELDS = ('flowrate', 'pressure', 'temperature')
+# API field -> ORM lookup; equipment_type is a foreign key to the EquipmentType dimension
+LOOKUPS = {'equipment_type': 'equipment_type__name'}
+
+
+def lookup(field):
+    return LOOKUPS.get(field, field)
+
+
+def _float(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({name: "Must be a number."})
+
+
+def parse_filters(params):
+    """
+    Return ``(types, ranges)`` for the filter parameters: the requested
+    equipment types (empty = all) and ``{field: (low, high)}`` with None for
+    an open bound.
+    """
+    types = [t.strip() for value in params.getlist('equipment_type') for t in value.split(',') if t.strip()]
+    ranges = {field: (_float(params, f'{field}_min'), _float(params, f'{field}_max')) for field in NUMERIC_FIELDS}
+    return types, ranges
+
+
+def parse_search(params):
+    """The ``search`` text, or '' for none."""
+    return (params.get('search') or '').strip()
+
+
+def filter_equipment(queryset, params):
+    """Apply the equipment_type, numeric range and search filters in ``params``."""
+    types, ranges = parse_filters(params)
+    if types:
+        queryset = queryset.filter(equipment_type__name__in=types)
+    search = parse_search(params)
+    if search:
+        queryset = queryset.filter(Q(equipment_name__icontains=search) | Q(equipment_type__name__icontains=search))
+
+    for field, (low, high) in ranges.items():
+        if low is not None:
+            queryset = queryset.filter(**{f'{field}__gte': low})
+        if high is not None:
+            queryset = queryset.filter(**{f'{field}__lte': high})
+    return queryset
+
+
+def parse_fields(params):
+    """Return the requested projection, always including ``id``."""
+    value = params.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+    return ['id'] + [f for f in fields if f != 'id']
+
+
+def parse_ordering(params):
+    """Return ``(field, descending)`` for the ``ordering`` parameter."""
+    value = params.get('ordering') or 'id'
+    field = value.lstrip('-')
+    if field not in FIELDS:
+        raise ValidationError({'ordering': f"Cannot order by '{field}'."})
+    return field, value.startswith('-')
+
+
+def parse_limit(params):
+    value = params.get('limit')
+    if not value:
+        return settings.DATA_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValidationError({'limit': "Must be an integer."})
+    if limit < 1:
+        raise ValidationError({'limit': "Must be at least 1."})
+    return min(limit, settings.DATA_MAX_PAGE_SIZE)
+
+
+def encode_cursor(field, value, row_id):
+    """Build the token pointing just past the row with ``id`` row_id and ``field`` value."""
+    payload = [value, row_id] if field != 'id' else [row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(token):
+    """Return the payload of a cursor token: ``[id]`` or ``[value, id]`` with an integer id."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': "Invalid cursor."})
+    if not isinstance(payload, list) or not 1 <= len(payload) <= 2 or not _is_int(payload[-1]):
+        raise ValidationError({'cursor': "Invalid cursor."})
+    return payload
+
+
+def cursor_position(cursor, field):
+    """
+    Return ``(value, last_id)`` for a cursor over rows ordered by ``field``
+    (value is None when ordering by id), checking the value's type so that a
+    crafted token cannot reach the query.
+    """
+    payload = decode_cursor(cursor)
+    if field == 'id':
+        return None, payload[-1]
+    if len(payload) != 2:
+        raise ValidationError({'cursor': "Cursor does not match the ordering."})
+    value, last_id = payload
+    if field in NUMERIC_FIELDS:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, str)
+    if not valid:
+        raise ValidationError({'cursor': "Cursor does not match the ordering."})
+    return value, last_id
+
+
+def order_equipment(queryset, ordering):
+    field, descending = ordering
+    prefix = '-' if descending else ''
+    if field == 'id':
+        return queryset.order_by(f'{prefix}id')
+    return queryset.order_by(f'{prefix}{lookup(field)}', f'{prefix}id')
+
+
+def seek(queryset, ordering, cursor):
+    """Restrict an ordered queryset to the rows after ``cursor``."""
+    if not cursor:
+        return queryset
+    field, descending = ordering
+    value, last_id = cursor_position(cursor, field)
+    after = 'lt' if descending else 'gt'
+    if field == 'id':
+        return queryset.filter(**{f'id__{after}': last_id})
+    field = lookup(field)
+    return queryset.filter(
+        Q(**{f'{field}__{after}': value}) | Q(**{field: value, f'id__{after}': last_id})
+    )
+
+
+def _page(queryset, params):
+    ordering = parse_ordering(params)
+    queryset = order_equipment(filter_equipment(queryset, params), ordering)
+    return seek(queryset, ordering, params.get('cursor')), ordering, parse_limit(params)
+
+
+def paginate(queryset, params, fields):
+    """
+    Filter, order and slice ``queryset`` for one page, loading only ``fields``.
+
+    Returns ``(rows, next_cursor)`` where next_cursor is None on the last page.
+    """
+    queryset, ordering, limit = _page(queryset, params)
+    if 'equipment_type' in fields or ordering[0] == 'equipment_type':
+        queryset = queryset.select_related('equipment_type')
+    rows = list(queryset.only(*(lookup(f) for f in fields), lookup(ordering[0]))[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        value = getattr(rows[-1], ordering[0])
+        if ordering[0] == 'equipment_type':
+            value = value.name
+        next_cursor = encode_cursor(ordering[0], value, rows[-1].id)
+    return rows, next_cursor
+
+
+def paginate_values(queryset, params, fields):
+    """
+    Same page as ``paginate`` but as plain ``values_list`` tuples in ``fields``
+    order, skipping model instantiation and serializer fields entirely.
+    """
+    queryset, ordering, limit = _page(queryset, params)
+    field = ordering[0]
+    lookups = [lookup(f) for f in fields]
+    rows = list(queryset.values_list(*lookups)[:limit + 1]) if field in fields else \
+        list(queryset.values_list(*lookups, lookup(field))[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        position = fields.index(field) if field in fields else len(fields)
+        next_cursor = encode_cursor(field, rows[-1][position], rows[-1][0])
+    if field not in fields:
+        rows = [row[:-1] for row in rows]
+    return rows, next_cursor
+
+
+def iter_chunks(queryset, fields, chunk_size=None):
+    """Yield lists of ``values_list`` tuples, ``chunk_size`` rows at a time, from one cursor."""
+    chunk_size = chunk_size or settings.DATA_STREAM_CHUNK_SIZE
+    rows = queryset.values_list(*(lookup(f) for f in fields)).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
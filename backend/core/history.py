@@ -0,0 +1,89 @@
+"""
+Upload history listing (/api/history/), newest first.
+
+    limit=50                    uploads per page (HISTORY_PAGE_SIZE by default)
+    cursor=<token>              the page after the one that returned the token
+    since=<id | ISO timestamp>  only uploads newer than that upload id, or
+                                uploaded after that time
+
+Pages are keyset paginated on ``(uploaded_at, id)`` from the
+upload_user_recent_idx index, so every page costs the same however long the
+history is. A client keeps the ``latest_id`` of its last response and asks for
+``since=<latest_id>`` on refresh: the answer holds only the uploads it has not
+seen (usually none), which it merges at the top of its list.
+
+Deltas carry no deletions, so uploads are listed only once their ingest has
+finished: a failed ingest deletes its upload (core/jobs.py), and until then
+the upload must not reach a client that would never hear of its removal.
+``latest_id`` stays below the oldest upload still ingesting, so the delta
+after it finishes includes it; clients skip uploads they already list.
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .filters import decode_cursor, encode_cursor
+from .models import IngestJob, UploadHistory
+
+
+def _limit(params):
+    value = params.get('limit')
+    if not value:
+        return settings.HISTORY_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValidationError({'limit': "Must be an integer."})
+    if not 1 <= limit <= settings.HISTORY_MAX_PAGE_SIZE:
+        raise ValidationError({'limit': f"Must be between 1 and {settings.HISTORY_MAX_PAGE_SIZE}."})
+    return limit
+
+
+def _since(queryset, value):
+    if value.isdigit():
+        return queryset.filter(id__gt=int(value))
+    moment = parse_datetime(value.replace(' ', '+'))  # an unescaped '+' in the offset arrives as a space
+    if moment is None:
+        raise ValidationError({'since': "Must be an upload id or an ISO 8601 timestamp."})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return queryset.filter(uploaded_at__gt=moment)
+
+
+def history_page(user, params):
+    """Return ``(uploads, next_cursor, latest_id)`` for one page of ``user``'s history."""
+    queryset = UploadHistory.objects.filter(user=user).exclude(jobs__status__in=IngestJob.ACTIVE_STATUSES)
+    since = params.get('since', '').strip()
+    if since:
+        queryset = _since(queryset, since)
+    cursor = params.get('cursor')
+    if cursor:
+        payload = decode_cursor(cursor)
+        uploaded_at = parse_datetime(payload[0]) if len(payload) == 2 and isinstance(payload[0], str) else None
+        if uploaded_at is None or not isinstance(payload[1], int):
+            raise ValidationError({'cursor': "Invalid cursor."})
+        last_id = payload[1]
+        queryset = queryset.filter(Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=last_id))
+    limit = _limit(params)
+    uploads = list(queryset.order_by('-uploaded_at', '-id')[:limit + 1])
+
+    next_cursor = None
+    if len(uploads) > limit:
+        uploads = uploads[:limit]
+        next_cursor = encode_cursor('uploaded_at', uploads[-1].uploaded_at.isoformat(), uploads[-1].id)
+
+    # The newest upload the client now knows of: its next ``since``
+    if cursor:
+        latest_id = None  # only the first page of a listing knows
+    elif uploads:
+        latest_id = max(upload.id for upload in uploads)
+    else:
+        latest_id = int(since) if since.isdigit() else None
+    if latest_id is not None:
+        ingesting = (UploadHistory.objects.filter(user=user, jobs__status__in=IngestJob.ACTIVE_STATUSES)
+                     .order_by('id').values_list('id', flat=True).first())
+        if ingesting is not None:
+            latest_id = min(latest_id, ingesting - 1)
+    return uploads, next_cursor, latest_id
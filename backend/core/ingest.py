@@ -0,0 +1,196 @@
+"""
+CSV ingestion for equipment uploads.
+
+The CSV is read in chunks, validated and coerced column-wise with pandas/NumPy,
+then written to the database in fixed-size batches with a single parameterised
+statement per batch (or COPY on PostgreSQL) instead of building one model
+instance per row.
+"""
+import io
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from itertools import repeat
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .analytics import RollupAccumulator, save_rollups
+from .columnar import ColumnWriter
+from .models import EquipmentData, EquipmentType, UploadHistory
+from .parsing import NUMERIC_COLUMNS, TEXT_COLUMNS, read_frames
+from .stats import StatisticsAccumulator, save_statistics
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+_memory_lock = threading.Lock()
+_memory_users = 0
+_memory_owner = False
+
+
+def _copy_rows(cursor, table, columns, frame):
+    """Stream a batch into PostgreSQL with COPY (psycopg2 or psycopg 3)."""
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False)
+    sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        buffer.seek(0)
+        raw.copy_expert(sql, buffer)
+    else:
+        with raw.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def insert_frame(upload, df, batch_size=None):
+    """
+    Insert a cleaned frame as EquipmentData rows for ``upload``.
+
+    Type names are resolved to EquipmentType ids first. Rows are written in
+    batches of ``INGEST_BATCH_SIZE`` so that only one batch of Python tuples
+    exists at a time. Returns the number of rows inserted.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    df = df.assign(equipment_type=EquipmentType.objects.ids_for(df['equipment_type']))
+    fields = ('upload',) + TEXT_COLUMNS + NUMERIC_COLUMNS
+    qn = connection.ops.quote_name
+    table = qn(EquipmentData._meta.db_table)
+    columns = ', '.join(qn(EquipmentData._meta.get_field(f).column) for f in fields)
+    sql = f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            if connection.vendor == 'postgresql':
+                _copy_rows(cursor, table, columns, batch.assign(upload=upload.pk)[list(fields)])
+            else:
+                cursor.executemany(sql, zip(
+                    repeat(upload.pk, len(batch)),
+                    *(batch[col].tolist() for col in TEXT_COLUMNS + NUMERIC_COLUMNS)
+                ))
+    return len(df)
+
+
+def _max_rss():
+    """The process's peak resident set size in bytes, or None without getrusage."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # kilobytes except on macOS
+
+
+@contextmanager
+def track_peak_memory():
+    """
+    Measure the memory the block needed at its peak.
+
+    Yields a dict whose ``peak_bytes`` is filled in on exit. By default that is
+    how far the process's peak resident size rose during the block: nearly
+    free, but 0 when the block stayed under an earlier peak, and None where
+    getrusage is unavailable. With INGEST_TRACK_MEMORY on it is instead the
+    peak Python heap (NumPy buffers included) from tracemalloc, which slows
+    every allocation. tracemalloc is process wide: the peak is reset only when
+    no other ingest is being measured, so with overlapping ingests each one
+    reports the peak of the whole process over its lifetime, not its own share.
+    """
+    global _memory_users, _memory_owner
+    result = {'peak_bytes': None}
+    if not settings.INGEST_TRACK_MEMORY:
+        before = _max_rss()
+        yield result
+        if before is not None:
+            result['peak_bytes'] = _max_rss() - before
+        return
+
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_owner = True
+        if _memory_users == 0:
+            tracemalloc.reset_peak()
+        _memory_users += 1
+    try:
+        yield result
+    finally:
+        with _memory_lock:
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            _memory_users -= 1
+            if _memory_users == 0 and _memory_owner:
+                tracemalloc.stop()
+                _memory_owner = False
+
+
+def ingest_csv(upload, fileobj, chunk_size=None, on_chunk=None):
+    """
+    Stream the CSV in ``fileobj`` into EquipmentData rows and/or column files
+    for ``upload``, as selected by EQUIPMENT_STORAGE (see core/columnar.py).
+
+    The file is parsed ``INGEST_CHUNK_SIZE`` rows at a time and each chunk is
+    validated and inserted before the next one is read, so memory use depends
+    on the chunk size rather than the file size. Every chunk is committed on its
+    own so progress is visible to other connections and SQLite's write lock is
+    released between chunks; on error the caller is expected to delete the
+    upload, which cascades to the rows already written.
+
+    ``on_chunk(rows)`` is called after each committed chunk with the running
+    row count. Summary statistics and the analytics rollups are accumulated
+    along the way and stored with the final row count. Updates
+    ``upload.total_records`` and returns an ingest report with the row count,
+    elapsed time, throughput and peak memory (see ``track_peak_memory``).
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    return ingest_frames(upload, read_frames(fileobj, chunk_size), on_chunk=on_chunk)
+
+
+def ingest_frames(upload, frames, on_chunk=None):
+    """
+    Store already cleaned frames (``parsing.clean_frame``) for ``upload``;
+    ``ingest_csv`` without the parsing. Used directly when the CSV was parsed
+    elsewhere, e.g. by the batch upload's process pool.
+    """
+    started = time.perf_counter()
+    rows = chunks = 0
+    statistics = StatisticsAccumulator()
+    rollups = RollupAccumulator()
+    upload.storage = settings.EQUIPMENT_STORAGE
+    write_rows = upload.storage != UploadHistory.STORAGE_COLUMNAR
+    columns = ColumnWriter(upload) if upload.storage != UploadHistory.STORAGE_ORM else None
+    try:
+        with track_peak_memory() as memory:
+            for frame in frames:
+                statistics.update(frame)
+                rollups.update(frame)
+                if columns:
+                    columns.append(frame)
+                if write_rows:
+                    with transaction.atomic():
+                        insert_frame(upload, frame)
+                rows += len(frame)
+                chunks += 1
+                if on_chunk:
+                    on_chunk(rows)
+            if columns:
+                columns.close()
+            with transaction.atomic():
+                upload.total_records = rows
+                upload.save(update_fields=['total_records', 'storage'])
+                save_statistics(upload, statistics)
+                save_rollups(upload, rollups)
+    except BaseException:
+        if columns:
+            columns.abort()
+        raise
+    elapsed = time.perf_counter() - started
+
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed else None,
+        'peak_memory_bytes': memory['peak_bytes'],
+    }
@@ -0,0 +1,227 @@
+"""
+Background ingestion jobs.
+
+Uploads are stored and answered straight away; the CSV parsing and database
+insert run on a small in-process thread pool and report their progress through
+the IngestJob row, which clients poll via /api/jobs/<id>/. No external broker
+is needed. With INGEST_WORKERS = 0 jobs run inline in the request instead.
+
+Jobs live only in the process that queued them, so a restart or crash leaves
+them queued or running for good. ``fail_stale_jobs`` fails the ones that have
+shown no progress for INGEST_JOB_TIMEOUT seconds, dropping their uploads as a
+failed ingest does; it runs whenever an ingest is started or a job polled, and
+as ``python manage.py fail_stale_jobs``.
+
+Batch uploads parse their CSVs in parallel on a process pool as well (pandas
+parsing holds the GIL for much of its time); the threads then only store the
+parsed frames, read back one at a time from the spool file the parser wrote.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .ingest import ingest_csv, ingest_frames
+from .models import IngestJob
+from .parsing import parse_file, spooled_frames
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_parse_pool = None
+
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INGEST_WORKERS,
+                thread_name_prefix='ingest',
+            )
+        return _executor
+
+
+def get_parse_pool():
+    """Return the process-wide CSV parser pool, or None with BATCH_PARSE_WORKERS = 0."""
+    global _parse_pool
+    if not settings.BATCH_PARSE_WORKERS:
+        return None
+    with _executor_lock:
+        if _parse_pool is None:
+            # Spawned, not forked: children must not inherit the server's threads
+            # and database connections. core.parsing does not need Django set up.
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=settings.BATCH_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _parse_pool
+
+
+def fail_stale_jobs():
+    """Fail the queued or running jobs whose worker has gone; returns how many."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.INGEST_JOB_TIMEOUT)
+    stale = IngestJob.objects.filter(status__in=IngestJob.ACTIVE_STATUSES, heartbeat_at__lt=cutoff)
+    failed = 0
+    for job in stale.select_related('upload'):
+        # Claimed like a worker claims a job, so a late worker and this never both act on it
+        claimed = IngestJob.objects.filter(pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at).update(
+            status=IngestJob.STATUS_RUNNING, heartbeat_at=timezone.now())
+        if claimed:
+            _fail(job, "Ingest was interrupted (the server restarted or crashed); upload the file again.")
+            failed += 1
+    return failed
+
+
+def start_ingest(upload):
+    """Create an IngestJob for a freshly stored upload and schedule it."""
+    fail_stale_jobs()
+    job = IngestJob.objects.create(
+        user=upload.user,
+        upload=upload,
+        bytes_total=upload.file.size,
+    )
+    if settings.INGEST_WORKERS:
+        # Only hand the job to a worker once the rows it reads are committed.
+        transaction.on_commit(lambda: get_executor().submit(run_ingest, job.pk))
+    else:
+        _run(job)
+    return job
+
+
+def start_batch_ingest(uploads):
+    """
+    Create IngestJobs for several freshly stored uploads and schedule them.
+
+    All CSVs are handed to the parser pool at once; each job then stores its
+    frames as soon as its parse is done. Returns the jobs in upload order.
+    """
+    fail_stale_jobs()
+    jobs = [IngestJob.objects.create(user=upload.user, upload=upload, bytes_total=upload.file.size)
+            for upload in uploads]
+
+    def schedule():
+        pool = get_parse_pool()
+        parsed = [_submit_parse(pool, job.upload) for job in jobs]
+        for job, frames in zip(jobs, parsed):
+            if settings.INGEST_WORKERS:
+                get_executor().submit(run_ingest, job.pk, frames)
+            else:
+                _run(job, frames)
+
+    if settings.INGEST_WORKERS:
+        transaction.on_commit(schedule)
+    else:
+        schedule()
+    return jobs
+
+
+def _submit_parse(pool, upload):
+    if pool is None:
+        return None
+    try:
+        path = upload.file.path
+    except NotImplementedError:
+        return None  # Not on the local filesystem; the ingest thread parses it
+    return pool.submit(parse_file, path, settings.INGEST_CHUNK_SIZE, settings.FILE_UPLOAD_TEMP_DIR)
+
+
+def run_ingest(job_id, parsed=None):
+    """
+    Worker entry point: ingest the job's upload and record the outcome.
+
+    ``parsed`` is an optional future of the upload's spooled, cleaned frames
+    from the parser pool (``parsing.parse_file``); without it the CSV is parsed
+    here.
+    """
+    close_old_connections()
+    try:
+        _run(IngestJob.objects.select_related('upload').get(pk=job_id), parsed)
+    except Exception:
+        logger.exception("Ingest job %s crashed", job_id)
+    finally:
+        # Worker threads get their own connections; don't leak them.
+        connections.close_all()
+
+
+def _run(job, parsed=None):
+    now = timezone.now()
+    claimed = IngestJob.objects.filter(pk=job.pk, status=IngestJob.STATUS_QUEUED).update(
+        status=IngestJob.STATUS_RUNNING, started_at=now, heartbeat_at=now)
+    if not claimed:
+        # Failed by fail_stale_jobs while it waited for a worker
+        if parsed is not None and parsed.exception() is None:
+            os.unlink(parsed.result()[0])
+        return
+    job.status, job.started_at, job.heartbeat_at = IngestJob.STATUS_RUNNING, now, now
+    started = time.perf_counter()
+
+    try:
+        if parsed is not None:
+            report = _ingest_parsed(job, parsed.result(), started)
+        else:
+            report = _ingest_file(job, started)
+    except Exception as e:
+        _fail(job, str(e))
+        return
+
+    job.status = IngestJob.STATUS_DONE
+    job.rows_processed = report['rows']
+    job.bytes_processed = job.bytes_total
+    job.rows_per_sec = report['rows_per_sec']
+    job.peak_memory_bytes = report['peak_memory_bytes']
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def _fail(job, error):
+    # A half-ingested upload is useless; dropping it cascades to its rows.
+    if job.upload is not None:
+        job.upload.delete()
+    job.upload = None
+    job.status = IngestJob.STATUS_FAILED
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=['upload', 'status', 'error', 'finished_at'])
+
+
+def _ingest_file(job, started):
+    with job.upload.file.open('rb') as csv_file:
+        def on_chunk(rows):
+            elapsed = time.perf_counter() - started
+            IngestJob.objects.filter(pk=job.pk).update(
+                rows_processed=rows,
+                bytes_processed=csv_file.tell(),
+                rows_per_sec=round(rows / elapsed, 1) if elapsed else None,
+                heartbeat_at=timezone.now(),
+            )
+
+        return ingest_csv(job.upload, csv_file, on_chunk=on_chunk)
+
+
+def _ingest_parsed(job, parsed, started):
+    spool, total = parsed
+
+    def on_chunk(rows):
+        elapsed = time.perf_counter() - started
+        IngestJob.objects.filter(pk=job.pk).update(
+            rows_processed=rows,
+            # Parsed elsewhere, so estimate the bytes stored from the rows
+            bytes_processed=job.bytes_total * rows // total if total else 0,
+            rows_per_sec=round(rows / elapsed, 1) if elapsed else None,
+            heartbeat_at=timezone.now(),
+        )
+
+    try:
+        return ingest_frames(job.upload, spooled_frames(spool), on_chunk=on_chunk)
+    finally:
+        os.unlink(spool)
@@ -0,0 +1,30 @@
+"""
+Roll up uploads ingested before the analytics rollups existed.
+
+    python manage.py backfill_rollups [--user NAME]
+
+New uploads are rolled up as they are ingested; this only catches up older
+ones, one scan per upload. /api/analytics/ leaves them out until it has run.
+Safe to re-run: uploads that already have rollups are skipped.
+"""
+from django.core.management.base import BaseCommand
+
+from core.analytics import compute_rollups, uploads_without_rollups
+
+
+class Command(BaseCommand):
+    help = "Compute analytics rollups for uploads that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only this user's uploads.")
+
+    def handle(self, *args, **options):
+        uploads = uploads_without_rollups()
+        if options['user']:
+            uploads = uploads.filter(user__username=options['user'])
+        done = 0
+        for upload in uploads.iterator():
+            compute_rollups(upload)
+            done += 1
+            self.stdout.write(f"Rolled up upload {upload.pk} ({upload.total_records} rows)")
+        self.stdout.write(self.style.SUCCESS(f"{done} upload(s) rolled up"))
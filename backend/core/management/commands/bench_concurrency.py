@@ -0,0 +1,139 @@
+"""
+Concurrent upload + summary load against the configured database.
+
+    python manage.py bench_concurrency --clients 8 --uploads 4 --rows 20000
+    DATABASE_URL=postgres://... python manage.py bench_concurrency ...
+
+Each client thread uploads ``--uploads`` CSVs and, after each one, reads the
+summary ``--reads`` times, the way the dashboard does. Ingestion runs on the
+usual worker pool, so writers really do compete for the database. Run it once
+per backend (SQLite WAL, PostgreSQL, ...) and compare. Everything the benchmark
+creates is deleted at the end.
+"""
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from core.models import IngestJob, UploadHistory
+
+
+def make_csv(rows, seed):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'Equipment Name': [f'EQ-{i}' for i in range(rows)],
+        'Type': rng.choice(['Pump', 'Reactor', 'Valve', 'Heat Exchanger'], rows),
+        'Flowrate': rng.normal(200, 50, rows).round(2),
+        'Pressure': rng.normal(5, 1, rows).round(2),
+        'Temperature': rng.normal(100, 30, rows).round(2),
+    })
+    return frame.to_csv(index=False).encode()
+
+
+class Command(BaseCommand):
+    help = "Run N parallel upload/summary clients against the configured database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent client threads.")
+        parser.add_argument('--uploads', type=int, default=2, help="Uploads per client.")
+        parser.add_argument('--rows', type=int, default=20000, help="Rows per uploaded CSV.")
+        parser.add_argument('--reads', type=int, default=5, help="Summary reads after each upload.")
+        parser.add_argument('--timeout', type=float, default=600, help="Seconds to wait for ingestion.")
+
+    def handle(self, *args, **options):
+        self.describe_backend()
+        user = User.objects.create_user(f'bench-concurrency-{int(time.time())}')
+        payload = make_csv(options['rows'], 0)
+        timings = {'upload': [], 'ingest': [], 'summary': []}
+        errors = []
+        lock = threading.Lock()
+
+        def record(kind, seconds):
+            with lock:
+                timings[kind].append(seconds)
+
+        def run_client(index):
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            try:
+                for n in range(options['uploads']):
+                    upload_file = io.BytesIO(payload)
+                    upload_file.name = f'bench_{index}_{n}.csv'
+                    started = time.perf_counter()
+                    response = client.post('/api/upload/', {'file': upload_file}, format='multipart')
+                    record('upload', time.perf_counter() - started)
+                    if response.status_code not in (201, 202):
+                        errors.append(f"upload: {response.status_code} {response.content[:200]!r}")
+                        continue
+                    upload_id = response.json()['id']
+                    self.wait_for_ingest(response.json()['job']['id'], started, options['timeout'], record)
+                    for _ in range(options['reads']):
+                        started = time.perf_counter()
+                        response = client.get(f'/api/summary/{upload_id}/')
+                        record('summary', time.perf_counter() - started)
+                        if response.status_code != 200:
+                            errors.append(f"summary: {response.status_code}")
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+                list(pool.map(run_client, range(options['clients'])))
+            wall = time.perf_counter() - started
+            self.report(timings, errors, wall, options)
+        finally:
+            for upload in UploadHistory.objects.filter(user=user):
+                upload.file.delete(save=False)
+            UploadHistory.objects.filter(user=user).delete()
+            user.delete()
+
+    def wait_for_ingest(self, job_id, started, timeout, record):
+        while time.perf_counter() - started < timeout:
+            status = IngestJob.objects.values_list('status', flat=True).get(pk=job_id)
+            if status not in IngestJob.ACTIVE_STATUSES:
+                record('ingest', time.perf_counter() - started)
+                return
+            time.sleep(0.05)
+        raise TimeoutError(f"Ingest job {job_id} did not finish in {timeout}s")
+
+    def describe_backend(self):
+        description = f"{connection.vendor} ({connection.settings_dict['NAME']})"
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                description += f", journal_mode={cursor.fetchone()[0]}"
+        description += f", CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']}"
+        if connection.settings_dict.get('OPTIONS', {}).get('pool'):
+            description += ", pooled"
+        self.stdout.write(f"Backend: {description}; INGEST_WORKERS={settings.INGEST_WORKERS}")
+
+    def report(self, timings, errors, wall, options):
+        total_rows = len(timings['ingest']) * options['rows']
+        self.stdout.write(
+            f"{options['clients']} clients x {options['uploads']} uploads of {options['rows']} rows "
+            f"in {wall:.2f}s: {total_rows / wall:,.0f} rows/s ingested, "
+            f"{len(timings['summary']) / wall:,.1f} summaries/s"
+        )
+        for kind, values in timings.items():
+            if not values:
+                continue
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            self.stdout.write(
+                f"{kind:>8}: n={len(values)}  median {statistics.median(values) * 1000:.1f} ms  "
+                f"p95 {p95 * 1000:.1f} ms  max {values[-1] * 1000:.1f} ms"
+            )
+        if errors:
+            self.stdout.write(self.style.ERROR(f"{len(errors)} errors, first: {errors[0]}"))
@@ -0,0 +1,76 @@
+"""
+Compare the read paths of /api/data/<upload_id>/.
+
+    python manage.py bench_data_read --rows 200000 --limit 10000
+
+A throwaway user and upload are created inside a transaction that is rolled
+back at the end, so the benchmark leaves the database untouched.
+"""
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from core.ingest import insert_frame
+from core.models import UploadHistory
+
+LAYOUTS = ('records', 'rows', 'columnar')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the serializer read path against the values_list fast paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Rows in the synthetic upload.")
+        parser.add_argument('--limit', type=int, default=10000, help="Page size requested.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per layout.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rows, limit = options['rows'], options['limit']
+        user = User.objects.create_user('bench-data-read')
+        upload = UploadHistory.objects.create(user=user, file='uploads/bench.csv')
+        rng = np.random.default_rng(0)
+        insert_frame(upload, pd.DataFrame({
+            'equipment_name': [f'EQ-{i}' for i in range(rows)],
+            'equipment_type': rng.choice(['Pump', 'Reactor', 'Valve', 'Heat Exchanger'], rows),
+            'flowrate': rng.normal(200, 50, rows),
+            'pressure': rng.normal(5, 1, rows),
+            'temperature': rng.normal(100, 30, rows),
+        }))
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        self.stdout.write(f"{rows} rows, pages of {limit}, best/median of {options['repeat']} runs (full scan)")
+        for layout in LAYOUTS:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                url = f'/api/data/{upload.id}/?limit={limit}&layout={layout}'
+                size = 0
+                while url:
+                    response = client.get(url)
+                    size += len(response.content)
+                    url = response.json()['next']
+                timings.append(time.perf_counter() - started)
+            best = min(timings)
+            self.stdout.write(
+                f"{layout:>9}: best {best:.3f}s  median {statistics.median(timings):.3f}s  "
+                f"{rows / best:,.0f} rows/s  {size / 1e6:.1f} MB"
+            )
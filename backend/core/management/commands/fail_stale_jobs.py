@@ -0,0 +1,21 @@
+"""
+Fail ingest jobs lost to a worker restart or crash.
+
+    python manage.py fail_stale_jobs
+
+Jobs queued or running without progress for INGEST_JOB_TIMEOUT seconds are
+marked failed and their uploads dropped, as a failed ingest does. The server
+also does this whenever an ingest starts or a job is polled; run it after a
+deploy or from cron to clear jobs nobody is polling.
+"""
+from django.core.management.base import BaseCommand
+
+from core.jobs import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Mark ingest jobs whose worker has gone as failed."
+
+    def handle(self, *args, **options):
+        failed = fail_stale_jobs()
+        self.stdout.write(self.style.SUCCESS(f"{failed} stale job(s) failed"))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_ingestjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_count', models.IntegerField(default=0)),
+                ('columns', models.JSONField(default=dict)),
+                ('type_counts', models.JSONField(default=dict)),
+                ('type_means', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('upload', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='core.uploadhistory')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_uploadstatistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['upload', 'equipment_type'], name='equipment_upload_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingestjob',
+            index=models.Index(fields=['upload', 'status'], name='job_upload_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadhistory',
+            index=models.Index(fields=['user', '-uploaded_at'], name='upload_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='storage',
+            field=models.CharField(choices=[('orm', 'EquipmentData rows'), ('columnar', 'Column files'), ('both', 'Rows and column files')], default='orm', max_length=16),
+        ),
+    ]
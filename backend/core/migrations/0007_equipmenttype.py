@@ -0,0 +1,69 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def types_to_table(apps, schema_editor):
+    EquipmentType = apps.get_model('core', 'EquipmentType')
+    EquipmentData = apps.get_model('core', 'EquipmentData')
+    names = EquipmentData.objects.values_list('equipment_type', flat=True).distinct()
+    for name in names:
+        equipment_type = EquipmentType.objects.create(name=name)
+        EquipmentData.objects.filter(equipment_type=name).update(type_ref=equipment_type)
+
+
+def table_to_types(apps, schema_editor):
+    EquipmentType = apps.get_model('core', 'EquipmentType')
+    EquipmentData = apps.get_model('core', 'EquipmentData')
+    for equipment_type in EquipmentType.objects.all():
+        EquipmentData.objects.filter(type_ref=equipment_type).update(equipment_type=equipment_type.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_uploadhistory_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='equipmentdata',
+            name='type_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='core.equipmenttype'),
+        ),
+        # Nullable while both columns exist, so the migration can also be reversed
+        migrations.AlterField(
+            model_name='equipmentdata',
+            name='equipment_type',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(types_to_table, table_to_types),
+        migrations.RemoveIndex(
+            model_name='equipmentdata',
+            name='equipment_upload_type_idx',
+        ),
+        migrations.RemoveField(
+            model_name='equipmentdata',
+            name='equipment_type',
+        ),
+        migrations.RenameField(
+            model_name='equipmentdata',
+            old_name='type_ref',
+            new_name='equipment_type',
+        ),
+        migrations.AlterField(
+            model_name='equipmentdata',
+            name='equipment_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='readings', to='core.equipmenttype'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['upload', 'equipment_type'], name='equipment_upload_type_idx'),
+        ),
+    ]
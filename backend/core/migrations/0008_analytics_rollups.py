@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0007_equipmenttype'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadTopEquipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('equipment_name', models.CharField(max_length=255)),
+                ('temperature', models.FloatField()),
+                ('equipment_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.equipmenttype')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='top_equipment', to='core.uploadhistory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyTypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('uploads', models.IntegerField()),
+                ('count', models.IntegerField()),
+                ('flowrate_sum', models.FloatField()),
+                ('pressure_sum', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('flowrate_min', models.FloatField()),
+                ('pressure_min', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('flowrate_max', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('equipment_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.equipmenttype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UploadTypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField()),
+                ('flowrate_sum', models.FloatField()),
+                ('pressure_sum', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('flowrate_min', models.FloatField()),
+                ('pressure_min', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('flowrate_max', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('equipment_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.equipmenttype')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_rollups', to='core.uploadhistory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='rollup_user_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='uploadtyperollup',
+            constraint=models.UniqueConstraint(fields=('upload', 'equipment_type'), name='rollup_upload_type_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadtopequipment',
+            index=models.Index(fields=['user', 'day', '-temperature'], name='top_user_day_temp_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytyperollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day', 'equipment_type'), name='daily_rollup_unique'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='uploadhistory',
+            name='upload_user_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='uploadhistory',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='upload_user_recent_idx'),
+        ),
+    ]
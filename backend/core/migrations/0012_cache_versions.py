@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import time
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0011_history_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCacheVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('stamp', models.FloatField(default=time.time)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='cache_version',
+            field=models.FloatField(default=time.time),
+        ),
+    ]
@@ -1,21 +1,268 @@
-from django.db import models
+import threading
+import time
+import uuid
+
+import numpy as np
+from django.db import models, transaction
+from django.utils import timezone
 
 class UploadHistory(models.Model):
+    # Where the readings live; see core/columnar.py
+    STORAGE_ORM = 'orm'
+    STORAGE_COLUMNAR = 'columnar'
+    STORAGE_BOTH = 'both'
+    STORAGE_CHOICES = [
+        (STORAGE_ORM, 'EquipmentData rows'),
+        (STORAGE_COLUMNAR, 'Column files'),
+        (STORAGE_BOTH, 'Rows and column files'),
+    ]
+
     user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     file = models.FileField(upload_to='uploads/')
     total_records = models.IntegerField(default=0)
+    storage = models.CharField(max_length=16, choices=STORAGE_CHOICES, default=STORAGE_ORM)
+    # SHA-256 of the uploaded bytes; identical uploads share the first one's data (core/uploads.py)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    source = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    # Version stamp of the upload's cached responses; bumped on change (core/caching.py)
+    cache_version = models.FloatField(default=time.time)
+
+    class Meta:
+        indexes = [
+            # History listing: WHERE user_id = ? ORDER BY uploaded_at DESC, id DESC (keyset pages)
+            models.Index(fields=['user', '-uploaded_at', '-id'], name='upload_user_recent_idx'),
+        ]
+
+    @property
+    def data_upload(self):
+        """The upload whose rows, column files and statistics this one reads (itself unless a duplicate)."""
+        return self.source if self.source_id else self
+
+    def delete(self, *args, **kwargs):
+        # Hand the shared data to a duplicate first so it outlives this record.
+        # (Queryset .delete() bypasses this; delete uploads one by one.)
+        from .uploads import promote_duplicate
+        with transaction.atomic():
+            promote_duplicate(self)
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"Upload {self.id} at {self.uploaded_at}"
 
+class UserCacheVersion(models.Model):
+    """Version stamp of a user's cached listings (history, analytics); see core/caching.py."""
+    user = models.OneToOneField('auth.User', on_delete=models.CASCADE, primary_key=True, related_name='+')
+    stamp = models.FloatField(default=time.time)
+
+class EquipmentTypeManager(models.Manager):
+    # name -> id, shared by the whole process; types are never renamed, so entries stay valid
+    _ids = {}
+    _ids_lock = threading.Lock()
+
+    def ids_for(self, names):
+        """
+        Return the EquipmentType ids for ``names`` (an array of strings), creating
+        missing types. Known ids come from an in-process cache, so an ingest chunk
+        normally costs no query at all.
+        """
+        labels, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+        with self._ids_lock:
+            ids = {label: self._ids.get(label) for label in labels.tolist()}
+        missing = [label for label, pk in ids.items() if pk is None]
+        if missing:
+            self.bulk_create([self.model(name=label) for label in missing], ignore_conflicts=True)
+            found = dict(self.filter(name__in=missing).values_list('name', 'id'))
+            ids.update(found)
+
+            def remember():
+                with self._ids_lock:
+                    self._ids.update(found)
+            # Only cache ids that are committed; a rolled back transaction must not leave stale ones
+            transaction.on_commit(remember)
+        return np.array([ids[label] for label in labels.tolist()], dtype=np.int64)[inverse]
+
+class EquipmentType(models.Model):
+    # Dimension table: each distinct type is stored once and readings point at it
+    name = models.CharField(max_length=255, unique=True)
+
+    objects = EquipmentTypeManager()
+
+    def __str__(self):
+        return self.name
+
 class EquipmentData(models.Model):
     upload = models.ForeignKey(UploadHistory, on_delete=models.CASCADE, related_name='equipment')
     equipment_name = models.CharField(max_length=255)
-    equipment_type = models.CharField(max_length=255)
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='readings')
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
 
+    class Meta:
+        indexes = [
+            # Per-upload type filters and GROUP BY equipment_type, answered from the index alone
+            models.Index(fields=['upload', 'equipment_type'], name='equipment_upload_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment_name} ({self.equipment_type.name})"
+
+class UploadStatistics(models.Model):
+    upload = models.OneToOneField(UploadHistory, on_delete=models.CASCADE, related_name='statistics')
+    total_count = models.IntegerField(default=0)
+    # {column: {count, mean, min, max, std, percentiles: {p5, p25, p50, p75, p95}}}
+    columns = models.JSONField(default=dict)
+    # {equipment_type: count} and {equipment_type: {column: mean}}
+    type_counts = models.JSONField(default=dict)
+    type_means = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def averages(self):
+        return {f"avg_{col}": values['mean'] for col, values in self.columns.items()}
+
+    def type_distribution(self):
+        return [{'equipment_type': t, 'count': c} for t, c in self.type_counts.items()]
+
+    def __str__(self):
+        return f"Statistics for upload {self.upload_id}"
+
+class IngestJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='ingest_jobs')
+    upload = models.ForeignKey(UploadHistory, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    rows_per_sec = models.FloatField(null=True, blank=True)
+    peak_memory_bytes = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Last sign of life from the worker; see jobs.fail_stale_jobs
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # "Is this upload still being ingested?" check on every read endpoint
+            models.Index(fields=['upload', 'status'], name='job_upload_status_idx'),
+        ]
+
+    @property
+    def progress(self):
+        if self.status == self.STATUS_DONE:
+            return 1.0
+        if not self.bytes_total:
+            return 0.0
+        return min(self.bytes_processed / self.bytes_total, 1.0)
+
+    def __str__(self):
+        return f"Ingest job {self.id} ({self.status})"
+
+class UploadSession(models.Model):
+    """A resumable upload in progress; chunks land in MEDIA_ROOT/partial/ (core/resumable.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    # Optional SHA-256 of the whole file, checked on finalize
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        """Expected byte length of chunk ``index`` (the last one may be short)."""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
     def __str__(self):
-        return f"{self.equipment_name} ({self.equipment_type})"
+        return f"Upload session {self.id} ({self.filename})"
+
+class UploadChunk(models.Model):
+    """One received, checksum-verified chunk of an UploadSession."""
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.IntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'index'], name='upload_chunk_unique'),
+        ]
+
+class UploadTypeRollup(models.Model):
+    """Per-upload, per-type totals; the unit the analytics rollups are built from."""
+    upload = models.ForeignKey(UploadHistory, on_delete=models.CASCADE, related_name='type_rollups')
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='+')
+    count = models.IntegerField()
+    flowrate_sum = models.FloatField()
+    pressure_sum = models.FloatField()
+    temperature_sum = models.FloatField()
+    flowrate_min = models.FloatField()
+    pressure_min = models.FloatField()
+    temperature_min = models.FloatField()
+    flowrate_max = models.FloatField()
+    pressure_max = models.FloatField()
+    temperature_max = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'equipment_type'], name='rollup_upload_type_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='rollup_user_day_idx'),
+        ]
+
+class DailyTypeRollup(models.Model):
+    """Per-user, per-day, per-type totals over all uploads of that day."""
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='+')
+    uploads = models.IntegerField()
+    count = models.IntegerField()
+    flowrate_sum = models.FloatField()
+    pressure_sum = models.FloatField()
+    temperature_sum = models.FloatField()
+    flowrate_min = models.FloatField()
+    pressure_min = models.FloatField()
+    temperature_min = models.FloatField()
+    flowrate_max = models.FloatField()
+    pressure_max = models.FloatField()
+    temperature_max = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'equipment_type'], name='daily_rollup_unique'),
+        ]
+
+class UploadTopEquipment(models.Model):
+    """The ANALYTICS_TOP_K hottest readings of an upload; cross-upload top-N merges these."""
+    upload = models.ForeignKey(UploadHistory, on_delete=models.CASCADE, related_name='top_equipment')
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    equipment_name = models.CharField(max_length=255)
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='+')
+    temperature = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'day', '-temperature'], name='top_user_day_temp_idx'),
+        ]
@@ -0,0 +1,96 @@
+"""
+Request body parsers for the upload endpoints.
+
+Clients on slow links may send the whole multipart body compressed with
+``Content-Encoding: gzip`` (or ``zstd`` when the zstandard package is
+installed). The body is decompressed as Django's multipart parser reads it,
+so upload handlers (hashing, storage) see the plain form data and nothing is
+buffered beyond their usual chunks. Reading stops with a 413 once more than
+UPLOAD_MAX_DECODED_BYTES have come out, so a small compressed body cannot
+expand without bound.
+"""
+import gzip
+import io
+import sys
+
+from django.conf import settings
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, UnsupportedMediaType
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Raised while decoding a corrupt or truncated body (gzip raises OSError/EOFError)
+DECODE_ERRORS = (zstandard.ZstdError,) if zstandard is not None else ()
+READ_SIZE = 64 * 1024
+
+
+class DecodedBodyTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "The decompressed request body is too large."
+    default_code = 'too_large'
+
+
+class CappedStream:
+    """Reads through ``stream``, raising DecodedBodyTooLarge once more than ``limit`` bytes came out."""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.total = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.total += len(data)
+        if self.total > self.limit:
+            raise DecodedBodyTooLarge(f"The decompressed request body exceeds {self.limit} bytes.")
+        return data
+
+    def __iter__(self):
+        # Django iterates the body when draining it
+        return iter(lambda: self.read(READ_SIZE), b'')
+
+
+def decoded_stream(stream, encoding):
+    """``stream`` decoded from the given Content-Encoding, or None if unsupported."""
+    if encoding in ('', 'identity'):
+        return stream
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if encoding == 'zstd' and zstandard is not None:
+        # Buffered so it can be iterated, as Django does when draining the body
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True))
+    return None
+
+
+class DecompressingMultiPartParser(MultiPartParser):
+    """MultiPartParser that also accepts gzip/zstd ``Content-Encoding`` bodies."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if content_encoding in ('', 'identity'):
+            return super().parse(stream, media_type, parser_context)
+
+        decoded = decoded_stream(stream, content_encoding)
+        if decoded is None:
+            raise UnsupportedMediaType(media_type, detail=f'Unsupported Content-Encoding "{content_encoding}".')
+        decoded = CappedStream(decoded, settings.UPLOAD_MAX_DECODED_BYTES)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        # Django stops reading at CONTENT_LENGTH, which counts the compressed
+        # bytes; read the decoded stream to its end instead
+        meta['CONTENT_LENGTH'] = str(sys.maxsize)
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data, files = DjangoMultiPartParser(meta, decoded, request.upload_handlers, encoding).parse()
+        except MultiPartParserError as exc:
+            raise ParseError(f'Multipart form parse error - {exc}')
+        except (OSError, EOFError, *DECODE_ERRORS) as exc:
+            raise ParseError(f'Invalid {content_encoding} request body: {exc}')
+        return DataAndFiles(data, files)
@@ -0,0 +1,148 @@
+"""
+Parsing and validation of equipment CSVs.
+
+Kept free of Django imports so it can run in the batch upload's worker
+processes (core/batch.py), which never set Django up.
+
+Uploads may be gzip-, zstd- or zip-compressed CSVs. The format is told from
+the first bytes, not the file name, and the CSV is decompressed as pandas
+reads it; nothing decompressed is written to disk (only the cleaned frames
+of batch parses are spooled, see ``parse_file``). zstd needs the optional
+``zstandard`` package.
+"""
+import gzip
+import os
+import pickle
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# CSV header -> EquipmentData field
+COLUMNS = {
+    'Equipment Name': 'equipment_name',
+    'Type': 'equipment_type',
+    'Flowrate': 'flowrate',
+    'Pressure': 'pressure',
+    'Temperature': 'temperature',
+}
+TEXT_COLUMNS = ('equipment_name', 'equipment_type')
+NUMERIC_COLUMNS = ('flowrate', 'pressure', 'temperature')
+
+def _bad_lines(mask, first_line):
+    """Return a short, human readable list of the CSV line numbers flagged in mask."""
+    rows = np.flatnonzero(mask)
+    lines = ', '.join(str(first_line + r) for r in rows[:5])
+    if len(rows) > 5:
+        lines += f" (+{len(rows) - 5} more)"
+    return lines
+
+
+def clean_frame(df, first_line=2):
+    """
+    Validate the five equipment columns and coerce them to their model types.
+
+    Returns a new frame whose columns are named after the EquipmentData fields.
+    Raises ValueError naming the offending CSV lines if anything is missing or
+    not numeric. ``first_line`` is the CSV line number of the frame's first row.
+    """
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = [c for c in COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    df = df[list(COLUMNS)].rename(columns=COLUMNS)
+
+    for col in TEXT_COLUMNS:
+        empty = df[col].isna().to_numpy()
+        if empty.any():
+            raise ValueError(f"Missing {col} on line(s) {_bad_lines(empty, first_line)}")
+        df[col] = df[col].astype(str).str.strip()
+
+    for col in NUMERIC_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64')
+        invalid = ~np.isfinite(values)
+        if invalid.any():
+            raise ValueError(f"Invalid {col} value on line(s) {_bad_lines(invalid, first_line)}")
+        df[col] = values
+
+    return df
+
+
+def open_csv(fileobj):
+    """
+    A binary stream of the CSV in ``fileobj``, decompressing it if needed.
+
+    ``fileobj`` must be seekable (stored uploads are). Zip archives must hold
+    exactly one CSV; several belong in a batch upload.
+    """
+    magic = fileobj.read(4)
+    fileobj.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise ValueError("zstd-compressed uploads need the zstandard package on the server")
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    if magic == ZIP_MAGIC:
+        archive = zipfile.ZipFile(fileobj)
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and info.filename.lower().endswith('.csv')
+                   and not info.filename.startswith('__MACOSX/')]
+        if len(members) != 1:
+            raise ValueError(f"A zip upload must contain exactly one CSV file, not {len(members)}; "
+                             "upload several through /api/upload/batch/")
+        return archive.open(members[0])
+    return fileobj
+
+
+def read_frames(fileobj, chunk_size):
+    """Yield the CSV in ``fileobj`` as cleaned frames of ``chunk_size`` rows."""
+    rows = 0
+    for chunk in pd.read_csv(open_csv(fileobj), chunksize=chunk_size):
+        frame = clean_frame(chunk, first_line=rows + 2)
+        rows += len(frame)
+        yield frame
+
+
+def parse_file(path, chunk_size, spool_dir=None):
+    """
+    Parse the CSV at ``path`` completely; the batch upload's process-pool entry point.
+
+    The cleaned frames are pickled one after another into a spool file in
+    ``spool_dir`` instead of being returned, so neither this process nor the
+    one reading them back holds more than a frame at a time. Returns
+    ``(spool_path, rows)`` for ``spooled_frames``; the caller deletes the
+    file. Raises ValueError like ``clean_frame``, leaving no file behind.
+    """
+    fd, spool = tempfile.mkstemp(suffix='.frames', dir=spool_dir)
+    rows = 0
+    try:
+        with os.fdopen(fd, 'wb') as out, open(path, 'rb') as f:
+            for frame in read_frames(f, chunk_size):
+                pickle.dump(frame, out, protocol=pickle.HIGHEST_PROTOCOL)
+                rows += len(frame)
+    except BaseException:
+        os.unlink(spool)
+        raise
+    return spool, rows
+
+
+def spooled_frames(spool):
+    """Yield the frames ``parse_file`` spooled, one at a time."""
+    with open(spool, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
@@ -0,0 +1,217 @@
+"""
+Response encoders for the bulk equipment data endpoints.
+
+orjson is used when installed (it is several times faster than the standard
+library for large arrays of numbers); otherwise we fall back to ``json``.
+Arrow IPC and Parquet output need pyarrow; without it only the raw float64
+format is offered and other Accept types get 406.
+"""
+import csv
+import io
+import json
+import zlib
+
+import numpy as np
+from django.http import HttpResponse
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# EquipmentData field -> CSV header, so exports can be uploaded again
+CSV_HEADERS = {
+    'id': 'id',
+    'equipment_name': 'Equipment Name',
+    'equipment_type': 'Type',
+    'flowrate': 'Flowrate',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+}
+
+
+def dumps(payload):
+    """Encode ``payload`` (dicts, lists, tuples, str/int/float/None) to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def fast_json_response(payload, status=200):
+    """An HttpResponse that skips DRF's renderer machinery for bulk payloads."""
+    return HttpResponse(dumps(payload), status=status, content_type='application/json')
+
+
+class StreamingFrameRenderer(BaseRenderer):
+    """
+    Base for binary column formats of the equipment data endpoint.
+
+    The view uses these for content negotiation (Accept header or ?format=) and
+    then streams ``stream(chunks, fields)`` where chunks are lists of
+    ``values_list`` tuples. ``render`` only ever sees error payloads, which are
+    sent as JSON.
+    """
+    charset = None
+    fields = None  # restrict to these columns (None = any)
+    default_fields = None  # columns sent when ?fields= is absent (None = all)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return dumps(data)
+
+    def stream(self, chunks, fields):
+        raise NotImplementedError
+
+
+class Float64Renderer(StreamingFrameRenderer):
+    """
+    Raw little-endian float64, row-major: ``np.frombuffer(body, '<f8').reshape(-1, len(columns))``.
+
+    Only the numeric columns are available; their order is sent in X-Columns.
+    """
+    media_type = 'application/octet-stream'
+    format = 'f8'
+    fields = ('flowrate', 'pressure', 'temperature')
+
+    def stream(self, chunks, fields):
+        for rows in chunks:
+            yield np.asarray(rows, dtype='<f8').tobytes()
+
+
+class CSVRenderer(StreamingFrameRenderer):
+    """CSV with the upload's original headers (without id by default), re-uploadable as is."""
+    media_type = 'text/csv'
+    format = 'csv'
+    default_fields = ('equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+
+    def stream(self, chunks, fields):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow([CSV_HEADERS[f] for f in fields])
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+
+
+class NDJSONRenderer(StreamingFrameRenderer):
+    """Newline-delimited JSON, one object per row."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def stream(self, chunks, fields):
+        for rows in chunks:
+            yield b''.join(dumps(dict(zip(fields, row))) + b'\n' for row in rows)
+
+
+def compressors():
+    """Content-Encodings we can produce, in order of preference."""
+    return (['zstd'] if zstandard is not None else []) + ['gzip']
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick our preferred compression among those in an Accept-Encoding header, or None."""
+    accepted = set()
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name.strip().lower())
+    for encoding in compressors():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of byte strings incrementally with gzip or zstd."""
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only buffer the Arrow writers append to and the response drains."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+if pa is not None:
+    ARROW_TYPES = {
+        'id': pa.int64(),
+        'equipment_name': pa.string(),
+        'equipment_type': pa.string(),
+        'flowrate': pa.float64(),
+        'pressure': pa.float64(),
+        'temperature': pa.float64(),
+    }
+
+    def _record_batch(rows, schema):
+        return pa.record_batch([pa.array(column, type=field.type)
+                                for column, field in zip(zip(*rows), schema)], schema=schema)
+
+    class ArrowStreamRenderer(StreamingFrameRenderer):
+        """Apache Arrow IPC stream, one record batch per database chunk."""
+        media_type = 'application/vnd.apache.arrow.stream'
+        format = 'arrow'
+
+        def stream(self, chunks, fields):
+            schema = pa.schema([(f, ARROW_TYPES[f]) for f in fields])
+            sink = _Sink()
+            with pa.ipc.new_stream(sink, schema) as writer:
+                for rows in chunks:
+                    writer.write_batch(_record_batch(rows, schema))
+                    yield sink.drain()
+            yield sink.drain()
+
+    class ParquetRenderer(StreamingFrameRenderer):
+        """Parquet file, one row group per database chunk."""
+        media_type = 'application/vnd.apache.parquet'
+        format = 'parquet'
+
+        def stream(self, chunks, fields):
+            schema = pa.schema([(f, ARROW_TYPES[f]) for f in fields])
+            sink = _Sink()
+            with pq.ParquetWriter(sink, schema) as writer:
+                for rows in chunks:
+                    writer.write_batch(_record_batch(rows, schema))
+                    yield sink.drain()
+            yield sink.drain()
+
+    FRAME_RENDERERS = [ArrowStreamRenderer, ParquetRenderer, Float64Renderer]
+else:
+    FRAME_RENDERERS = [Float64Renderer]
@@ -0,0 +1,273 @@
+"""
+PDF reports as cached artifacts.
+
+A report is identified by its upload and normalised options (detail level,
+filters, ordering). It is rendered once on a small report worker pool, apart
+from the ingest pool so a long report never holds up uploads, into
+MEDIA_ROOT/reports/<upload_id>/<key>.pdf; later requests are served straight
+from disk and the files go when their upload is deleted.
+
+``detail`` is 'summary' unless asked for. The 'top' and 'full' detail tables
+are drawn directly onto the canvas a page at a time from a DB (or column
+store) cursor rather than built as platypus flowables, so memory does not
+grow with the number of rows.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import QueryDict
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Frame, Table, TableStyle, Paragraph, Spacer
+from rest_framework.exceptions import ValidationError
+
+from .columnar import equipment_chunks
+from .filters import NUMERIC_FIELDS, parse_ordering
+from .stats import get_statistics
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes so cached PDFs are regenerated.
+REPORT_VERSION = 2
+DETAIL_LEVELS = ('summary', 'top', 'full')
+TOP_ROWS = 50
+DETAIL_FIELDS = ('equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+OPTION_KEYS = ('detail', 'ordering', 'equipment_type') + tuple(
+    f'{field}_{bound}' for field in NUMERIC_FIELDS for bound in ('min', 'max'))
+
+# Page geometry of the detail table, in points
+MARGIN = 56
+COLUMN_WIDTHS = (140, 120, 80, 80, 80)
+DETAIL_HEADER = ('Name', 'Type', 'Flowrate', 'Pressure', 'Temperature')
+HEADER_COLOR = colors.HexColor('#334155')
+HEADER_HEIGHT = 18
+ROW_HEIGHT = 12
+FONT_SIZE = 8
+
+_pending = set()
+_pending_lock = threading.Lock()
+_executor = None
+
+
+def report_options(params):
+    """Normalise the report query parameters into a sorted QueryDict."""
+    options = QueryDict(mutable=True)
+    for key in OPTION_KEYS:
+        values = sorted(v for v in params.getlist(key) if v)
+        if values:
+            options.setlist(key, values)
+    detail = options.get('detail', 'summary')
+    if detail not in DETAIL_LEVELS:
+        raise ValidationError({'detail': f"Must be one of {', '.join(DETAIL_LEVELS)}."})
+    options['detail'] = detail
+    parse_ordering(options)  # validate early rather than in the worker
+    return options
+
+
+def report_key(upload, options):
+    raw = f"{REPORT_VERSION}:{upload.pk}:{options.urlencode()}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:20]
+
+
+def report_dir(upload):
+    return Path(settings.MEDIA_ROOT) / 'reports' / str(upload.pk)
+
+
+def report_path(upload, key):
+    return report_dir(upload) / f'{key}.pdf'
+
+
+def error_path(path):
+    return path.with_suffix('.error')
+
+
+def get_report_executor():
+    """Return the process-wide report pool, creating it on first use."""
+    global _executor
+    with _pending_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.REPORT_WORKERS, thread_name_prefix='report')
+        return _executor
+
+
+def schedule_report(upload, options, key):
+    """Render the report on the report pool unless it is already in flight."""
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    if settings.REPORT_WORKERS:
+        get_report_executor().submit(_render_in_worker, upload, options, key)
+    else:
+        _render(upload, options, key)
+
+
+def _render_in_worker(upload, options, key):
+    close_old_connections()
+    try:
+        _render(upload, options, key)
+    finally:
+        connections.close_all()
+
+
+def _render(upload, options, key):
+    path = report_path(upload, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'wb') as f:
+            build_report(f, upload, options)
+        os.replace(tmp, path)  # readers only ever see complete files
+    except Exception as e:
+        logger.exception("Rendering report %s for upload %s failed", key, upload.pk)
+        error_path(path).write_text(str(e))
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+
+def build_report(fileobj, upload, options):
+    """Write the PDF report for ``upload`` to ``fileobj``."""
+    canvas = Canvas(fileobj, pagesize=letter, pageCompression=1)
+    width, height = letter
+    Frame(MARGIN, MARGIN, width - 2 * MARGIN, height - 2 * MARGIN).addFromList(list(_summary_flowables(upload)), canvas)
+
+    detail = options['detail']
+    if detail == 'top':
+        _draw_details(canvas, f"Equipment Details (Top {TOP_ROWS})",
+                      equipment_chunks(upload, options, DETAIL_FIELDS, limit=TOP_ROWS))
+    elif detail == 'full':
+        _draw_details(canvas, "Equipment Details", equipment_chunks(upload, options, DETAIL_FIELDS))
+    canvas.showPage()
+    canvas.save()
+
+
+def _summary_flowables(upload):
+    styles = getSampleStyleSheet()
+
+    # Title
+    title_style = ParagraphStyle(
+        'TitleStyle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#0f172a'),
+        alignment=1,
+        spaceAfter=20
+    )
+    yield Paragraph("Chemical Equipment Report", title_style)
+    yield Spacer(1, 10)
+
+    # Metadata
+    meta_style = ParagraphStyle(
+        'Meta',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.gray
+    )
+    username = upload.user.username if upload.user else 'Unknown'
+    yield Paragraph(
+        f"<b>Upload ID:</b> {upload.pk} | <b>User:</b> {username} | <b>Date:</b> {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}",
+        meta_style)
+    yield Spacer(1, 20)
+
+    stats = get_statistics(upload)
+    averages = stats.averages()
+
+    # Summary Table
+    summary_data = [
+        ['Metric', 'Value'],
+        ['Total Records', str(stats.total_count)],
+        ['Average Flowrate', f"{averages['avg_flowrate']:.2f}" if averages['avg_flowrate'] else "0"],
+        ['Average Pressure', f"{averages['avg_pressure']:.2f}" if averages['avg_pressure'] else "0"],
+        ['Average Temperature', f"{averages['avg_temperature']:.2f}" if averages['avg_temperature'] else "0"]
+    ]
+
+    summary_table = Table(summary_data, colWidths=[250, 200])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (1, 0), colors.HexColor('#0ea5e9')),
+        ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f9ff')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bae6fd')),
+    ]))
+
+    yield Paragraph("Summary Statistics", styles['Heading2'])
+    yield summary_table
+
+
+def _fit(text, width, font, size):
+    """``text`` cut down to fit ``width`` points."""
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + '...', font, size) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def _draw_row(canvas, values, left, y, font, text_color):
+    x = left
+    canvas.setFillColor(text_color)
+    canvas.setFont(font, FONT_SIZE)
+    for value, width in zip(values, COLUMN_WIDTHS):
+        canvas.drawCentredString(x + width / 2, y + 3.5, _fit(value, width - 4, font, FONT_SIZE))
+        x += width
+
+
+def _draw_details(canvas, title, chunks):
+    """
+    Draw the detail table straight onto the canvas, one page at a time.
+
+    Rows are read from ``chunks`` as each page needs them and drawn as plain
+    text and lines, so no per-row objects outlive their page whatever the
+    upload size. Every page starts with the table header.
+    """
+    width, height = letter
+    left = (width - sum(COLUMN_WIDTHS)) / 2
+    right = left + sum(COLUMN_WIDTHS)
+    rows = chain.from_iterable(chunks)
+    row = next(rows, None)
+    heading = Paragraph(title, getSampleStyleSheet()['Heading2'])
+    first = True
+    while first or row is not None:
+        canvas.showPage()
+        top = height - MARGIN
+        if first:
+            _, heading_height = heading.wrapOn(canvas, width - 2 * MARGIN, height)
+            heading.drawOn(canvas, MARGIN, top - heading_height)
+            top -= heading_height + 6
+            first = False
+
+        # Header band
+        y = top - HEADER_HEIGHT
+        canvas.setFillColor(HEADER_COLOR)
+        canvas.rect(left, y, right - left, HEADER_HEIGHT, stroke=0, fill=1)
+        _draw_row(canvas, DETAIL_HEADER, left, y + 3, 'Helvetica-Bold', colors.whitesmoke)
+
+        # As many rows as fit above the bottom margin
+        body_top = y
+        while row is not None and y - ROW_HEIGHT >= MARGIN:
+            y -= ROW_HEIGHT
+            canvas.setFillColor(colors.whitesmoke)
+            canvas.rect(left, y, right - left, ROW_HEIGHT, stroke=0, fill=1)
+            name, kind, flow, press, temp = row
+            _draw_row(canvas, (str(name), str(kind), str(flow), str(press), str(temp)), left, y, 'Helvetica',
+                      colors.black)
+            row = next(rows, None)
+
+        canvas.setStrokeColor(colors.grey)
+        canvas.setLineWidth(0.5)
+        canvas.grid([left + sum(COLUMN_WIDTHS[:i]) for i in range(len(COLUMN_WIDTHS) + 1)],
+                    [top] + [body_top - i * ROW_HEIGHT for i in range(int(round((body_top - y) / ROW_HEIGHT)) + 1)])
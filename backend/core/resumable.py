@@ -0,0 +1,225 @@
+"""
+Resumable chunked uploads (/api/upload/sessions/).
+
+    POST   upload/sessions/                  {filename, size[, sha256, chunk_size]} -> session
+    PUT    upload/sessions/<id>/             one chunk, with
+                                                 Content-Range: bytes <first>-<last>/<size>
+                                                 X-Chunk-SHA256: <hex digest of the chunk>
+    GET    upload/sessions/<id>/             the session and the chunks still ``missing``
+    POST   upload/sessions/<id>/complete/    assemble and start ingestion, like /api/upload/
+    DELETE upload/sessions/<id>/             abandon it
+
+The file is split into ``chunk_size`` pieces (the last one may be shorter)
+that may arrive in any order, concurrently and more than once. Each chunk is
+streamed from the request into a file of its own in small reads, so neither
+a chunk nor the file is ever held in memory, and only once its checksum
+matches is it copied to its offset in MEDIA_ROOT/partial/<id>.part and
+recorded; a corrupt resend never touches data already received. After a
+dropped connection the client asks for the session and sends what is
+missing. Sessions left alone for UPLOAD_SESSION_TTL seconds are deleted with
+their partial files.
+"""
+import datetime
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from .jobs import start_ingest
+from .models import UploadChunk, UploadHistory, UploadSession
+from .uploads import find_original, link_duplicate
+
+READ_SIZE = 64 * 1024
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+MIN_CHUNK_SIZE = 256 * 1024
+
+
+class SessionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This upload session is already being completed."
+    default_code = 'conflict'
+
+
+def partial_path(session):
+    return Path(settings.MEDIA_ROOT) / 'partial' / f'{session.pk}.part'
+
+
+def delete_partial(session):
+    partial_path(session).unlink(missing_ok=True)
+
+
+def expire_sessions():
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff):
+        session.delete()  # The post_delete signal removes the partial file
+
+
+def create_session(user, data):
+    """Validate an init request and open a session with an empty partial file."""
+    expire_sessions()
+    filename = posixpath.basename(str(data.get('filename', '')).replace('\\', '/')).strip()
+    if not filename:
+        raise ValidationError({'filename': "This field is required."})
+    size = _int(data, 'size', required=True)
+    if not 0 < size <= settings.UPLOAD_SESSION_MAX_BYTES:
+        raise ValidationError({'size': f"Must be between 1 and {settings.UPLOAD_SESSION_MAX_BYTES} bytes."})
+    chunk_size = _int(data, 'chunk_size') or settings.UPLOAD_CHUNK_SIZE
+    if not MIN_CHUNK_SIZE <= chunk_size <= settings.UPLOAD_CHUNK_SIZE_MAX:
+        raise ValidationError({'chunk_size': f"Must be between {MIN_CHUNK_SIZE} and {settings.UPLOAD_CHUNK_SIZE_MAX}."})
+    sha256 = str(data.get('sha256') or '').lower()
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        raise ValidationError({'sha256': "Must be a hex SHA-256 digest."})
+
+    session = UploadSession.objects.create(user=user, filename=filename, size=size, chunk_size=chunk_size,
+                                           sha256=sha256)
+    path = partial_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    return session
+
+
+def _int(data, name, required=False):
+    value = data.get(name)
+    if value in (None, ''):
+        if required:
+            raise ValidationError({name: "This field is required."})
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: "Must be an integer."})
+
+
+def missing_chunks(session):
+    received = set(session.chunks.values_list('index', flat=True))
+    return [i for i in range(session.chunk_count) if i not in received]
+
+
+def write_chunk(session, request):
+    """
+    Store the chunk in ``request``'s body at the offset its Content-Range gives.
+
+    Returns the chunk index. Raises ValidationError for a range that is not a
+    whole chunk, a short body or a checksum mismatch; nothing is recorded then
+    and the client simply sends the chunk again.
+    """
+    match = CONTENT_RANGE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+    if not match:
+        raise ValidationError({'Content-Range': "Expected 'bytes <first>-<last>/<size>'."})
+    first, last, size = map(int, match.groups())
+    index, remainder = divmod(first, session.chunk_size)
+    if size != session.size or remainder or index >= session.chunk_count \
+            or last - first + 1 != session.chunk_length(index):
+        raise ValidationError({'Content-Range': f"Not a chunk of this upload (chunk_size {session.chunk_size}, "
+                                                f"size {session.size})."})
+    expected = request.META.get('HTTP_X_CHUNK_SHA256', '').lower()
+    if not expected:
+        raise ValidationError({'X-Chunk-SHA256': "This header is required."})
+
+    length = last - first + 1
+    digest = hashlib.sha256()
+    path = partial_path(session)
+    fd, spool = tempfile.mkstemp(prefix=f'{session.pk}.{index}.', suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w+b') as chunk:
+            remaining = length
+            while remaining:
+                data = request.stream.read(min(READ_SIZE, remaining)) if request.stream else b''
+                if not data:
+                    raise ValidationError({'detail': f"Chunk {index} ended after {length - remaining} of {length} bytes."})
+                digest.update(data)
+                chunk.write(data)
+                remaining -= len(data)
+            if digest.hexdigest() != expected:
+                raise ValidationError({'X-Chunk-SHA256': f"Checksum mismatch for chunk {index}."})
+            chunk.seek(0)
+            try:
+                with open(path, 'r+b') as f:
+                    f.seek(first)
+                    shutil.copyfileobj(chunk, f, READ_SIZE)
+            except FileNotFoundError:
+                raise NotFound("Upload session not found or expired")  # Completed or expired meanwhile
+    finally:
+        os.unlink(spool)
+
+    try:
+        UploadChunk.objects.update_or_create(session=session, index=index, defaults={'sha256': expected})
+    except IntegrityError:
+        pass  # The same chunk arrived twice at once; either copy will do
+    # Keep the session alive while chunks keep coming
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+    return index
+
+
+def finalize(session):
+    """
+    Turn a fully received session into an upload and start ingesting it.
+
+    Returns ``(upload, job, original)``, where ``original`` is the upload the
+    content duplicates (core/uploads.py) or None. The session is deleted.
+    Raises SessionConflict if another request completed the session first.
+    """
+    with transaction.atomic():
+        # Row lock: a second complete waits here, then finds the session gone
+        try:
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        except UploadSession.DoesNotExist:
+            raise SessionConflict()
+        missing = missing_chunks(session)
+        if missing:
+            raise ValidationError({'missing': missing})
+        path = partial_path(session)
+        try:
+            content_hash = _sha256(path)
+        except FileNotFoundError:
+            raise SessionConflict()  # Moved by a complete that got here first (SQLite has no row locks)
+        matches = not session.sha256 or session.sha256 == content_hash
+        if matches:
+            original = find_original(session.user, content_hash)
+            if original is not None:
+                upload, job = link_duplicate(original, session.user)
+            else:
+                upload, job = _store(session, path, content_hash), None
+            session.delete()
+
+    if not matches:
+        # Every chunk matched its checksum, so the client described a different file
+        session.delete()
+        raise ValidationError({'sha256': "The assembled file does not match the declared SHA-256."})
+    if job is None:
+        job = start_ingest(upload)
+    return upload, job, original
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _store(session, path, content_hash):
+    """Move the assembled file into upload storage and record the upload."""
+    upload = UploadHistory(user=session.user, content_hash=content_hash)
+    field = upload.file.field
+    name = field.storage.get_available_name(field.generate_filename(upload, session.filename))
+    target = Path(field.storage.path(name))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(path, target)
+    except FileNotFoundError:
+        raise SessionConflict()
+    upload.file.name = name
+    upload.save()
+    return upload
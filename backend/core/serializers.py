@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UploadHistory, EquipmentData
+from .models import UploadHistory, EquipmentData, IngestJob, UploadSession
+from .resumable import missing_chunks
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -30,6 +31,17 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
     new_password = serializers.CharField(write_only=True)
 
 class EquipmentDataSerializer(serializers.ModelSerializer):
+    # EquipmentType renders as its name (columnar rows already hold the name)
+    equipment_type = serializers.CharField(read_only=True)
+
+    def __init__(self, *args, **kwargs):
+        # Optional projection: EquipmentDataSerializer(rows, many=True, fields=['id', 'flowrate'])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = EquipmentData
         fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
@@ -40,3 +52,22 @@ class UploadHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadHistory
         fields = ['id', 'uploaded_at', 'file', 'total_records', 'user']
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_count = serializers.IntegerField(read_only=True)
+    missing = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'chunk_size', 'chunk_count', 'missing', 'sha256', 'created_at', 'updated_at']
+
+    def get_missing(self, session):
+        return missing_chunks(session)
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = IngestJob
+        fields = ['id', 'upload', 'status', 'progress', 'bytes_processed', 'bytes_total', 'rows_processed',
+                  'rows_per_sec', 'peak_memory_bytes', 'error', 'created_at', 'started_at', 'finished_at']
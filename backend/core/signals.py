@@ -0,0 +1,67 @@
+"""Signal handlers; connected in CoreConfig.ready()."""
+import shutil
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .analytics import rebuild_day
+from .caching import invalidate_upload
+from .columnar import store_path
+from .models import UploadHistory, UploadSession, UploadStatistics
+from .reports import report_dir
+from .resumable import delete_partial
+
+
+@receiver([post_save, post_delete], sender=UploadHistory)
+def upload_changed(sender, instance, **kwargs):
+    # New, re-counted or deleted uploads change the history listing; a deleted
+    # upload also drops its summary/data/chart entries.
+    invalidate_upload(instance)
+
+
+@receiver(post_delete, sender=UploadHistory)
+def delete_column_files(sender, instance, **kwargs):
+    # After commit: a rolled back delete must keep its files. The path is taken
+    # now, as Django clears the instance's pk once the delete returns.
+    transaction.on_commit(partial(shutil.rmtree, store_path(instance), ignore_errors=True))
+
+
+@receiver(post_delete, sender=UploadHistory)
+def delete_report_files(sender, instance, **kwargs):
+    transaction.on_commit(partial(shutil.rmtree, report_dir(instance), ignore_errors=True))
+
+
+@receiver(post_delete, sender=UploadHistory)
+def rebuild_daily_rollups(sender, instance, **kwargs):
+    # The upload's own rollups went with it (cascade); its day needs re-totalling
+    if instance.user_id:
+        rebuild_day(instance.user_id, timezone.localdate(instance.uploaded_at))
+
+
+@receiver([post_save, post_delete], sender=UploadStatistics)
+def statistics_changed(sender, instance, **kwargs):
+    # Written once ingestion has finished: anything cached while rows were still
+    # arriving is stale.
+    try:
+        invalidate_upload(instance.upload)
+    except UploadHistory.DoesNotExist:
+        pass
+
+
+@receiver(post_delete, sender=UploadSession)
+def delete_partial_file(sender, instance, **kwargs):
+    delete_partial(instance)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
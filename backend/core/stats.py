@@ -0,0 +1,162 @@
+"""
+Per-upload summary statistics.
+
+Statistics are accumulated chunk by chunk while an upload is ingested and
+stored once in UploadStatistics, so the summary and report endpoints read a
+single row instead of aggregating EquipmentData on every request.
+"""
+import math
+
+import numpy as np
+from django.conf import settings
+
+from .columnar import column_store
+from .models import EquipmentData, UploadStatistics
+
+NUMERIC_COLUMNS = ('flowrate', 'pressure', 'temperature')
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class StatisticsAccumulator:
+    """
+    Streaming count/mean/variance/min/max per numeric column, per-type counts
+    and sums, and a uniform row sample for percentiles.
+
+    Means and variances are merged per chunk with Chan's parallel update, so the
+    result does not depend on the chunk size. Percentiles come from a reservoir
+    sample of ``STATS_SAMPLE_SIZE`` rows and are exact for uploads no larger
+    than that.
+    """
+
+    def __init__(self, sample_size=None, seed=0):
+        self.sample_size = sample_size or settings.STATS_SAMPLE_SIZE
+        self.count = 0
+        self.mean = np.zeros(len(NUMERIC_COLUMNS))
+        self.m2 = np.zeros(len(NUMERIC_COLUMNS))
+        self.min = np.full(len(NUMERIC_COLUMNS), np.inf)
+        self.max = np.full(len(NUMERIC_COLUMNS), -np.inf)
+        self.sample = np.empty((0, len(NUMERIC_COLUMNS)))
+        self.types = {}  # type -> [count, sum per numeric column...]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, df):
+        """Fold a cleaned ingest frame (EquipmentData field names) into the totals."""
+        values = df[list(NUMERIC_COLUMNS)].to_numpy(dtype='float64')
+        self.update_arrays(df['equipment_type'].to_numpy(), values)
+
+    def update_arrays(self, types, values):
+        n = len(values)
+        if not n:
+            return
+
+        chunk_mean = values.mean(axis=0)
+        chunk_m2 = ((values - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + chunk_m2 + delta ** 2 * self.count * n / total
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        self._sample_rows(values)
+        self.count = total
+
+        labels, inverse = np.unique(types.astype(str), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(labels))
+        sums = np.stack([np.bincount(inverse, weights=values[:, i], minlength=len(labels))
+                         for i in range(len(NUMERIC_COLUMNS))], axis=1)
+        for label, c, s in zip(labels, counts, sums):
+            entry = self.types.setdefault(str(label), [0] + [0.0] * len(NUMERIC_COLUMNS))
+            entry[0] += int(c)
+            for i, v in enumerate(s, start=1):
+                entry[i] += float(v)
+
+    def _sample_rows(self, values):
+        # Algorithm R, vectorised over the chunk: row t (0-based, global) replaces
+        # a random slot j in [0, t] when j falls inside the reservoir.
+        free = self.sample_size - len(self.sample)
+        if free > 0:
+            self.sample = np.concatenate([self.sample, values[:free]])
+            values = values[free:]
+        if not len(values):
+            return
+        seen = self.count + max(free, 0)
+        slots = self._rng.integers(0, np.arange(seen, seen + len(values)) + 1)
+        keep = slots < self.sample_size
+        self.sample[slots[keep]] = values[keep]
+
+    def result(self):
+        """Return the model field values for UploadStatistics."""
+        columns = {}
+        percentiles = (np.percentile(self.sample, PERCENTILES, axis=0)
+                       if len(self.sample) else np.full((len(PERCENTILES), len(NUMERIC_COLUMNS)), np.nan))
+        for i, col in enumerate(NUMERIC_COLUMNS):
+            columns[col] = {
+                'count': self.count,
+                'mean': _num(self.mean[i]) if self.count else None,
+                'min': _num(self.min[i]),
+                'max': _num(self.max[i]),
+                'std': _num(math.sqrt(self.m2[i] / (self.count - 1))) if self.count > 1 else None,
+                'percentiles': {f"p{p}": _num(percentiles[j, i]) for j, p in enumerate(PERCENTILES)},
+            }
+
+        type_counts = {}
+        type_means = {}
+        for label in sorted(self.types):
+            count, *sums = self.types[label]
+            type_counts[label] = count
+            type_means[label] = {col: sums[i] / count for i, col in enumerate(NUMERIC_COLUMNS)}
+
+        return {
+            'total_count': self.count,
+            'columns': columns,
+            'type_counts': type_counts,
+            'type_means': type_means,
+        }
+
+
+def _num(value):
+    """Convert a NumPy scalar to a JSON-safe float (None for inf/NaN)."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def save_statistics(upload, accumulator):
+    stats, _ = UploadStatistics.objects.update_or_create(upload=upload, defaults=accumulator.result())
+    return stats
+
+
+def compute_statistics(upload):
+    """Build statistics for an upload ingested before they were kept (one scan)."""
+    accumulator = StatisticsAccumulator()
+    store = column_store(upload, ('equipment_type',) + NUMERIC_COLUMNS)
+    if store is not None:
+        codes = store.type_codes()
+        for start in range(0, store.rows, settings.INGEST_CHUNK_SIZE):
+            stop = start + settings.INGEST_CHUNK_SIZE
+            accumulator.update_arrays(store.types[codes[start:stop]], store.numeric_block(start, stop))
+        return save_statistics(upload, accumulator)
+
+    rows = EquipmentData.objects.filter(upload=upload).values_list('equipment_type__name', *NUMERIC_COLUMNS)
+    batch = []
+    for row in rows.iterator(chunk_size=settings.INGEST_CHUNK_SIZE):
+        batch.append(row)
+        if len(batch) == settings.INGEST_CHUNK_SIZE:
+            _fold_rows(accumulator, batch)
+            batch = []
+    _fold_rows(accumulator, batch)
+    return save_statistics(upload, accumulator)
+
+
+def _fold_rows(accumulator, rows):
+    if rows:
+        types, *columns = zip(*rows)
+        accumulator.update_arrays(np.array(types, dtype=object), np.column_stack(columns).astype('float64'))
+
+
+def get_statistics(upload):
+    """Return the stored statistics for ``upload``, backfilling them if missing."""
+    upload = upload.data_upload
+    try:
+        return upload.statistics
+    except UploadStatistics.DoesNotExist:
+        return compute_statistics(upload)
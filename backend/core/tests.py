@@ -1,3 +1,1033 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .analytics import rebuild_day
+from .columnar import ColumnStore, column_store, store_path
+from .filters import encode_cursor
+from .ingest import ingest_csv, resource
+from .jobs import _run, start_ingest
+from .parsing import parse_file
+from .renderers import pa, pq, zstandard
+from .reports import report_options, report_path
+from .resumable import MIN_CHUNK_SIZE, SessionConflict, finalize
+from .models import (
+    DailyTypeRollup, EquipmentData, EquipmentType, IngestJob, UploadHistory, UploadSession, UploadStatistics,
+    UploadTypeRollup,
+)
+from .stats import StatisticsAccumulator, compute_statistics
+
+
+def make_csv(rows, start=0):
+    """An equipment CSV of ``rows`` rows alternating Pump/Valve, as bytes."""
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    lines += [f'EQ-{i},{"Pump" if i % 2 else "Valve"},{i},{i / 10},{100 + i}' for i in range(start, start + rows)]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class MediaTestCase(TestCase):
+    """Keeps uploads and column files in a throwaway MEDIA_ROOT, and starts with an empty response cache."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ClientTestCase(MediaTestCase):
+    """A MediaTestCase with ``self.user`` and an API ``self.client`` logged in as them."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('tester', 'tester@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class QueryPlanTests(TestCase):
+    """
+    The hot read paths must be answered through an index, not a table scan.
+
+    Uses SQLite's EXPLAIN QUERY PLAN; a regression here usually means an
+    index from 0005_hot_path_indexes was dropped or a query stopped matching it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', 'planner@example.com', 'pw')
+        cls.upload = UploadHistory.objects.create(user=cls.user, file='uploads/plan.csv', total_records=50)
+        types = (EquipmentType.objects.create(name='Pump'), EquipmentType.objects.create(name='Valve'))
+        EquipmentData.objects.bulk_create(
+            EquipmentData(upload=cls.upload, equipment_name=f'EQ-{i}', equipment_type=types[i % 2],
+                          flowrate=i, pressure=i, temperature=i)
+            for i in range(50)
+        )
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index):
+        plan = self.query_plan(queryset)
+        self.assertIn(index, plan)
+        self.assertNotRegex(plan, r'SCAN \w+(?! USING)( |$)')  # no bare full-table scan
+
+    def test_history_uses_user_recent_index(self):
+        history = (UploadHistory.objects.filter(user=self.user)
+                   .exclude(jobs__status__in=IngestJob.ACTIVE_STATUSES).order_by('-uploaded_at', '-id')[:51])
+        plan = self.query_plan(history)
+        self.assertIn('upload_user_recent_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)  # ordered straight from the index
+
+    def test_history_later_page_seeks_user_recent_index(self):
+        upload = self.upload
+        page = (UploadHistory.objects.filter(user=self.user)
+                .filter(Q(uploaded_at__lt=upload.uploaded_at) | Q(uploaded_at=upload.uploaded_at, id__lt=upload.id))
+                .order_by('-uploaded_at', '-id')[:51])
+        plan = self.query_plan(page)
+        self.assertIn('upload_user_recent_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def view_plans(self, name, **params):
+        """Query plans of the SQL the ``name`` endpoint runs for this upload, by table queried."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse(name, args=[self.upload.id]), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                table = re.search(r'FROM "(\w+)"', query['sql']).group(1)
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.setdefault(table, []).append(' | '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def data_plan(self, **params):
+        """The plan of the page query /api/data/ runs (filters.paginate_values)."""
+        plans = self.view_plans('equipment-list', limit=10, **params)['core_equipmentdata']
+        self.assertEqual(len(plans), 1)
+        return plans[0]
+
+    def test_summary_reads_stored_statistics_by_index(self):
+        compute_statistics(self.upload)
+        plans = self.view_plans('summary')
+        self.assertNotIn('core_equipmentdata', plans)  # statistics are precomputed at ingest
+        for plan in plans['core_uploadstatistics']:
+            self.assertRegex(plan, r'USING (COVERING )?INDEX')
+
+    def test_data_page_is_read_in_id_order_from_upload_index(self):
+        first = self.data_plan()
+        self.assertRegex(first, r'USING (COVERING )?INDEX')
+        self.assertNotIn('TEMP B-TREE', first)  # ordered straight from the index
+        later = self.data_plan(cursor=encode_cursor('id', None, 20))
+        self.assertNotIn('TEMP B-TREE', later)
+
+    def test_data_type_filter_uses_upload_type_index(self):
+        plan = self.data_plan(equipment_type='Pump')  # filtered by name through the EquipmentType join
+        self.assertIn('equipment_upload_type_idx', plan)
+        self.assertNotRegex(plan, r'SCAN core_equipmentdata(?! USING)( |$)')
+
+    def test_sorted_pages_sort_the_filtered_upload(self):
+        # A known limit (see core/filters.py): no index per sortable column, so
+        # pages in another order sort the upload's matching rows each time; the
+        # rows are still found through the upload's indexes, never a table scan
+        for params in ({'ordering': '-flowrate'}, {'equipment_type': 'Pump', 'ordering': 'flowrate'}):
+            with self.subTest(**params):
+                plan = self.data_plan(**params)
+                self.assertIn('TEMP B-TREE FOR ORDER BY', plan)
+                self.assertRegex(plan, r'core_equipmentdata USING (COVERING )?INDEX')
+
+    def test_active_job_check_uses_upload_status_index(self):
+        active = IngestJob.objects.filter(upload=self.upload, status__in=IngestJob.ACTIVE_STATUSES)
+        self.assertUsesIndex(active, 'job_upload_status_idx')
+
+
+class IngestTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('ingester', 'ingester@example.com', 'pw')
+        self.upload = UploadHistory.objects.create(user=self.user, file='uploads/ingest.csv')
+
+    def test_ingests_in_chunks_into_rows_and_columns(self):
+        progress = []
+        with self.settings(EQUIPMENT_STORAGE='both'):
+            report = ingest_csv(self.upload, io.BytesIO(make_csv(25)), chunk_size=10, on_chunk=progress.append)
+
+        self.assertEqual((report['rows'], report['chunks']), (25, 3))
+        self.assertEqual(progress, [10, 20, 25])
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.total_records, 25)
+        rows = EquipmentData.objects.filter(upload=self.upload)
+        self.assertEqual(rows.count(), 25)
+        self.assertEqual(rows.filter(equipment_type__name='Pump').count(), 12)
+        row = rows.get(equipment_name='EQ-7')
+        self.assertEqual((row.flowrate, row.pressure, row.temperature), (7.0, 0.7, 107.0))
+        self.assertEqual(column_store(self.upload).rows, 25)
+
+    @skipUnless(resource is not None, 'getrusage is not available')
+    def test_reports_peak_rss_growth_by_default(self):
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        report = ingest_csv(self.upload, io.BytesIO(make_csv(5)))
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.assertTrue(0 <= report['peak_memory_bytes'] <= after - before)
+
+    def test_reports_peak_memory_when_enabled(self):
+        with self.settings(INGEST_TRACK_MEMORY=True):
+            report = ingest_csv(self.upload, io.BytesIO(make_csv(5)))
+        self.assertGreater(report['peak_memory_bytes'], 0)
+
+    def test_invalid_value_names_the_csv_line(self):
+        data = make_csv(12).replace(b'EQ-11,Pump,11,', b'EQ-11,Pump,fast,')
+        with self.assertRaisesRegex(ValueError, r'Invalid flowrate value on line\(s\) 13'):
+            ingest_csv(self.upload, io.BytesIO(data), chunk_size=5)
+
+    def test_missing_column_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'Missing column'):
+            ingest_csv(self.upload, io.BytesIO(b'Equipment Name,Type\nP-1,Pump\n'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY ingest is PostgreSQL specific')
+class PostgresIngestTests(MediaTestCase):
+    """Run with DATABASE_URL pointing at a PostgreSQL server."""
+
+    def test_copy_round_trips_awkward_text(self):
+        user = User.objects.create_user('copier', 'copier@example.com', 'pw')
+        upload = UploadHistory.objects.create(user=user, file='uploads/copy.csv')
+        data = (b'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+                b'"Pump, ""north""",Pump,1.5,2,3\n'
+                b'"Line\nbreak",Heat Exchanger,4,5,6\n'
+                b'\\N,Valve,7,8,9\n')
+        with self.settings(EQUIPMENT_STORAGE='orm', INGEST_BATCH_SIZE=2):
+            report = ingest_csv(upload, io.BytesIO(data))
+        self.assertEqual(report['rows'], 3)
+        rows = EquipmentData.objects.filter(upload=upload).order_by('id')
+        self.assertEqual([(r.equipment_name, r.equipment_type.name, r.flowrate) for r in rows],
+                         [('Pump, "north"', 'Pump', 1.5), ('Line\nbreak', 'Heat Exchanger', 4.0), ('\\N', 'Valve', 7.0)])
+
+
+class EquipmentTypeTests(TestCase):
+    def forget(self, names):
+        # These rows are rolled back with the test, so their ids must not outlive it
+        for name in names:
+            self.addCleanup(EquipmentType.objects._ids.pop, name, None)
+
+    def test_ids_are_created_once_and_cached_after_commit(self):
+        self.forget(['Cooler', 'Dryer'])
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = EquipmentType.objects.ids_for(np.array(['Cooler', 'Dryer', 'Cooler']))
+        stored = dict(EquipmentType.objects.values_list('name', 'id'))
+        self.assertEqual(ids.tolist(), [stored['Cooler'], stored['Dryer'], stored['Cooler']])
+        with self.assertNumQueries(0):
+            self.assertEqual(EquipmentType.objects.ids_for(['Dryer']).tolist(), [stored['Dryer']])
+
+    def test_uncommitted_ids_are_not_cached(self):
+        self.forget(['Heater'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            EquipmentType.objects.ids_for(['Heater'])
+        self.assertNotIn('Heater', EquipmentType.objects._ids)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(EquipmentType.objects._ids['Heater'], EquipmentType.objects.get(name='Heater').id)
+
+
+@override_settings(INGEST_WORKERS=0)
+class FileUploadTests(ClientTestCase):
+    def upload(self, data, name='plant.csv'):
+        return self.client.post(reverse('file-upload'), {'file': SimpleUploadedFile(name, data)}, format='multipart')
+
+    def test_upload_spooled_to_disk_is_ingested(self):
+        data = make_csv(400)
+        with self.settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024, INGEST_CHUNK_SIZE=64):
+            response = self.upload(data)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['job']['status'], IngestJob.STATUS_DONE)
+        self.assertEqual(response.data['job']['rows_processed'], 400)
+        self.assertEqual(UploadHistory.objects.get(pk=response.data['id']).total_records, 400)
+
+    def test_rejected_csv_is_dropped(self):
+        response = self.upload(b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,x,1,1\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid flowrate', response.data['error'])
+        self.assertFalse(UploadHistory.objects.exists())
+
+
+@override_settings(INGEST_WORKERS=0)
+class ContentEncodingTests(ClientTestCase):
+    def post(self, body, encoding):
+        return self.client.post(reverse('file-upload'), data=body, content_type=MULTIPART_CONTENT,
+                                HTTP_CONTENT_ENCODING=encoding)
+
+    def body(self, rows):
+        return gzip.compress(encode_multipart(BOUNDARY, {'file': SimpleUploadedFile('plant.csv', make_csv(rows))}))
+
+    def test_gzip_body_is_decoded(self):
+        response = self.post(self.body(300), 'gzip')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['job']['rows_processed'], 300)
+
+    def test_decoded_size_is_capped(self):
+        body = self.body(5000)
+        with self.settings(UPLOAD_MAX_DECODED_BYTES=len(body) * 2):
+            response = self.post(body, 'gzip')
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(UploadHistory.objects.exists())
+
+    def test_unknown_encoding_is_refused(self):
+        response = self.post(self.body(10), 'br')
+        self.assertEqual(response.status_code, 415)
+
+
+@override_settings(INGEST_WORKERS=0, BATCH_PARSE_WORKERS=0, EQUIPMENT_STORAGE='both')
+class DedupeTests(ClientTestCase):
+    def upload(self, data, client=None):
+        return (client or self.client).post(reverse('file-upload'), {'file': SimpleUploadedFile('plant.csv', data)},
+                                            format='multipart')
+
+    def test_same_bytes_share_the_first_upload(self):
+        first = self.upload(make_csv(20)).data['id']
+        response = self.upload(make_csv(20))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['deduplicated_from'], first)
+        self.assertEqual(UploadHistory.objects.get(pk=response.data['id']).source_id, first)
+        self.assertEqual(EquipmentData.objects.count(), 20)
+
+    def test_other_users_original_is_not_named(self):
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', 'other@example.com', 'pw'))
+        self.upload(make_csv(20))
+        with self.settings(UPLOAD_DEDUPE='global'):
+            response = self.upload(make_csv(20), client=other)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertIsNone(response.data['deduplicated_from'])
+        self.assertIsNotNone(UploadHistory.objects.get(pk=response.data['id']).source_id)
+
+    def test_deleting_the_original_moves_data_after_commit(self):
+        original = UploadHistory.objects.get(pk=self.upload(make_csv(20)).data['id'])
+        heir = UploadHistory.objects.get(pk=self.upload(make_csv(20)).data['id'])
+        columns = store_path(original)
+        self.assertTrue(columns.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                original.delete()
+                # Files only move once the delete commits
+                self.assertTrue(columns.exists())
+                self.assertFalse(store_path(heir).exists())
+        heir.refresh_from_db()
+        self.assertIsNone(heir.source_id)
+        self.assertEqual(EquipmentData.objects.filter(upload=heir).count(), 20)
+        self.assertFalse(columns.exists())
+        self.assertEqual(column_store(heir, ('flowrate',)).path, store_path(heir))
+        self.assertTrue(store_path(heir).exists())
+
+    def test_rejected_batch_leaves_no_uploads_or_jobs(self):
+        self.upload(make_csv(20))
+        files = [SimpleUploadedFile('a.csv', make_csv(20)), SimpleUploadedFile('b.csv', make_csv(5, start=50))]
+        with self.settings(BATCH_MAX_FILES=1):
+            response = self.client.post(reverse('batch-upload'), {'files': files}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadHistory.objects.count(), 1)
+        self.assertEqual(IngestJob.objects.count(), 1)
+
+
+@override_settings(INGEST_WORKERS=0, BATCH_PARSE_WORKERS=0)
+class BatchUploadTests(ClientTestCase):
+    def batch(self, *files):
+        return self.client.post(reverse('batch-upload'), {'files': list(files)}, format='multipart')
+
+    def zipped(self, **members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        return buffer.getvalue()
+
+    def test_csvs_and_archive_members_are_ingested(self):
+        response = self.batch(SimpleUploadedFile('a.csv', make_csv(10)),
+                              SimpleUploadedFile('more.zip', self.zipped(**{'b.csv': make_csv(5, start=10)})))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['done'], 2)
+        self.assertEqual(EquipmentData.objects.count(), 15)
+
+    def test_limit_counts_decompressed_bytes(self):
+        data = make_csv(2000)
+        compressed = gzip.compress(data)
+        limit = len(data) // 2
+        self.assertLess(len(compressed), limit)
+        with self.settings(BATCH_MAX_BYTES=limit):
+            for upload in (SimpleUploadedFile('plant.csv', compressed),
+                           SimpleUploadedFile('plant.zip', self.zipped(**{'plant.csv': data}))):
+                response = self.batch(upload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('bytes of CSV data', str(response.data['files']))
+        self.assertFalse(UploadHistory.objects.exists())
+        self.assertFalse(IngestJob.objects.exists())
+
+    def test_parsed_frames_are_spooled_and_removed(self):
+        upload = UploadHistory(user=self.user)
+        upload.file.save('spool.csv', ContentFile(make_csv(300)))
+        parsed = Future()
+        parsed.set_result(parse_file(upload.file.path, 64, settings.MEDIA_ROOT))
+        spool, rows = parsed.result()
+        self.assertEqual(rows, 300)
+        job = IngestJob.objects.create(user=self.user, upload=upload, bytes_total=upload.file.size)
+        _run(job, parsed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.STATUS_DONE)
+        self.assertEqual(job.rows_processed, 300)
+        self.assertFalse(os.path.exists(spool))
+
+
+@override_settings(INGEST_WORKERS=0)
+class ResumableUploadTests(ClientTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = make_csv(10000)
+        self.chunk_size = MIN_CHUNK_SIZE
+        self.assertGreater(len(self.data), self.chunk_size)
+
+    def start(self, sha256=None):
+        body = {'filename': 'big.csv', 'size': len(self.data), 'chunk_size': self.chunk_size}
+        if sha256:
+            body['sha256'] = sha256
+        response = self.client.post(reverse('upload-sessions'), body, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def send(self, session_id, index, data=None, checksum=None):
+        first = index * self.chunk_size
+        chunk = self.data[first:first + self.chunk_size]
+        return self.client.put(reverse('upload-session', args=[session_id]), data=data or chunk,
+                               content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {first}-{first + len(chunk) - 1}/{len(self.data)}',
+                               HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest())
+
+    def complete(self, session_id):
+        return self.client.post(reverse('upload-session-complete', args=[session_id]))
+
+    def test_corrupt_resend_keeps_the_received_chunk(self):
+        session_id = self.start(hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(self.send(session_id, 0).status_code, 200)
+        corrupt = b'x' * self.chunk_size
+        response = self.send(session_id, 0, data=corrupt)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Checksum mismatch', str(response.data))
+        self.assertEqual(self.send(session_id, 1).status_code, 200)
+
+        response = self.complete(session_id)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['job']['rows_processed'], 10000)
+        self.assertEqual(list(Path(settings.MEDIA_ROOT, 'partial').iterdir()), [])
+
+    def test_declared_sha256_must_match(self):
+        session_id = self.start('0' * 64)
+        for index in (0, 1):
+            self.send(session_id, index)
+        response = self.complete(session_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sha256', response.data)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(UploadHistory.objects.exists())
+
+    def test_second_complete_conflicts(self):
+        session_id = self.start()
+        for index in (0, 1):
+            self.send(session_id, index)
+        self.assertEqual(self.complete(session_id).status_code, 201)
+        self.assertEqual(self.complete(session_id).status_code, 404)
+        session = UploadSession(pk=session_id, user=self.user)
+        with self.assertRaises(SessionConflict):
+            finalize(session)
+        self.assertEqual(UploadHistory.objects.count(), 1)
+
+
+class IngestJobTests(ClientTestCase):
+    def stored_upload(self, data):
+        upload = UploadHistory(user=self.user)
+        upload.file.save('job.csv', ContentFile(data))
+        return upload
+
+    def test_job_is_queued_until_committed(self):
+        upload = self.stored_upload(make_csv(10))
+        with self.settings(INGEST_WORKERS=2), self.captureOnCommitCallbacks() as callbacks:
+            job = start_ingest(upload)
+        self.assertEqual(len(callbacks), 1)  # handed to the pool only after commit
+        self.assertEqual(job.status, IngestJob.STATUS_QUEUED)
+        response = self.client.get(reverse('summary', args=[upload.id]))
+        self.assertEqual(response.status_code, 409)
+
+        _run(job)
+        response = self.client.get(reverse('job-status', args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], IngestJob.STATUS_DONE)
+        self.assertEqual(response.data['rows_processed'], 10)
+        self.assertEqual(response.data['progress'], 1.0)
+
+    def test_failed_job_drops_the_upload(self):
+        upload = self.stored_upload(b'Equipment Name,Type\nP-1,Pump\n')
+        with self.settings(INGEST_WORKERS=0):
+            job = start_ingest(upload)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.STATUS_FAILED)
+        self.assertIn('Missing column', job.error)
+        self.assertIsNone(job.upload)
+        self.assertFalse(UploadHistory.objects.filter(pk=upload.pk).exists())
+
+    def test_lost_jobs_are_failed_and_their_uploads_dropped(self):
+        lost = self.stored_upload(make_csv(10))
+        with self.settings(INGEST_WORKERS=2), self.captureOnCommitCallbacks():
+            job = start_ingest(lost)  # queued, but its worker never runs it
+        alive = IngestJob.objects.create(user=self.user, status=IngestJob.STATUS_RUNNING)
+        IngestJob.objects.filter(pk=job.pk).update(
+            status=IngestJob.STATUS_RUNNING, heartbeat_at=timezone.now() - datetime.timedelta(hours=2))
+
+        response = self.client.get(reverse('job-status', args=[job.id]))
+        self.assertEqual(response.data['status'], IngestJob.STATUS_FAILED)
+        self.assertIn('interrupted', response.data['error'])
+        self.assertFalse(UploadHistory.objects.filter(pk=lost.pk).exists())
+        alive.refresh_from_db()
+        self.assertEqual(alive.status, IngestJob.STATUS_RUNNING)
+
+    def test_worker_skips_a_job_failed_while_queued(self):
+        upload = self.stored_upload(make_csv(10))
+        with self.settings(INGEST_WORKERS=2), self.captureOnCommitCallbacks():
+            job = start_ingest(upload)
+        IngestJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(hours=2))
+        call_command('fail_stale_jobs', stdout=io.StringIO())
+        _run(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.STATUS_FAILED)
+        self.assertFalse(EquipmentData.objects.exists())
+
+    def test_other_users_job_is_not_found(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        job = IngestJob.objects.create(user=other)
+        response = self.client.get(reverse('job-status', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class HistoryDeltaTests(ClientTestCase):
+    def add(self, status=IngestJob.STATUS_DONE):
+        upload = UploadHistory.objects.create(user=self.user, file='uploads/history.csv')
+        IngestJob.objects.create(user=self.user, upload=upload, status=status)
+        return upload
+
+    def history(self, **params):
+        response = self.client.get(reverse('history'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['id'] for item in response.data['results']], response.data['latest_id']
+
+    def test_delta_holds_only_newer_uploads(self):
+        first, second = self.add(), self.add()
+        ids, latest = self.history()
+        self.assertEqual((ids, latest), ([second.id, first.id], second.id))
+        self.assertEqual(self.history(since=latest), ([], second.id))
+        third = self.add()
+        self.assertEqual(self.history(since=latest), ([third.id], third.id))
+
+    def test_uploads_still_ingesting_are_left_for_a_later_delta(self):
+        done = self.add()
+        pending = self.add(IngestJob.STATUS_RUNNING)
+        newer = self.add()
+        ids, latest = self.history()
+        self.assertEqual(ids, [newer.id, done.id])
+        self.assertEqual(latest, pending.id - 1)  # the next delta must not skip it
+
+        IngestJob.objects.filter(upload=pending).update(status=IngestJob.STATUS_DONE)
+        pending.save()  # as the ingest does when it finishes; invalidates the cached listing
+        ids, latest = self.history(since=latest)
+        self.assertEqual((ids, latest), ([newer.id, pending.id], newer.id))
+
+    def test_failed_ingest_is_never_listed(self):
+        upload = UploadHistory(user=self.user)
+        upload.file.save('bad.csv', ContentFile(b'Equipment Name,Type\nP-1,Pump\n'))
+        with self.settings(INGEST_WORKERS=2), self.captureOnCommitCallbacks():
+            job = start_ingest(upload)
+        ids, latest = self.history()
+        self.assertEqual((ids, latest), ([], None))
+        _run(job)
+        self.assertEqual(self.history(), ([], None))
+
+
+class StatisticsTests(MediaTestCase):
+    def frame(self, rows):
+        return pd.read_csv(io.BytesIO(make_csv(rows))).rename(columns={
+            'Equipment Name': 'equipment_name', 'Type': 'equipment_type', 'Flowrate': 'flowrate',
+            'Pressure': 'pressure', 'Temperature': 'temperature'})
+
+    def test_result_does_not_depend_on_chunking(self):
+        df = self.frame(101)
+        whole = StatisticsAccumulator()
+        whole.update(df)
+        chunked = StatisticsAccumulator()
+        for start in range(0, len(df), 7):
+            chunked.update(df.iloc[start:start + 7])
+
+        a, b = whole.result(), chunked.result()
+        self.assertEqual(a['type_counts'], {'Pump': 50, 'Valve': 51})
+        self.assertEqual(a['type_counts'], b['type_counts'])
+        flow = df['flowrate'].to_numpy()
+        for result in (a, b):
+            column = result['columns']['flowrate']
+            self.assertAlmostEqual(column['mean'], flow.mean())
+            self.assertAlmostEqual(column['std'], flow.std(ddof=1))
+            self.assertEqual((column['min'], column['max']), (0.0, 100.0))
+            self.assertAlmostEqual(column['percentiles']['p50'], np.percentile(flow, 50))
+
+    def test_backfill_matches_ingest(self):
+        user = User.objects.create_user('stats', 'stats@example.com', 'pw')
+        for storage in ('orm', 'columnar'):
+            upload = UploadHistory.objects.create(user=user, file='uploads/stats.csv')
+            with self.settings(EQUIPMENT_STORAGE=storage):
+                ingest_csv(upload, io.BytesIO(make_csv(30)), chunk_size=8)
+            stored = UploadStatistics.objects.get(upload=upload)
+            UploadStatistics.objects.filter(upload=upload).delete()
+            upload.refresh_from_db()
+            rebuilt = compute_statistics(upload)
+            self.assertEqual(rebuilt.total_count, 30)
+            self.assertEqual(rebuilt.type_counts, stored.type_counts)
+            self.assertAlmostEqual(rebuilt.columns['pressure']['mean'], stored.columns['pressure']['mean'])
+
+
+class EquipmentPaginationTests(ClientTestCase):
+    def ingest(self, storage):
+        upload = UploadHistory.objects.create(user=self.user, file='uploads/pages.csv')
+        with self.settings(EQUIPMENT_STORAGE=storage):
+            ingest_csv(upload, io.BytesIO(make_csv(25)))
+        return upload
+
+    def pages(self, upload, **params):
+        url, names = reverse('equipment-list', args=[upload.id]), []
+        cursor = None
+        while True:
+            query = dict(params, limit=10, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200, response.content)
+            names += [row['equipment_name'] for row in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                return names
+
+    def test_cursor_pages_cover_every_row_once(self):
+        for storage in ('orm', 'columnar'):
+            with self.subTest(storage=storage):
+                upload = self.ingest(storage)
+                self.assertEqual(self.pages(upload), [f'EQ-{i}' for i in range(25)])
+                self.assertEqual(self.pages(upload, ordering='-flowrate'), [f'EQ-{i}' for i in range(24, -1, -1)])
+                by_type = self.pages(upload, ordering='equipment_type')
+                self.assertEqual(len(by_type), 25)
+                self.assertEqual(by_type[:12], [f'EQ-{i}' for i in range(1, 25, 2)])  # Pump before Valve, by id
+
+    def test_search_matches_name_or_type_across_pages(self):
+        for storage in ('orm', 'columnar'):
+            with self.subTest(storage=storage):
+                upload = self.ingest(storage)
+                self.assertEqual(self.pages(upload, search='pUMP', ordering='-flowrate'),
+                                 [f'EQ-{i}' for i in range(23, 0, -2)])
+                self.assertEqual(self.pages(upload, search='eq-2'), ['EQ-2'] + [f'EQ-{i}' for i in range(20, 25)])
+
+    def test_column_store_sorts_once_for_all_pages(self):
+        upload = self.ingest('columnar')
+        with mock.patch.object(ColumnStore, '_select', autospec=True, side_effect=ColumnStore._select) as select:
+            by_type = self.pages(upload, ordering='-equipment_type')
+            self.assertEqual(self.pages(upload, ordering='equipment_type')[::-1], by_type)
+        self.assertEqual(by_type[:13], [f'EQ-{i}' for i in range(24, -1, -2)])  # Valve before Pump, by -id
+        self.assertEqual(select.call_count, 1)  # Both directions share one ascending selection
+
+    def test_rows_and_columnar_layouts_match_records(self):
+        for storage in ('orm', 'columnar'):
+            with self.subTest(storage=storage):
+                upload = self.ingest(storage)
+                url = reverse('equipment-list', args=[upload.id])
+                query = {'equipment_type': 'Pump', 'ordering': '-pressure', 'limit': 5}
+                records = self.client.get(url, query).json()
+                rows = self.client.get(url, dict(query, layout='rows')).json()
+                columnar = self.client.get(url, dict(query, layout='columnar')).json()
+
+                self.assertEqual(len(records['results']), 5)
+                self.assertEqual([dict(zip(rows['columns'], row)) for row in rows['rows']], records['results'])
+                columns = columnar['columns']
+                self.assertEqual([dict(zip(columns, values)) for values in zip(*columns.values())], records['results'])
+                for payload in (rows, columnar):
+                    self.assertEqual(payload['next_cursor'], records['next_cursor'])
+                self.assertEqual(self.client.get(url, dict(query, layout='csv')).status_code, 400)
+
+    def test_fields_are_projected(self):
+        upload = self.ingest('orm')
+        response = self.client.get(reverse('equipment-list', args=[upload.id]), {'fields': 'flowrate', 'limit': 1})
+        self.assertEqual(response.json()['results'], [{'id': EquipmentData.objects.filter(upload=upload).first().id,
+                                                        'flowrate': 0.0}])
+
+    def test_bad_cursor_is_rejected(self):
+        bad = {
+            'garbage': 'not-a-cursor',
+            'not a list': base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+            'string id': encode_cursor('id', None, '5'),
+            'text for a number': encode_cursor('flowrate', 'hot', 5),
+            'number for text': encode_cursor('equipment_name', 3, 5),
+            'missing value': encode_cursor('id', None, 5),
+        }
+        for storage in ('orm', 'columnar'):
+            upload = self.ingest(storage)
+            url = reverse('equipment-list', args=[upload.id])
+            for name, cursor in bad.items():
+                ordering = 'equipment_name' if name in ('number for text', 'missing value') else 'flowrate'
+                with self.subTest(storage=storage, cursor=name):
+                    response = self.client.get(url, {'cursor': cursor, 'ordering': ordering})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('cursor', response.json())
+
+
+class FrameFormatTests(ClientTestCase):
+    """The binary formats of /api/data/ decode to the same rows as the JSON pages."""
+
+    def setUp(self):
+        super().setUp()
+        self.uploads = {}
+        for storage in ('orm', 'columnar'):
+            upload = UploadHistory.objects.create(user=self.user, file='uploads/frames.csv')
+            with self.settings(EQUIPMENT_STORAGE=storage):
+                ingest_csv(upload, io.BytesIO(make_csv(25)))
+            self.uploads[storage] = upload
+
+    def records(self, upload, **params):
+        response = self.client.get(reverse('equipment-list', args=[upload.id]), dict(params, limit=1000))
+        return response.json()['results']
+
+    def frame(self, upload, **params):
+        response = self.client.get(reverse('equipment-list', args=[upload.id]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="upload_{upload.id}.{params["format"]}"')
+        return b''.join(response.streaming_content), response['X-Columns'].split(',')
+
+    @skipUnless(pa is not None, 'pyarrow is not installed')
+    def test_arrow_and_parquet_hold_the_filtered_rows(self):
+        query = {'equipment_type': 'Valve', 'ordering': '-temperature'}
+        for storage, upload in self.uploads.items():
+            expected = self.records(upload, **query)
+            self.assertEqual(len(expected), 13)
+            with self.subTest(storage=storage, format='arrow'):
+                body, columns = self.frame(upload, format='arrow', **query)
+                table = pa.ipc.open_stream(body).read_all()
+                self.assertEqual(table.column_names, columns)
+                self.assertEqual(table.to_pylist(), expected)
+            with self.subTest(storage=storage, format='parquet'):
+                body, columns = self.frame(upload, format='parquet', **query)
+                self.assertEqual(pq.read_table(io.BytesIO(body)).to_pylist(), expected)
+
+    def test_f8_is_the_numeric_columns_row_major(self):
+        for storage, upload in self.uploads.items():
+            with self.subTest(storage=storage):
+                body, columns = self.frame(upload, format='f8', flowrate_min=20)
+                self.assertEqual(columns, ['flowrate', 'pressure', 'temperature'])
+                expected = [[row[c] for c in columns] for row in self.records(upload, flowrate_min=20)]
+                self.assertEqual(np.frombuffer(body, '<f8').reshape(-1, len(columns)).tolist(), expected)
+
+                body, columns = self.frame(upload, format='f8', fields='temperature')
+                self.assertEqual(columns, ['temperature'])
+                self.assertEqual(np.frombuffer(body, '<f8').tolist(), [100.0 + i for i in range(25)])
+
+    def test_f8_refuses_text_columns(self):
+        response = self.client.get(reverse('equipment-list', args=[self.uploads['orm'].id]),
+                                   {'format': 'f8', 'fields': 'flowrate,equipment_name'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+
+class ExportTests(ClientTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload = UploadHistory.objects.create(user=self.user, file='uploads/export.csv')
+        ingest_csv(self.upload, io.BytesIO(make_csv(25)))
+        self.url = reverse('export', args=[self.upload.id])
+
+    def export(self, **params):
+        headers = {'HTTP_ACCEPT_ENCODING': params.pop('accept_encoding')} if 'accept_encoding' in params else {}
+        response = self.client.get(self.url, params, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_has_the_upload_headers_and_the_filtered_rows(self):
+        response, body = self.export(equipment_type='Pump', ordering='-flowrate')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        frame = pd.read_csv(io.BytesIO(body))
+        self.assertEqual(list(frame.columns), ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+        self.assertEqual(frame['Equipment Name'].tolist(), [f'EQ-{i}' for i in range(23, 0, -2)])
+        self.assertEqual(set(frame['Type']), {'Pump'})
+        self.assertEqual(frame['Temperature'].tolist(), [100.0 + i for i in range(23, 0, -2)])
+
+    def test_ndjson_rows_match_the_data_endpoint(self):
+        response, body = self.export(format='ndjson', fields='id,equipment_name,flowrate')
+        expected = self.client.get(reverse('equipment-list', args=[self.upload.id]),
+                                   {'fields': 'equipment_name,flowrate', 'limit': 1000}).json()['results']
+        self.assertEqual(response['X-Columns'], 'id,equipment_name,flowrate')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], expected)
+
+    def test_compressed_exports_decode_to_the_plain_body(self):
+        plain = self.export(format='ndjson')[1]
+        decoders = {'gzip': gzip.decompress}
+        if zstandard is not None:
+            decoders['zstd'] = lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        for encoding, decode in decoders.items():
+            for params in ({'compression': encoding}, {'accept_encoding': f'{encoding}, br;q=0'}):
+                with self.subTest(**params):
+                    response, body = self.export(format='ndjson', **params)
+                    self.assertEqual(response['Content-Encoding'], encoding)
+                    self.assertEqual(decode(body), plain)
+        self.assertFalse(self.export(compression='none')[0].has_header('Content-Encoding'))
+        self.assertEqual(self.client.get(self.url, {'compression': 'br'}).status_code, 400)
+
+
+@override_settings(REPORT_WORKERS=0)
+class ReportTests(ClientTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload = UploadHistory.objects.create(user=self.user, file='uploads/report.csv')
+        ingest_csv(self.upload, io.BytesIO(make_csv(500)))
+
+    def report(self, **params):
+        response = self.client.get(reverse('pdf-report', args=[self.upload.id]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        return b''.join(response.streaming_content)
+
+    def pages(self, pdf):
+        return len(re.findall(rb'/Type /Page\b', pdf))
+
+    def test_summary_is_the_default(self):
+        self.assertEqual(report_options(QueryDict())['detail'], 'summary')
+        self.assertEqual(self.pages(self.report()), 1)
+
+    def test_full_report_draws_every_row_page_by_page(self):
+        pdf = self.report(detail='full')
+        rows_per_page = 52  # letter page, 56pt margins, 12pt rows
+        self.assertGreaterEqual(self.pages(pdf), 1 + 500 // rows_per_page)
+        self.assertEqual(self.pages(self.report(detail='top')), 2)
+
+    def test_reports_are_deleted_with_their_upload(self):
+        self.report()
+        directory = report_path(self.upload, 'x').parent
+        self.assertTrue(any(directory.iterdir()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload.delete()
+        self.assertFalse(directory.exists())
+
+
+class ChartTests(ClientTestCase):
+    def chart(self, storage, **params):
+        upload = UploadHistory.objects.create(user=self.user, file='uploads/chart.csv')
+        with self.settings(EQUIPMENT_STORAGE=storage):
+            ingest_csv(upload, io.BytesIO(make_csv(25)))
+        response = self.client.get(reverse('chart', args=[upload.id]), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_index_is_the_first_row_of_each_bucket(self):
+        for storage in ('orm', 'columnar'):
+            with self.subTest(storage=storage):
+                chart = self.chart(storage, buckets=4, bins=5)
+                self.assertEqual(chart['index'], [0, 7, 13, 19])
+                flowrate = chart['series']['flowrate']  # flowrate of row i is i
+                self.assertEqual(flowrate['min'], chart['index'])
+                self.assertEqual(flowrate['max'], [6, 12, 18, 24])
+                self.assertEqual(flowrate['mean'], [3, 9.5, 15.5, 21.5])
+                self.assertEqual(sum(chart['histograms']['temperature']['counts']), 25)
+                self.assertEqual(len(chart['histograms']['temperature']['edges']), 6)
+
+    def test_bucket_count_is_validated(self):
+        upload = UploadHistory.objects.create(user=self.user, file='uploads/chart.csv')
+        ingest_csv(upload, io.BytesIO(make_csv(5)))
+        response = self.client.get(reverse('chart', args=[upload.id]), {'buckets': 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('chart', args=[upload.id])).json()['buckets'], 5)
+
+
+class ResponseCacheTests(ClientTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload = UploadHistory.objects.create(user=self.user, file='uploads/cached.csv')
+        ingest_csv(self.upload, io.BytesIO(make_csv(20)))
+        self.url = reverse('summary', args=[self.upload.id])
+
+    def test_repeat_request_is_a_hit_and_etag_gives_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual((first.status_code, first['X-Cache']), (200, 'MISS'))
+        second = self.client.get(self.url)
+        self.assertEqual((second.status_code, second['X-Cache']), (200, 'HIT'))
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_invalidates(self):
+        first = self.client.get(self.url)
+        self.upload.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_new_upload_invalidates_history(self):
+        first = self.client.get(reverse('history'))
+        self.assertEqual(len(first.json()['results']), 1)
+        UploadHistory.objects.create(user=self.user, file='uploads/second.csv')
+        response = self.client.get(reverse('history'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_other_users_upload_is_not_found_even_with_validators(self):
+        self.client.get(self.url)
+        intruder = User.objects.create_user('intruder', 'intruder@example.com', 'pw')
+        self.client.force_authenticate(intruder)
+        for headers in ({}, {'HTTP_IF_NONE_MATCH': '*'}, {'HTTP_IF_MODIFIED_SINCE': 'Fri, 01 Jan 2100 00:00:00 GMT'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(self.url, **headers)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn('ETag', response)
+
+
+class AnalyticsTests(ClientTestCase):
+    def ingest(self, rows, start=0):
+        upload = UploadHistory.objects.create(user=self.user, file='uploads/analytics.csv')
+        ingest_csv(upload, io.BytesIO(make_csv(rows, start)))
+        return upload
+
+    def analytics(self, **params):
+        response = self.client.get(reverse('analytics'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_rollups_follow_ingest_and_delete(self):
+        first = self.ingest(10)
+        self.ingest(20, start=100)
+        result = self.analytics()
+        self.assertEqual((result['uploads'], result['total_count']), (2, 30))
+        pumps = next(row for row in result['by_type'] if row['equipment_type'] == 'Pump')
+        self.assertEqual((pumps['uploads'], pumps['count']), (2, 15))
+        self.assertEqual(pumps['max_temperature'], 219.0)
+        self.assertEqual(result['hottest'][0]['equipment_name'], 'EQ-119')
+
+        first.delete()
+        result = self.analytics()
+        self.assertEqual((result['uploads'], result['total_count']), (1, 20))
+
+    def test_old_uploads_are_backfilled_by_command_not_by_get(self):
+        upload = self.ingest(10)
+        UploadTypeRollup.objects.filter(upload=upload).delete()
+        rebuild_day(self.user.pk, timezone.localdate(upload.uploaded_at))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.analytics()['total_count'], 0)
+        self.assertFalse([q for q in queries if 'core_equipmentdata' in q['sql']])  # no scan inside the request
+
+        call_command('backfill_rollups', stdout=io.StringIO())
+        self.assertEqual(self.analytics(start=timezone.localdate().isoformat())['total_count'], 10)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers')
+class ConcurrentRollupTests(TransactionTestCase):
+    def test_overlapping_rebuilds_of_a_day_see_each_other(self):
+        user = User.objects.create_user('racer', 'racer@example.com', 'pw')
+        pump = EquipmentType.objects.create(name='Pump')
+        uploads = [UploadHistory.objects.create(user=user, file='uploads/race.csv') for _ in range(2)]
+        day = timezone.localdate(uploads[0].uploaded_at)
+        values = {f'{field}_{aggregate}': 1.0 for field in ('flowrate', 'pressure', 'temperature')
+                  for aggregate in ('sum', 'min', 'max')}
+        both_inserted = threading.Barrier(2, timeout=10)
+        errors = []
+
+        def ingest(upload):
+            try:
+                with transaction.atomic():
+                    UploadTypeRollup.objects.create(upload=upload, user=user, day=day, equipment_type=pump,
+                                                    count=1, **values)
+                    both_inserted.wait()  # neither has committed yet
+                    rebuild_day(user.pk, day)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=ingest, args=(upload,)) for upload in uploads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(DailyTypeRollup.objects.get(user=user, day=day).uploads, 2)
+
+
+class EquipmentTypeMigrationTests(TransactionTestCase):
+    """0007 moves the type strings of existing readings into EquipmentType, and back when reversed."""
+    before = ('core', '0006_uploadhistory_storage')
+    after = ('core', '0007_equipmenttype')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes('core')[0])
+        apps = self.migrate(self.before)
+        user = apps.get_model('auth', 'User').objects.create(username='legacy')
+        upload = apps.get_model('core', 'UploadHistory').objects.create(user=user, file='uploads/legacy.csv')
+        apps.get_model('core', 'EquipmentData').objects.bulk_create(
+            apps.get_model('core', 'EquipmentData')(upload=upload, equipment_name=f'EQ-{i}', equipment_type=kind,
+                                                    flowrate=i, pressure=i, temperature=i)
+            for i, kind in enumerate(['Pump', 'Valve', 'Pump'])
+        )
+
+    def test_types_move_to_the_dimension_table_and_back(self):
+        apps = self.migrate(self.after)
+        self.assertEqual(sorted(apps.get_model('core', 'EquipmentType').objects.values_list('name', flat=True)),
+                         ['Pump', 'Valve'])
+        readings = apps.get_model('core', 'EquipmentData').objects.order_by('equipment_name')
+        self.assertEqual([r.equipment_type.name for r in readings], ['Pump', 'Valve', 'Pump'])
+
+        apps = self.migrate(self.before)
+        readings = apps.get_model('core', 'EquipmentData').objects.order_by('equipment_name')
+        self.assertEqual(list(readings.values_list('equipment_type', flat=True)), ['Pump', 'Valve', 'Pump'])
@@ -0,0 +1,123 @@
+"""
+Content-hash deduplication of uploaded CSVs.
+
+HashingUploadHandler runs first in the upload handler chain and feeds every
+chunk of the multipart body through SHA-256 as it streams in, so hashing costs
+no extra pass over the file. If a completed upload with the same hash exists
+(per user, or across users with UPLOAD_DEDUPE = 'global'), the new upload is
+recorded as a duplicate of it: no file is stored and nothing is parsed; the
+new UploadHistory row points at the original through ``source`` and reads its
+rows, column files and statistics (``UploadHistory.data_upload``).
+
+Originals are reference counted by their duplicates. Deleting an original
+promotes its oldest duplicate to hold the data instead.
+"""
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import copy_rollups
+from .columnar import store_path
+from .models import EquipmentData, IngestJob, UploadHistory, UploadStatistics
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Pass-through handler recording the SHA-256 of each uploaded file in
+    ``request.content_hashes[field_name]``, a list in upload order. Must come
+    before the handlers that store the data.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'content_hashes'):
+            self.request.content_hashes = {}
+        self.request.content_hashes.setdefault(self.field_name, []).append(self.hasher.hexdigest())
+        return None
+
+
+def find_original(user, content_hash):
+    """A fully ingested upload with the same content the user may share, or None."""
+    if not content_hash or settings.UPLOAD_DEDUPE not in ('user', 'global'):
+        return None
+    candidates = UploadHistory.objects.filter(content_hash=content_hash, source__isnull=True)
+    if settings.UPLOAD_DEDUPE == 'user':
+        candidates = candidates.filter(user=user)
+    # Only finished ingests: not ones still queued or running, nor uploads stored a moment
+    # ago whose job does not exist yet (failed ingests delete their upload)
+    candidates = candidates.filter(jobs__status=IngestJob.STATUS_DONE)
+    return candidates.order_by('id').first()
+
+
+def link_duplicate(original, user):
+    """
+    Record a new upload for ``user`` that shares ``original``'s data.
+
+    Returns ``(upload, job)``; the job is created already done so clients
+    follow the same flow as for a parsed upload.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        upload = UploadHistory.objects.create(
+            user=user,
+            file=original.file.name,
+            total_records=original.total_records,
+            storage=original.storage,
+            content_hash=original.content_hash,
+            source=original,
+        )
+        size = original.file.size if original.file.storage.exists(original.file.name) else 0
+        job = IngestJob.objects.create(
+            user=user,
+            upload=upload,
+            status=IngestJob.STATUS_DONE,
+            bytes_total=size,
+            bytes_processed=size,
+            rows_processed=original.total_records,
+            started_at=now,
+            finished_at=now,
+        )
+        copy_rollups(original, upload)
+    return upload, job
+
+
+def promote_duplicate(upload):
+    """
+    Before ``upload`` is deleted, move its data to its oldest duplicate and
+    re-point the other duplicates there. No-op for uploads nobody shares.
+    """
+    heir = upload.duplicates.order_by('id').first()
+    if heir is None:
+        return
+    with transaction.atomic():
+        EquipmentData.objects.filter(upload=upload).update(upload=heir)
+        UploadStatistics.objects.filter(upload=upload).update(upload=heir)
+        upload.duplicates.exclude(pk=heir.pk).update(source=heir)
+        heir.source = None
+        heir.save(update_fields=['source'])
+        # Files are not transactional: move the column store only once the new
+        # owner is committed (and ahead of the deleted upload's file cleanup,
+        # which core/signals.py also defers to commit). Paths are taken now: the
+        # deleted instance's pk is cleared before the callback runs.
+        transaction.on_commit(partial(_move_store, store_path(upload), store_path(heir)))
+
+
+def _move_store(columns, destination):
+    if columns.exists():
+        columns.rename(destination)
+
+
+def shared_from(original, user):
+    """The id to report as ``deduplicated_from``: hidden when the original is another user's."""
+    return original.id if original.user_id == user.pk else None
@@ -1,7 +1,7 @@
 from django.urls import path
 from rest_framework.authtoken.views import obtain_auth_token
 from .views import (
-    FileUploadView, SummaryView, HistoryView, EquipmentListView, PDFReportView,
+    FileUploadView, BatchUploadView, UploadSessionView, UploadSessionDetailView, UploadSessionCompleteView, JobStatusView, SummaryView, HistoryView, EquipmentListView, ChartView, AnalyticsView, CacheStatsView, ExportView, PDFReportView,
     UserListView, ProfileView, RegisterView, PasswordResetRequestView, PasswordResetConfirmView
 )
 
@@ -13,8 +13,17 @@ urlpatterns = [
     path('password-reset-confirm/<uidb64>/<token>/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('users/', UserListView.as_view(), name='user-list'),
     path('upload/', FileUploadView.as_view(), name='file-upload'),
+    path('upload/batch/', BatchUploadView.as_view(), name='batch-upload'),
+    path('upload/sessions/', UploadSessionView.as_view(), name='upload-sessions'),
+    path('upload/sessions/<uuid:session_id>/', UploadSessionDetailView.as_view(), name='upload-session'),
+    path('upload/sessions/<uuid:session_id>/complete/', UploadSessionCompleteView.as_view(), name='upload-session-complete'),
+    path('jobs/<int:job_id>/', JobStatusView.as_view(), name='job-status'),
     path('summary/<int:upload_id>/', SummaryView.as_view(), name='summary'),
     path('history/', HistoryView.as_view(), name='history'),
     path('data/<int:upload_id>/', EquipmentListView.as_view(), name='equipment-list'),
+    path('chart/<int:upload_id>/', ChartView.as_view(), name='chart'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('export/<int:upload_id>/', ExportView.as_view(), name='export'),
     path('report/<int:upload_id>/', PDFReportView.as_view(), name='pdf-report'),
 ]
@@ -1,25 +1,41 @@
+import logging
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count
-from django.http import HttpResponse
-from .models import UploadHistory, EquipmentData
-from .serializers import UploadHistorySerializer, EquipmentDataSerializer, UserSerializer, RegisterSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from .models import UploadHistory, EquipmentData, IngestJob, UploadSession
+from .serializers import UploadHistorySerializer, EquipmentDataSerializer, UserSerializer, RegisterSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer, IngestJobSerializer, UploadSessionSerializer
+from .jobs import fail_stale_jobs, start_batch_ingest, start_ingest
+from .batch import batch_files
+from .parsers import DecompressingMultiPartParser
+from .resumable import create_session, finalize, write_chunk
+from .stats import get_statistics
+from .filters import paginate, parse_fields
+from .columnar import column_store, equipment_chunks, equipment_page
+from .renderers import (
+    FRAME_RENDERERS, CSVRenderer, NDJSONRenderer, StreamingFrameRenderer,
+    compress_stream, compressors, fast_json_response, negotiate_encoding,
+)
+from .charts import chart_data
+from .analytics import analytics
+from .history import history_page
+from .uploads import HashingUploadHandler, find_original, link_duplicate, shared_from
+from .caching import cache_stats, cached_response
+from .reports import error_path, report_key, report_options, report_path, schedule_report
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail # Kept for potential future use, but we will print to console
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
@@ -81,77 +97,208 @@ class PasswordResetConfirmView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class FileUploadView(APIView):
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (DecompressingMultiPartParser, FormParser)
     permission_classes = [IsAuthenticated]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Hash the file while it streams in, ahead of the handlers that store it
+        request.upload_handlers.insert(0, HashingUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
     def post(self, request, *args, **kwargs):
-        print(f"DEBUG: FileUploadView called. User: {request.user}, IsAuth: {request.user.is_authenticated}")
-        # print(f"DEBUG: Data: {request.data}") 
-        
+        logger.debug("FileUploadView called. User: %s, IsAuth: %s", request.user, request.user.is_authenticated)
+
         file_serializer = UploadHistorySerializer(data=request.data)
         if file_serializer.is_valid():
+            content_hash = getattr(request, 'content_hashes', {}).get('file', [None])[-1]
+            original = find_original(request.user, content_hash)
+            if original is not None:
+                # Same bytes as an earlier upload: share its data instead of parsing again
+                upload_instance, job = link_duplicate(original, request.user)
+                response_data = dict(UploadHistorySerializer(upload_instance).data)
+                response_data['job'] = IngestJobSerializer(job).data
+                response_data['deduplicated_from'] = shared_from(original, request.user)
+                return Response(response_data, status=status.HTTP_201_CREATED)
+
             # Save with user if authenticated
             if request.user.is_authenticated:
-                upload_instance = file_serializer.save(user=request.user)
+                upload_instance = file_serializer.save(user=request.user, content_hash=content_hash)
             else:
                 # This branch should not be reached if IsAuthenticated is set, but keeping as fallback
-                print("DEBUG: User not authenticated, saving without user.")
-                upload_instance = file_serializer.save()
+                logger.debug("User not authenticated, saving without user.")
+                upload_instance = file_serializer.save(content_hash=content_hash)
             
-            try:
-                # Process CSV
-                df = pd.read_csv(upload_instance.file.path)
-                
-                # Cleanup column names
-                df.columns = [c.strip() for c in df.columns]
-                
-                equipment_list = []
-                for _, row in df.iterrows():
-                    equipment_list.append(EquipmentData(
-                        upload=upload_instance,
-                        equipment_name=row['Equipment Name'],
-                        equipment_type=row['Type'],
-                        flowrate=row['Flowrate'],
-                        pressure=row['Pressure'],
-                        temperature=row['Temperature']
-                    ))
-                
-                EquipmentData.objects.bulk_create(equipment_list)
-                
-                upload_instance.total_records = len(equipment_list)
-                upload_instance.save()
-                
-                return Response(file_serializer.data, status=status.HTTP_201_CREATED)
-            except Exception as e:
-                upload_instance.delete()
-                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Parse and insert in the background; clients poll /api/jobs/<id>/
+            job = start_ingest(upload_instance)
+            if job.status == IngestJob.STATUS_FAILED:
+                # Only happens when INGEST_WORKERS = 0 and the CSV was rejected inline
+                return Response({"error": job.error, "job": IngestJobSerializer(job).data}, status=status.HTTP_400_BAD_REQUEST)
+
+            response_data = dict(file_serializer.data)
+            response_data['job'] = IngestJobSerializer(job).data
+            response_status = status.HTTP_201_CREATED if job.status == IngestJob.STATUS_DONE else status.HTTP_202_ACCEPTED
+            return Response(response_data, status=response_status)
         else:
             return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class BatchUploadView(APIView):
+    parser_classes = (DecompressingMultiPartParser,)
+    permission_classes = [IsAuthenticated]
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers.insert(0, HashingUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        # Many CSVs and/or zip/tar archives of them in ``files``; see core/batch.py
+        files = request.FILES.getlist('files')
+        if not files:
+            return Response({"files": "Attach one or more CSV files or zip/tar archives."}, status=status.HTTP_400_BAD_REQUEST)
+        hashes = getattr(request, 'content_hashes', {}).get('files', [])
+
+        results, new_uploads = [], []
+        try:
+            for name, content, content_hash in batch_files(files, hashes):
+                original = find_original(request.user, content_hash)
+                if original is not None:
+                    upload, job = link_duplicate(original, request.user)
+                    results.append({"name": name, "upload": upload, "job": job, "deduplicated": True,
+                                    "deduplicated_from": shared_from(original, request.user)})
+                    continue
+                upload = UploadHistory(user=request.user, content_hash=content_hash)
+                upload.file.save(name, content)
+                new_uploads.append(upload)
+                results.append({"name": name, "upload": upload, "job": None, "deduplicated": False,
+                                "deduplicated_from": None})
+        except ValidationError:
+            # Limits are checked as archives are expanded; undo the files and jobs already taken
+            for result in results:
+                if not result["deduplicated"]:
+                    result["upload"].file.delete(save=False)
+                if result["job"] is not None:
+                    result["job"].delete()
+                result["upload"].delete()
+            raise
+
+        # Parsed in parallel on the parser pool; jobs come back in upload order
+        jobs = iter(start_batch_ingest(new_uploads))
+        for result in results:
+            if result["job"] is None:
+                result["job"] = next(jobs)
+            result["job"].refresh_from_db()
+
+        counts = {key: 0 for key in ('done', 'failed', 'queued', 'deduplicated')}
+        files_out = []
+        for result in results:
+            job = result["job"]
+            if job.status in IngestJob.ACTIVE_STATUSES:
+                counts['queued'] += 1
+            else:
+                counts[job.status] += 1
+            if result["deduplicated"]:
+                counts['deduplicated'] += 1
+            upload = UploadHistorySerializer(result["upload"]).data if job.upload_id else None
+            files_out.append({
+                "name": result["name"],
+                "upload": upload,
+                "job": IngestJobSerializer(job).data,
+                "deduplicated": result["deduplicated"],
+                "deduplicated_from": result["deduplicated_from"],
+            })
+        response_status = status.HTTP_202_ACCEPTED if counts['queued'] else status.HTTP_201_CREATED
+        return Response({"files": files_out, **counts}, status=response_status)
+
+class UploadSessionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Start a resumable upload; see core/resumable.py for the protocol
+        session = create_session(request.user, request.data)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+class UploadSessionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = ()  # Chunks are read straight off the request stream
+
+    def get_session(self, request, session_id):
+        try:
+            return UploadSession.objects.get(id=session_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return None
+
+    def get(self, request, session_id):
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({"error": "Upload session not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UploadSessionSerializer(session).data)
+
+    def put(self, request, session_id):
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({"error": "Upload session not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        index = write_chunk(session, request)
+        return Response({"index": index}, status=status.HTTP_200_OK)
+
+    def delete(self, request, session_id):
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({"error": "Upload session not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class UploadSessionCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id):
+        try:
+            session = UploadSession.objects.get(id=session_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return Response({"error": "Upload session not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        upload_instance, job, original = finalize(session)
+        if job.status == IngestJob.STATUS_FAILED:
+            return Response({"error": job.error, "job": IngestJobSerializer(job).data}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Same response as a one-shot /api/upload/
+        response_data = dict(UploadHistorySerializer(upload_instance).data)
+        response_data['job'] = IngestJobSerializer(job).data
+        if original is not None:
+            response_data['deduplicated_from'] = shared_from(original, request.user)
+        response_status = status.HTTP_201_CREATED if job.status == IngestJob.STATUS_DONE else status.HTTP_202_ACCEPTED
+        return Response(response_data, status=response_status)
+
+class JobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        try:
+            job = IngestJob.objects.get(id=job_id, user=request.user)
+        except IngestJob.DoesNotExist:
+            return Response({"error": "Job not found or access denied"}, status=status.HTTP_404_NOT_FOUND)
+        if job.status in IngestJob.ACTIVE_STATUSES and fail_stale_jobs():
+            job.refresh_from_db()  # It may have been one of them
+        return Response(IngestJobSerializer(job).data, status=status.HTTP_200_OK)
+
 class SummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response('summary')
     def get(self, request, upload_id, *args, **kwargs):
         try:
             # Ensure upload belongs to the user
             upload_instance = UploadHistory.objects.get(id=upload_id, user=request.user)
-            equipment = EquipmentData.objects.filter(upload=upload_instance)
-            
-            # Aggregation
-            aggregates = equipment.aggregate(
-                avg_flowrate=Avg('flowrate'),
-                avg_pressure=Avg('pressure'),
-                avg_temperature=Avg('temperature')
-            )
-            
-            # Type Distribution
-            type_distribution = equipment.values('equipment_type').annotate(count=Count('id'))
-            
+            if upload_instance.jobs.filter(status__in=IngestJob.ACTIVE_STATUSES).exists():
+                return Response({"error": "Upload is still being processed"}, status=status.HTTP_409_CONFLICT)
+
+            # Precomputed at ingest time; a single-row lookup
+            stats = get_statistics(upload_instance)
+
             return Response({
                 "upload_id": upload_id,
-                "total_count": equipment.count(),
-                "averages": aggregates,
-                "type_distribution": type_distribution
+                "total_count": stats.total_count,
+                "averages": stats.averages(),
+                "type_distribution": stats.type_distribution(),
+                "statistics": stats.columns,
+                "type_means": stats.type_means,
             }, status=status.HTTP_200_OK)
         except UploadHistory.DoesNotExist:
             return Response({"error": "Upload not found or access denied"}, status=status.HTTP_404_NOT_FOUND)
@@ -159,127 +306,194 @@ class SummaryView(APIView):
 class HistoryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response('history', per_upload=False)
     def get(self, request, *args, **kwargs):
-        history = UploadHistory.objects.filter(user=request.user).order_by('-uploaded_at')[:5]
+        # Paginated and delta-syncable (?since=); see core/history.py
+        history, next_cursor, latest_id = history_page(request.user, request.query_params)
         serializer = UploadHistorySerializer(history, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response({
+            "results": serializer.data,
+            "next": EquipmentListView.next_url(request, next_cursor),
+            "next_cursor": next_cursor,
+            "latest_id": latest_id,
+        }, status=status.HTTP_200_OK)
 
 class EquipmentListView(APIView):
     permission_classes = [IsAuthenticated]
+    # JSON by default; Arrow IPC, Parquet and raw float64 via Accept or ?format=arrow|parquet|f8
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + FRAME_RENDERERS
 
+    @cached_response('data')
     def get(self, request, upload_id):
         # Ensure upload belongs to user implicitly by checking if upload exists for user
-        if not UploadHistory.objects.filter(id=upload_id, user=request.user).exists():
+        upload = UploadHistory.objects.filter(id=upload_id, user=request.user).only('id', 'storage', 'source').first()
+        if upload is None:
              return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
              
-        equipment = EquipmentData.objects.filter(upload_id=upload_id)
-        serializer = EquipmentDataSerializer(equipment, many=True)
-        return Response(serializer.data)
+        # Keyset-paginated, filterable and projectable; see core/filters.py
+        fields = parse_fields(request.query_params)
+
+        if isinstance(request.accepted_renderer, StreamingFrameRenderer):
+            return self.stream_frame(request, upload, fields)
+
+        # ?layout=rows|columnar skips the serializer: values_list tuples encoded directly
+        layout = request.query_params.get('layout', 'records')
+        if layout in ('rows', 'columnar'):
+            rows, next_cursor = equipment_page(upload, request.query_params, fields)
+            if layout == 'rows':
+                payload = {"columns": fields, "rows": rows}
+            else:
+                columns = zip(*rows) if rows else [()] * len(fields)
+                payload = {"columns": dict(zip(fields, columns))}
+            payload["next"] = self.next_url(request, next_cursor)
+            payload["next_cursor"] = next_cursor
+            return fast_json_response(payload)
+        if layout != 'records':
+            return Response({"layout": "Must be one of records, rows, columnar."}, status=status.HTTP_400_BAD_REQUEST)
+
+        store = column_store(upload, fields)
+        if store is not None:
+            rows, next_cursor = store.paginate_values(request.query_params, fields)
+            rows = [dict(zip(fields, row)) for row in rows]
+        else:
+            rows, next_cursor = paginate(EquipmentData.objects.filter(upload=upload.data_upload), request.query_params, fields)
+        serializer = EquipmentDataSerializer(rows, many=True, fields=fields)
+        return Response({
+            "results": serializer.data,
+            "next": self.next_url(request, next_cursor),
+            "next_cursor": next_cursor,
+        })
+
+    def stream_frame(self, request, upload, fields):
+        """The whole (filtered, ordered) upload in a binary column format, streamed from one DB cursor."""
+        renderer = request.accepted_renderer
+        if renderer.fields:
+            if 'fields' in request.query_params:
+                unsupported = [f for f in fields[1:] if f not in renderer.fields]
+                if unsupported:
+                    raise ValidationError({'fields': f"Not available as {renderer.format}: {', '.join(unsupported)}"})
+                fields = fields[1:]
+            else:
+                fields = list(renderer.fields)
 
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        response = StreamingHttpResponse(renderer.stream(equipment_chunks(upload, request.query_params, fields), fields),
+                                         content_type=renderer.media_type)
+        response['X-Columns'] = ','.join(fields)
+        response['Content-Disposition'] = f'attachment; filename="upload_{upload.pk}.{renderer.format}"'
+        return response
 
+    @staticmethod
+    def next_url(request, next_cursor):
+        if not next_cursor:
+            return None
+        query = request.query_params.copy()
+        query['cursor'] = next_cursor
+        return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
 
-class PDFReportView(APIView):
+class ChartView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response('chart')
     def get(self, request, upload_id):
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="report_{upload_id}.pdf"'
-
-        doc = SimpleDocTemplate(response, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Title
-        title_style = ParagraphStyle(
-            'TitleStyle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#0f172a'),
-            alignment=1,
-            spaceAfter=20
-        )
-        elements.append(Paragraph("Chemical Equipment Report", title_style))
-        elements.append(Spacer(1, 10))
-
-        # Metadata
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.gray
-        )
-        elements.append(Paragraph(
-            f"<b>Upload ID:</b> {upload_id} | <b>User:</b> {request.user.username} | <b>Date:</b> {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}",
-            meta_style))
-        elements.append(Spacer(1, 20))
-
         try:
             upload = UploadHistory.objects.get(id=upload_id, user=request.user)
-            equipment = EquipmentData.objects.filter(upload=upload)
-
-            # Aggregates
-            aggregates = equipment.aggregate(
-                avg_flow=Avg('flowrate'),
-                avg_press=Avg('pressure'),
-                avg_temp=Avg('temperature')
-            )
-
-            # Summary Table
-            summary_data = [
-                ['Metric', 'Value'],
-                ['Total Records', str(equipment.count())],
-                ['Average Flowrate', f"{aggregates['avg_flow']:.2f}" if aggregates['avg_flow'] else "0"],
-                ['Average Pressure', f"{aggregates['avg_press']:.2f}" if aggregates['avg_press'] else "0"],
-                ['Average Temperature', f"{aggregates['avg_temp']:.2f}" if aggregates['avg_temp'] else "0"]
-            ]
-
-            summary_table = Table(summary_data, colWidths=[250, 200])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (1, 0), colors.HexColor('#0ea5e9')),
-                ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f9ff')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bae6fd')),
-            ]))
-
-            elements.append(Paragraph("Summary Statistics", styles['Heading2']))
-            elements.append(summary_table)
-            elements.append(Spacer(1, 25))
-
-            # Equipment Table
-            elements.append(Paragraph("Equipment Details (Top 50)", styles['Heading2']))
-
-            data = [['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']]
-            for item in equipment[:50]:
-                data.append([
-                    item.equipment_name,
-                    item.equipment_type,
-                    str(item.flowrate),
-                    str(item.pressure),
-                    str(item.temperature)
-                ])
-
-            data_table = Table(data, colWidths=[140, 120, 80, 80, 80])
-            data_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#334155')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ]))
-
-            elements.append(data_table)
-
         except UploadHistory.DoesNotExist:
-            elements.append(Paragraph("Upload not found or access denied.", styles['Normal']))
+            return Response({"error": "Upload not found or access denied"}, status=status.HTTP_404_NOT_FOUND)
+        if upload.jobs.filter(status__in=IngestJob.ACTIVE_STATUSES).exists():
+            return Response({"error": "Upload is still being processed"}, status=status.HTTP_409_CONFLICT)
+
+        # Bounded size whatever the upload size: ?buckets= series points, ?bins= histogram bins
+        return fast_json_response(chart_data(upload, request.query_params))
+
+class AnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Served from rollup tables; see core/analytics.py
+    @cached_response('analytics', per_upload=False)
+    def get(self, request):
+        return Response(analytics(request.user, request.query_params), status=status.HTTP_200_OK)
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        doc.build(elements)
+    def get(self, request):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
+class ExportView(APIView):
+    permission_classes = [IsAuthenticated]
+    # ?format=csv (default) | ndjson | arrow | parquet | f8, or the matching Accept header
+    renderer_classes = [CSVRenderer, NDJSONRenderer] + FRAME_RENDERERS
+
+    def get(self, request, upload_id):
+        upload = UploadHistory.objects.filter(id=upload_id, user=request.user).only('id', 'storage', 'source').first()
+        if upload is None:
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        renderer = request.accepted_renderer
+        params = request.query_params
+        if 'fields' in params:
+            fields = parse_fields(params)
+            if 'id' not in params['fields'].split(','):
+                fields = fields[1:]
+            unsupported = [f for f in fields if renderer.fields and f not in renderer.fields]
+            if unsupported:
+                raise ValidationError({'fields': f"Not available as {renderer.format}: {', '.join(unsupported)}"})
+        else:
+            fields = list(renderer.fields or renderer.default_fields or parse_fields(params))
+
+        # DATA_STREAM_CHUNK_SIZE chunks from a server-side cursor or the column files:
+        # memory stays flat whatever the upload size
+        body = renderer.stream(equipment_chunks(upload, params, fields), fields)
+
+        encoding = params.get('compression') or negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding == 'none':
+            encoding = None
+        if encoding and encoding not in compressors():
+            raise ValidationError({'compression': f"Must be one of {', '.join(compressors())}, none."})
+        if encoding:
+            body = compress_stream(body, encoding)
+
+        response = StreamingHttpResponse(body, content_type=renderer.media_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept, Accept-Encoding'
+        response['X-Columns'] = ','.join(fields)
+        response['Content-Disposition'] = f'attachment; filename="upload_{upload_id}.{renderer.format}"'
+        return response
+
+class PDFReportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        try:
+            upload = UploadHistory.objects.get(id=upload_id, user=request.user)
+        except UploadHistory.DoesNotExist:
+            return Response({"error": "Upload not found or access denied"}, status=status.HTTP_404_NOT_FOUND)
+        if upload.jobs.filter(status__in=IngestJob.ACTIVE_STATUSES).exists():
+            return Response({"error": "Upload is still being processed"}, status=status.HTTP_409_CONFLICT)
+
+        # Reports are rendered once per (upload, options) and then served from disk
+        options = report_options(request.query_params)
+        key = report_key(upload, options)
+        path = report_path(upload, key)
+        if not path.exists():
+            failed = error_path(path)
+            if failed.exists():
+                message = failed.read_text()
+                failed.unlink()  # the next request retries
+                return Response({"error": f"Report generation failed: {message}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            schedule_report(upload, options, key)
+            if not path.exists():
+                response = Response({"status": "pending", "report": key}, status=status.HTTP_202_ACCEPTED)
+                response['Retry-After'] = '2'
+                return response
+
+        etag = f'"{key}-{int(path.stat().st_mtime)}"'
+        if etag in [t.strip() for t in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type='application/pdf',
+                                    as_attachment=True, filename=f"report_{upload_id}.pdf")
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=0, must-revalidate'
         return response
@@ -1,26 +1,115 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import requests
+from cache import ResponseCache
 
 BASE_URL = "http://localhost:8000/api/"
+RESUMABLE_THRESHOLD = 32 * 1024 * 1024  # larger files go through resumable chunked uploads
+UPLOAD_WORKERS = 4  # chunks sent in parallel
+UPLOAD_RETRIES = 5  # attempts per chunk before giving up (the upload can still be resumed)
+COMPRESSED_SUFFIXES = ('.gz', '.tgz', '.zst', '.zip', '.bz2', '.xz')
+GZIP_LEVEL = 6  # compresses faster than a slow site link sends; 9 is ~3x slower for ~1% less data
+CONNECT_TIMEOUT = 5  # seconds; cached reads fall back to the disk copy when the server is unreachable
+
+logger = logging.getLogger(__name__)
+
+
+class Cancelled(Exception):
+    """Raised inside long calls when their ``cancel`` event is set."""
+
+
+def compressed_copy(file_path):
+    """
+    Gzip ``file_path`` into the temp directory for uploading; the server
+    decompresses it while parsing. Already compressed files are returned as is.
+
+    The gzip header carries no name or timestamp, so the same CSV always
+    compresses to the same bytes and the server still spots re-uploads; the
+    copy is named after the source's path, size and mtime so that resuming an
+    upload reuses it.
+    """
+    if file_path.lower().endswith(COMPRESSED_SUFFIXES):
+        return file_path
+    stat = os.stat(file_path)
+    key = hashlib.sha1(f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime}".encode()).hexdigest()[:16]
+    folder = os.path.join(tempfile.gettempdir(), f"upload-{key}")
+    target = os.path.join(folder, os.path.basename(file_path) + '.gz')
+    if not os.path.exists(target):
+        os.makedirs(folder, exist_ok=True)
+        partial = target + '.tmp'
+        with open(file_path, 'rb') as src, open(partial, 'wb') as raw, \
+                gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=GZIP_LEVEL, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(partial, target)
+    return target
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class APIClient:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, cache=True):
+        """``cache``: True for the on-disk cache in the user profile (cache.py), a ResponseCache, or False."""
         self.token = None
+        self.username = None
+        self.cache = ResponseCache() if cache is True else cache or None
+        self.offline = False  # the last cached read was served from disk because the server was unreachable
+        self.headers = {}  # sent with every request; holds the auth token once logged in
+        self._upload_sessions = {}  # (path, size, mtime) -> server upload session id, for resuming
+        self._thread_local = threading.local()
+
+    @property
+    def session(self):
+        """
+        This thread's requests.Session. The desktop client calls the API from
+        worker threads (workers.py) and a Session must not be shared between them.
+        """
+        session = getattr(self._thread_local, 'session', None)
+        if session is None:
+            session = self._thread_local.session = requests.Session()
+        session.headers.update(self.headers)
+        return session
 
     def login(self, username, password):
         try:
             response = self.session.post(BASE_URL + "login/", json={
                 'username': username, 
                 'password': password
-            })
+            }, timeout=(CONNECT_TIMEOUT, None))
             if response.status_code == 200:
                 self.token = response.json()['token']
-                # Update session headers for future requests
-                self.session.headers.update({'Authorization': f'Token {self.token}'})
+                self.username = username
+                self.offline = False
+                # Sent by every thread's session from now on
+                self.headers['Authorization'] = f'Token {self.token}'
+                if self.cache is not None:
+                    self.cache.remember_login(username, password)
                 return True
             return False
+        except requests.ConnectionError as e:
+            # No server: let a user who signed in here before browse their cached uploads
+            if self.cache is not None and self.cache.check_login(username, password):
+                self.username = username
+                self.offline = True
+                return True
+            logger.error("Login failed: %s", e)
+            return False
         except Exception as e:
-            print(f"Login failed: {e}")
+            logger.error("Login failed: %s", e)
             return False
 
     def register(self, username, email, password):
@@ -32,7 +121,7 @@ class APIClient:
             })
             return response.status_code == 201
         except Exception as e:
-            print(f"Registration failed: {e}")
+            logger.error("Registration failed: %s", e)
             return False
 
     def reset_password_request(self, email):
@@ -40,7 +129,7 @@ class APIClient:
             response = self.session.post(BASE_URL + "password-reset/", json={'email': email})
             return response.status_code == 200
         except Exception as e:
-            print(f"Password reset request failed: {e}")
+            logger.error("Password reset request failed: %s", e)
             return False
 
     def get_users(self):
@@ -50,47 +139,317 @@ class APIClient:
         except:
             return []
 
-    def upload_file(self, file_path):
+    def upload_file(self, file_path, compress=True, callback=None, cancel=None):
+        """
+        Upload one CSV, gzip-compressed unless ``compress`` is False; returns the upload with its job.
+
+        ``callback`` and ``cancel`` apply to large files, which go through
+        ``upload_file_resumable``.
+        """
         try:
-            with open(file_path, 'rb') as f:
-                files = {'file': f}
-                # Authorization header is already in session if logged in
-                response = self.session.post(BASE_URL + "upload/", files=files)
-            return response.json() if response.status_code == 201 else None
+            send_path = compressed_copy(file_path) if compress else file_path
+        except OSError as e:
+            logger.error("Upload failed: %s", e)
+            return None
+        try:
+            if os.path.getsize(send_path) > RESUMABLE_THRESHOLD:
+                return self.upload_file_resumable(send_path, callback=callback, cancel=cancel)
+            try:
+                with open(send_path, 'rb') as f:
+                    files = {'file': f}
+                    # Authorization header is already in session if logged in
+                    response = self.session.post(BASE_URL + "upload/", files=files)
+                # 202: stored and queued for ingestion, poll get_job(res['job']['id'])
+                return response.json() if response.status_code in (201, 202) else None
+            except Exception as e:
+                logger.error("Upload failed: %s", e)
+                return None
+        finally:
+            # Keep the compressed copy only while a resumable upload of it is unfinished
+            if send_path != file_path and not any(key[0] == os.path.abspath(send_path) for key in self._upload_sessions):
+                shutil.rmtree(os.path.dirname(send_path), ignore_errors=True)
+
+    def upload_file_resumable(self, file_path, workers=UPLOAD_WORKERS, callback=None, cancel=None):
+        """
+        Upload a file in checksummed chunks over ``workers`` parallel connections.
+
+        Each chunk is retried with backoff. If the upload still fails, calling
+        this again for the same unchanged file resumes the server session and
+        sends only the chunks it is missing. ``callback(sent_bytes, total)``
+        is called after each chunk. Setting the ``cancel`` threading.Event
+        stops sending chunks; the upload can be resumed later. Returns the same
+        result as ``upload_file``.
+        """
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime)
+        try:
+            session = self._resume_session(key)
+            if session is None:
+                response = self.session.post(BASE_URL + "upload/sessions/", json={
+                    'filename': os.path.basename(file_path),
+                    'size': stat.st_size,
+                    # Checked against the assembled file when the upload completes
+                    'sha256': file_sha256(file_path),
+                })
+                response.raise_for_status()
+                session = response.json()
+                self._upload_sessions[key] = session['id']
+
+            url = BASE_URL + f"upload/sessions/{session['id']}/"
+            chunk_size, size = session['chunk_size'], session['size']
+            sent = [size - sum(min(chunk_size, size - i * chunk_size) for i in session['missing'])]
+            lock = threading.Lock()
+
+            def send(index):
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled("Upload cancelled")
+                length = self._send_chunk(url, file_path, index, chunk_size, size)
+                if callback:
+                    with lock:
+                        sent[0] += length
+                        callback(sent[0], size)
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(send, session['missing']))
+
+            response = self.session.post(url + "complete/")
+            if response.status_code not in (201, 202):
+                logger.error("Upload failed: %s %s", response.status_code, response.text[:200])
+                if response.status_code != 400 or 'missing' not in response.json():
+                    self._upload_sessions.pop(key, None)
+                return None
+            self._upload_sessions.pop(key, None)
+            return response.json()
         except Exception as e:
-            print(f"Upload failed: {e}")
+            logger.warning("Upload interrupted, call again to resume: %s", e)
             return None
 
-    def get_history(self):
+    def _resume_session(self, key):
+        session_id = self._upload_sessions.get(key)
+        if session_id is None:
+            return None
+        response = self.session.get(BASE_URL + f"upload/sessions/{session_id}/")
+        if response.status_code == 200:
+            return response.json()
+        # Expired or already completed; start afresh
+        self._upload_sessions.pop(key, None)
+        return None
+
+    def _send_chunk(self, url, file_path, index, chunk_size, size):
+        start = index * chunk_size
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(chunk_size)
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': f"bytes {start}-{start + len(data) - 1}/{size}",
+            'X-Chunk-SHA256': hashlib.sha256(data).hexdigest(),
+        }
+        for attempt in range(UPLOAD_RETRIES):
+            try:
+                response = self.session.put(url, data=data, headers=headers)
+                if response.status_code == 200:
+                    return len(data)
+                if response.status_code == 404:
+                    response.raise_for_status()  # The session is gone; retrying won't help
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            time.sleep(0.5 * 2 ** attempt)
+        raise IOError(f"Chunk {index} failed after {UPLOAD_RETRIES} attempts")
+
+    def upload_files(self, file_paths, compress=True):
+        """
+        Upload several CSVs and/or zip/tar archives in one batch request; returns per-file results.
+
+        CSVs are gzip-compressed first unless ``compress`` is False.
+        """
+        files, copies = [], []
         try:
-            response = self.session.get(BASE_URL + "history/")
-            return response.json() if response.status_code == 200 else []
+            for path in file_paths:
+                send_path = compressed_copy(path) if compress else path
+                if send_path != path:
+                    copies.append(send_path)
+                files.append(('files', (os.path.basename(send_path), open(send_path, 'rb'))))
+            response = self.session.post(BASE_URL + "upload/batch/", files=files)
+            if response.status_code in (201, 202):
+                return response.json()
+            logger.error("Batch upload failed: %s %s", response.status_code, response.text[:200])
+            return None
+        except Exception as e:
+            logger.error("Batch upload failed: %s", e)
+            return None
+        finally:
+            for _, (_, f) in files:
+                f.close()
+            for path in copies:
+                shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    def get_job(self, job_id):
+        try:
+            response = self.session.get(BASE_URL + f"jobs/{job_id}/")
+            return response.json() if response.status_code == 200 else None
         except:
-            return []
+            return None
+
+    def wait_for_job(self, job_id, poll_interval=0.5, timeout=None, callback=None):
+        """Poll an ingest job until it is done or failed; returns the final job or None."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            if callback:
+                callback(job)
+            if job['status'] in ('done', 'failed'):
+                return job
+            if deadline and time.monotonic() > deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def _cached_get(self, path, upload_id=None, params=None):
+        """
+        GET a JSON endpoint through the on-disk cache; returns the decoded body or None.
+
+        A cached copy is revalidated with its ETag (a 304 costs no body) and
+        served as is when the server cannot be reached.
+        """
+        url = BASE_URL + path
+        key = entry = None
+        headers = {}
+        if self.cache is not None and self.username:
+            key = hashlib.sha1(json.dumps([self.username, url, sorted((params or {}).items())]).encode()).hexdigest()
+            entry = self.cache.get(key)
+            if entry and entry[0]:
+                headers['If-None-Match'] = entry[0]
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=(CONNECT_TIMEOUT, None))
+        except (requests.ConnectionError, requests.Timeout):
+            self.offline = True
+            return json.loads(entry[1]) if entry else None
+        self.offline = False
+        if response.status_code == 304 and entry:
+            return json.loads(entry[1])
+        if response.status_code != 200:
+            return None
+        if key and response.headers.get('ETag'):
+            self.cache.put(key, self.username, upload_id, response.headers['ETag'], response.content)
+        return response.json()
+
+    def get_history(self, cursor=None, since=None, limit=None):
+        """
+        One page of upload history, newest first: {'results', 'next_cursor', 'latest_id'}.
+
+        Pass the ``latest_id`` of an earlier answer as ``since`` to get only
+        the uploads made after it.
+        """
+        params = {k: v for k, v in (('cursor', cursor), ('since', since), ('limit', limit)) if v}
+        try:
+            return self._cached_get("history/", params=params)
+        except:
+            return None
 
     def get_summary(self, upload_id):
         try:
-            response = self.session.get(BASE_URL + f"summary/{upload_id}/")
-            return response.json() if response.status_code == 200 else None
+            return self._cached_get(f"summary/{upload_id}/", upload_id)
         except:
             return None
 
-    def get_data(self, upload_id):
+    def get_chart(self, upload_id, buckets=None, bins=None):
+        """Downsampled series, histograms and type distribution; size is independent of the upload."""
+        params = {k: v for k, v in (('buckets', buckets), ('bins', bins)) if v}
         try:
-            response = self.session.get(BASE_URL + f"data/{upload_id}/")
-            return response.json() if response.status_code == 200 else []
+            return self._cached_get(f"chart/{upload_id}/", upload_id, params)
         except:
-            return []
+            return None
+
+    def get_data(self, upload_id, cursor=None, limit=None, fields=None, ordering=None, **filters):
+        """
+        Fetch one page of equipment rows: {'results': [...], 'next_cursor': ...}.
+
+        ``filters`` are passed through as query parameters, e.g.
+        equipment_type='Pump', flowrate_min=100.
+        """
+        params = dict(filters)
+        if cursor:
+            params['cursor'] = cursor
+        if limit:
+            params['limit'] = limit
+        if fields:
+            params['fields'] = ','.join(fields)
+        if ordering:
+            params['ordering'] = ordering
+        try:
+            return self._cached_get(f"data/{upload_id}/", upload_id, params)
+        except:
+            return None
+
+    def iter_data(self, upload_id, **kwargs):
+        """Yield equipment rows page by page, fetching the next page only when needed."""
+        cursor = None
+        while True:
+            page = self.get_data(upload_id, cursor=cursor, **kwargs)
+            if not page:
+                return
+            yield from page['results']
+            cursor = page['next_cursor']
+            if not cursor:
+                return
+
+    def get_arrays(self, upload_id, **filters):
+        """
+        Load the numeric columns of an upload as NumPy arrays in one request.
+
+        Uses the server's raw little-endian float64 format, so the arrays are
+        views over the response body rather than parsed JSON lists.
+        """
+        try:
+            response = self.session.get(BASE_URL + f"data/{upload_id}/", params=filters,
+                                        headers={'Accept': 'application/octet-stream'})
+            if response.status_code != 200:
+                return None
+            columns = response.headers['X-Columns'].split(',')
+            matrix = np.frombuffer(response.content, dtype='<f8').reshape(-1, len(columns))
+            return {name: matrix[:, i] for i, name in enumerate(columns)}
+        except Exception as e:
+            logger.error("Loading arrays failed: %s", e)
+            return None
+
+    def export_data(self, upload_id, save_path, fmt='csv', **filters):
+        """Stream an upload (optionally filtered) to disk as csv, ndjson, arrow, parquet or f8."""
+        try:
+            params = dict(filters, format=fmt)
+            # requests asks for gzip and decodes it transparently while streaming
+            with self.session.get(BASE_URL + f"export/{upload_id}/", params=params, stream=True) as r:
+                r.raise_for_status()
+                with open(save_path, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=65536):
+                        f.write(chunk)
+            return True
+        except Exception as e:
+            logger.error("Export failed: %s", e)
+            return False
 
-    def download_report(self, upload_id, save_path):
+    def download_report(self, upload_id, save_path, detail='summary', timeout=300, cancel=None):
         try:
-            # Use stream=True for large files
-            with self.session.get(BASE_URL + f"report/{upload_id}/", stream=True) as r:
+            # The server renders reports in the background: 202 until the PDF is ready
+            deadline = time.monotonic() + timeout
+            while True:
+                r = self.session.get(BASE_URL + f"report/{upload_id}/", params={'detail': detail}, stream=True)
+                if r.status_code != 202:
+                    break
+                r.close()
+                if time.monotonic() > deadline:
+                    logger.error("Download failed: report %s not ready after %s s", upload_id, timeout)
+                    return False
+                if cancel is not None and cancel.is_set():
+                    return False
+                time.sleep(float(r.headers.get('Retry-After', 2)))
+            with r:
                 r.raise_for_status()
                 with open(save_path, 'wb') as f:
                     for chunk in r.iter_content(chunk_size=8192):
                         f.write(chunk)
             return True
         except Exception as e:
-            print(f"Download failed: {e}")
+            logger.error("Download failed: %s", e)
             return False
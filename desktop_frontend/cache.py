@@ -0,0 +1,128 @@
+"""
+Persistent response cache for the desktop client.
+
+Uploads never change once ingested, so their summaries, charts and data pages
+are kept in a SQLite file under the user's profile. Each entry stores the
+server's ETag: a repeat view sends it as If-None-Match and the server answers
+304 without a body (core/caching.py on the backend). When the server cannot be
+reached at all, the stored copy is served as is, so uploads viewed before can
+be browsed offline.
+
+Entries are grouped by upload. Once the file exceeds its size cap, whole
+uploads are evicted, least recently viewed first.
+"""
+import hashlib
+import hmac
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+PASSWORD_ITERATIONS = 200_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key       TEXT PRIMARY KEY,
+    user      TEXT NOT NULL,
+    upload_id INTEGER,
+    etag      TEXT,
+    body      BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    accessed  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_upload ON entries (user, upload_id);
+CREATE TABLE IF NOT EXISTS users (
+    name     TEXT PRIMARY KEY,
+    salt     BLOB NOT NULL,
+    password BLOB NOT NULL
+);
+"""
+
+
+def default_path():
+    """cache.sqlite3 in the platform's per-user cache directory."""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'chemical-equipment-visualizer', 'cache.sqlite3')
+
+
+def _password_hash(password, salt):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, PASSWORD_ITERATIONS)
+
+
+class ResponseCache:
+    """
+    SQLite store of API responses, shared by the client's worker threads.
+
+    ``get`` returns ``(etag, body)`` or None; ``put`` stores a
+    response under ``key`` for ``user`` and, for per-upload resources, the
+    upload it belongs to.
+    """
+
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES):
+        self.path = path or default_path()
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT etag, body FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        return row
+
+    def put(self, key, user, upload_id, etag, body):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (key, user, upload_id, etag, body, size, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, user, upload_id, etag, body, len(body), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Whole uploads go at once: a half-cached upload could not be shown offline anyway
+        groups = self._db.execute(
+            'SELECT user, upload_id, SUM(size) FROM entries GROUP BY user, upload_id ORDER BY MAX(accessed)'
+        ).fetchall()
+        for user, upload_id, size in groups:
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM entries WHERE user = ? AND upload_id IS ?', (user, upload_id))
+            total -= size
+
+    def size(self):
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def clear(self, user=None):
+        with self._lock:
+            if user is None:
+                self._db.execute('DELETE FROM entries')
+            else:
+                self._db.execute('DELETE FROM entries WHERE user = ?', (user,))
+
+    def remember_login(self, user, password):
+        """Keep a salted hash of a successful login so the user can sign in offline."""
+        salt = os.urandom(16)
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO users (name, salt, password) VALUES (?, ?, ?)',
+                             (user, salt, _password_hash(password, salt)))
+
+    def check_login(self, user, password):
+        with self._lock:
+            row = self._db.execute('SELECT salt, password FROM users WHERE name = ?', (user,)).fetchone()
+        return row is not None and hmac.compare_digest(_password_hash(password, row[0]), row[1])
@@ -0,0 +1,282 @@
+"""
+Dashboard charts.
+
+Three views of the selected upload:
+
+    Overview           min/max/mean series of flow and pressure over row index,
+                       plus the equipment type distribution
+    Histograms         flow, pressure and temperature
+    Flow vs Pressure   every row binned on a 2D grid, coloured by mean temperature
+
+The series and histograms come already reduced from /api/chart/; the scatter
+is binned here from the raw columns (APIClient.get_arrays) with
+np.histogram2d, so a million rows become one image of SCATTER_BINS² cells.
+
+pyqtgraph is used when installed (pan/zoom on every view, peak-preserving
+downsampling when zoomed out); otherwise matplotlib. Either way the plot
+items are created once and only their data changes between uploads.
+"""
+import numpy as np
+from PyQt5.QtCore import QRectF
+from PyQt5.QtWidgets import QStackedWidget, QVBoxLayout, QWidget
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+try:
+    import pyqtgraph as pg
+except ImportError:  # optional dependency
+    pg = None
+
+VIEWS = ('Overview', 'Histograms', 'Flow vs Pressure')
+SCATTER_VIEW = 2
+SCATTER_BINS = 300
+PARAMETERS = (('flowrate', 'Flow'), ('pressure', 'Pressure'), ('temperature', 'Temp'))
+SERIES = PARAMETERS[:2]
+COLORS = ('#38bdf8', '#f97316', '#a3e635')
+
+
+def density(x, y, z, bins=SCATTER_BINS):
+    """
+    Bin the points (x, y) on a ``bins`` x ``bins`` grid.
+
+    Returns ``(counts, means, extent)``: points per cell, mean ``z`` per cell
+    (NaN where empty) and the grid's (x0, x1, y0, y1).
+    """
+    counts, xedges, yedges = np.histogram2d(x, y, bins=bins)
+    sums = np.histogram2d(x, y, bins=(xedges, yedges), weights=z)[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return counts, means, (xedges[0], xedges[-1], yedges[0], yedges[-1])
+
+
+def _band(x, low, high):
+    """Polygon outlining the area between two series."""
+    x = np.asarray(x, dtype=float)
+    return np.r_[np.column_stack([x, high]), np.column_stack([x[::-1], np.asarray(low)[::-1]])]
+
+
+def _limits(*arrays):
+    values = np.concatenate([np.asarray(a, dtype=float).ravel() for a in arrays])
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return 0.0, 1.0
+    low, high = values.min(), values.max()
+    pad = (high - low) * 0.05 or 0.5
+    return low - pad, high + pad
+
+
+class MatplotlibCharts(QWidget):
+    """The chart views on matplotlib, one figure per view."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stack = QStackedWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.stack)
+        self.setLayout(layout)
+        self.canvases = []
+        for _ in VIEWS:
+            canvas = FigureCanvas(Figure(figsize=(8, 4)))
+            self.canvases.append(canvas)
+            self.stack.addWidget(canvas)
+
+        overview = self.canvases[0].figure
+        self.series_ax = overview.add_subplot(121)
+        self.lines, self.bands = {}, {}
+        for (name, label), color in zip(SERIES, COLORS):
+            self.lines[name], = self.series_ax.plot([], [], color=color, label=label)
+            self.bands[name] = self.series_ax.fill_between([0, 1], 0, 0, color=color, alpha=0.2)
+        self.series_ax.legend()
+        self.series_ax.set_title("Parameters")
+        self.series_ax.set_xlabel("Row")
+        self.types_ax = overview.add_subplot(122)
+        self.types_ax.set_title("Distribution")
+        self.bars, self.bar_labels = None, None
+
+        # Hover readout, redrawn by blitting over a saved background
+        self.cursor = self.series_ax.axvline(0, color='grey', lw=0.8, animated=True, visible=False)
+        self.readout = self.series_ax.text(0.02, 0.02, '', transform=self.series_ax.transAxes, va='bottom',
+                                           animated=True)
+        self.background = None
+        self.index = np.empty(0)
+        self.means = {}
+        self.canvases[0].mpl_connect('draw_event', self.save_background)
+        self.canvases[0].mpl_connect('motion_notify_event', self.hover)
+
+        histograms = self.canvases[1].figure
+        self.steps = {}
+        for i, ((name, label), color) in enumerate(zip(PARAMETERS, COLORS)):
+            ax = histograms.add_subplot(1, len(PARAMETERS), i + 1)
+            self.steps[name] = ax.stairs([0], [0, 1], fill=True, color=color, alpha=0.7)
+            ax.set_title(label)
+
+        scatter = self.canvases[2].figure
+        self.scatter_ax = scatter.add_subplot(111)
+        self.image = self.scatter_ax.imshow(np.full((1, 1), np.nan), origin='lower', aspect='auto', cmap='inferno')
+        scatter.colorbar(self.image, ax=self.scatter_ax, label="Mean temperature")
+        self.scatter_ax.set_xlabel("Flow")
+        self.scatter_ax.set_ylabel("Pressure")
+
+    def set_view(self, view):
+        self.stack.setCurrentIndex(view)
+
+    def set_chart(self, summary, chart):
+        x = np.asarray(chart['index'], dtype=float)
+        series = chart['series']
+        for name, _ in SERIES:
+            self.lines[name].set_data(x, series[name]['mean'])
+            self.bands[name].set_verts([_band(x, series[name]['min'], series[name]['max'])])
+            self.means[name] = np.asarray(series[name]['mean'], dtype=float)
+        self.index = x
+        if len(x):
+            self.series_ax.set_xlim(x[0], max(x[-1], x[0] + 1))
+        self.series_ax.set_ylim(*_limits(*(series[name][k] for name, _ in SERIES for k in ('min', 'max'))))
+
+        types = [d['equipment_type'] for d in summary['type_distribution']]
+        counts = [d['count'] for d in summary['type_distribution']]
+        if types != self.bar_labels:
+            # Only a handful of bars; rebuilt when the set of types changes
+            if self.bars is not None:
+                self.bars.remove()
+            self.bars = self.types_ax.bar(types, counts, color='teal')
+            self.bar_labels = types
+        else:
+            for bar, count in zip(self.bars, counts):
+                bar.set_height(count)
+        self.types_ax.set_ylim(0, max(counts, default=0) * 1.05 or 1)
+
+        for name, _ in PARAMETERS:
+            histogram = chart['histograms'][name]
+            step = self.steps[name]
+            step.set_data(histogram['counts'], histogram['edges'])
+            step.axes.set_xlim(histogram['edges'][0], histogram['edges'][-1])
+            step.axes.set_ylim(0, max(histogram['counts'], default=0) * 1.05 or 1)
+
+        for canvas in self.canvases[:2]:
+            canvas.figure.tight_layout()
+            canvas.draw_idle()
+
+    def set_arrays(self, arrays):
+        counts, means, extent = density(arrays['flowrate'], arrays['pressure'], arrays['temperature'])
+        self.image.set_data(means.T)
+        self.image.set_extent(extent)
+        finite = means[np.isfinite(means)]
+        if len(finite):
+            self.image.set_clim(finite.min(), finite.max())
+        self.scatter_ax.set_xlim(extent[0], extent[1])
+        self.scatter_ax.set_ylim(extent[2], extent[3])
+        self.scatter_ax.set_title(f"{int(counts.sum())} rows")
+        self.canvases[2].draw_idle()
+
+    def clear_arrays(self):
+        self.image.set_data(np.full((1, 1), np.nan))
+        self.scatter_ax.set_title("Loading...")
+        self.canvases[2].draw_idle()
+
+    def save_background(self, event):
+        self.background = self.canvases[0].copy_from_bbox(self.canvases[0].figure.bbox)
+
+    def hover(self, event):
+        if self.background is None or event.inaxes is not self.series_ax or not len(self.index):
+            return
+        i = min(np.searchsorted(self.index, event.xdata), len(self.index) - 1)
+        self.cursor.set_xdata([self.index[i], self.index[i]])
+        self.cursor.set_visible(True)
+        self.readout.set_text(f"Row {self.index[i]:.0f}: " + ", ".join(
+            f"{label} {self.means[name][i]:.2f}" for name, label in SERIES))
+        canvas = self.canvases[0]
+        canvas.restore_region(self.background)
+        self.series_ax.draw_artist(self.cursor)
+        self.series_ax.draw_artist(self.readout)
+        canvas.blit(canvas.figure.bbox)
+
+
+class PyqtgraphCharts(QWidget):
+    """The chart views on pyqtgraph."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stack = QStackedWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.stack)
+        self.setLayout(layout)
+        pages = [pg.GraphicsLayoutWidget() for _ in VIEWS]
+        for page in pages:
+            self.stack.addWidget(page)
+
+        self.series_plot = pages[0].addPlot(title="Parameters")
+        self.series_plot.setLabel('bottom', "Row")
+        self.series_plot.addLegend()
+        # Only the visible part is drawn, reduced to min/max per pixel column
+        self.series_plot.setDownsampling(auto=True, mode='peak')
+        self.series_plot.setClipToView(True)
+        self.lines, self.edges = {}, {}
+        for (name, label), color in zip(SERIES, COLORS):
+            low, high = pg.PlotCurveItem(), pg.PlotCurveItem()
+            band = pg.mkColor(color)
+            band.setAlpha(50)
+            fill = pg.FillBetweenItem(low, high, brush=pg.mkBrush(band))
+            self.series_plot.addItem(fill)
+            self.edges[name] = (low, high)
+            self.lines[name] = self.series_plot.plot(pen=pg.mkPen(color), name=label)
+        self.types_plot = pages[0].addPlot(title="Distribution")
+        self.bars = pg.BarGraphItem(x=[], height=[], width=0.6, brush='teal')
+        self.types_plot.addItem(self.bars)
+
+        self.steps = {}
+        for (name, label), color in zip(PARAMETERS, COLORS):
+            plot = pages[1].addPlot(title=label)
+            self.steps[name] = plot.plot(stepMode='center', fillLevel=0, brush=color, pen=pg.mkPen(color))
+
+        self.scatter_plot = pages[2].addPlot(title="Flow vs Pressure")
+        self.scatter_plot.setLabel('bottom', "Flow")
+        self.scatter_plot.setLabel('left', "Pressure")
+        self.image = pg.ImageItem()
+        self.image.setColorMap(pg.colormap.get('inferno'))
+        self.scatter_plot.addItem(self.image)
+        self.colorbar = pg.ColorBarItem(colorMap=pg.colormap.get('inferno'), label="Mean temperature",
+                                        interactive=False)
+        self.colorbar.setImageItem(self.image, insert_in=self.scatter_plot)
+
+    def set_view(self, view):
+        self.stack.setCurrentIndex(view)
+
+    def set_chart(self, summary, chart):
+        x = np.asarray(chart['index'], dtype=float)
+        series = chart['series']
+        for name, _ in SERIES:
+            low, high = self.edges[name]
+            low.setData(x, np.asarray(series[name]['min'], dtype=float))
+            high.setData(x, np.asarray(series[name]['max'], dtype=float))
+            self.lines[name].setData(x, np.asarray(series[name]['mean'], dtype=float))
+        self.series_plot.enableAutoRange()
+
+        types = [d['equipment_type'] for d in summary['type_distribution']]
+        counts = [d['count'] for d in summary['type_distribution']]
+        self.bars.setOpts(x=np.arange(len(types)), height=counts)
+        self.types_plot.getAxis('bottom').setTicks([list(enumerate(types))])
+        self.types_plot.enableAutoRange()
+
+        for name, _ in PARAMETERS:
+            histogram = chart['histograms'][name]
+            self.steps[name].setData(histogram['edges'], histogram['counts'])
+
+    def set_arrays(self, arrays):
+        counts, means, (x0, x1, y0, y1) = density(arrays['flowrate'], arrays['pressure'], arrays['temperature'])
+        self.image.setImage(means, autoLevels=False)
+        finite = means[np.isfinite(means)]
+        if len(finite):
+            self.colorbar.setLevels((finite.min(), finite.max()))
+        self.image.setRect(QRectF(x0, y0, x1 - x0, y1 - y0))
+        self.scatter_plot.setTitle(f"Flow vs Pressure ({int(counts.sum())} rows)")
+        self.scatter_plot.enableAutoRange()
+
+    def clear_arrays(self):
+        self.image.clear()
+        self.scatter_plot.setTitle("Flow vs Pressure (loading...)")
+
+
+def make_charts(parent=None):
+    return PyqtgraphCharts(parent) if pg is not None else MatplotlibCharts(parent)
@@ -1,13 +1,20 @@
+import logging
 import sys
 import os
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QFileDialog, QTableWidget, QTableWidgetItem, 
-                             QListWidget, QMessageBox, QTabWidget, QHeaderView, QLineEdit, QDialog, QFormLayout)
-from PyQt5.QtCore import Qt
+                             QListWidget, QMessageBox, QTabWidget, QHeaderView, QLineEdit, QDialog, QFormLayout,
+                             QProgressBar, QTableView, QComboBox, QListWidgetItem)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QColor
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from api_client import APIClient
+from charts import SCATTER_VIEW, VIEWS, make_charts
+from table_model import FIELDS, EquipmentTableModel
+from workers import RequestGroup
+
+TABLE_PAGE_SIZE = 5000  # rows per request as the table is scrolled
+FILTER_DELAY_MS = 300  # typing pause before the table filter is sent to the server
+HISTORY_DELTA_LIMIT = 500  # new uploads fetched per refresh before falling back to a full reload
 
 # Theme Colors
 DARK_THEME = """
@@ -162,6 +169,11 @@ class DashboardTab(QWidget):
     def __init__(self, client):
         super().__init__()
         self.client = client
+        # API calls run on the thread pool (workers.py); the selected upload's
+        # loads are cancelled together when another upload is picked
+        self.requests = RequestGroup()
+        self.history_requests = RequestGroup()
+        self.downloads = RequestGroup()
         self.init_ui()
         self.refresh_history()
 
@@ -175,8 +187,11 @@ class DashboardTab(QWidget):
         
         self.history_list = QListWidget()
         self.history_list.itemClicked.connect(self.load_selected_upload)
+        self.history_list.verticalScrollBar().valueChanged.connect(self.load_more_history)
+        self.history_latest = None  # newest upload id listed; refreshes ask only for newer ones
+        self.history_cursor = None
         
-        self.sidebar_layout.addWidget(QLabel("<b>Recent Uploads</b>"))
+        self.sidebar_layout.addWidget(QLabel("<b>Uploads</b>"))
         self.sidebar_layout.addWidget(self.history_list)
         self.sidebar_layout.addWidget(self.refresh_btn)
         
@@ -188,11 +203,35 @@ class DashboardTab(QWidget):
         main_layout = QVBoxLayout()
         self.stats_label = QLabel("Select an upload from history to view data.")
         self.stats_label.setStyleSheet("font-size: 14px; padding: 10px;")
-        
-        self.figure = plt.figure(figsize=(8, 4))
-        self.canvas = FigureCanvas(self.figure)
-        
-        self.table = QTableWidget()
+
+        # Requests of the selected upload still in flight
+        self.progress = QProgressBar()
+        self.progress.setFormat("Loading... %v of %m")
+        self.progress.hide()
+        
+        # Plot items are built once and reused for every upload; see charts.py
+        self.charts = make_charts()
+        self.chart_view = QComboBox()
+        self.chart_view.addItems(VIEWS)
+        self.chart_view.currentIndexChanged.connect(self.change_chart_view)
+        
+        # Only the visible cells are ever materialized; see table_model.py
+        self.table_model = EquipmentTableModel(fetch_page=self.load_page)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter by name or type")
+        # Filtering is a server query: wait for a pause in typing before sending it
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(lambda: self.table_model.set_filter(self.filter_edit.text()))
+        self.filter_edit.textChanged.connect(self.filter_timer.start)
 
         # Download Button
         self.download_btn = QPushButton("Download Report (PDF)")
@@ -201,8 +240,11 @@ class DashboardTab(QWidget):
         self.download_btn.clicked.connect(self.download_report)
         
         main_layout.addWidget(self.stats_label)
+        main_layout.addWidget(self.progress)
         main_layout.addWidget(self.download_btn)
-        main_layout.addWidget(self.canvas)
+        main_layout.addWidget(self.chart_view)
+        main_layout.addWidget(self.charts, stretch=1)
+        main_layout.addWidget(self.filter_edit)
         main_layout.addWidget(self.table)
         
         layout.addWidget(sidebar_widget)
@@ -210,30 +252,141 @@ class DashboardTab(QWidget):
         self.setLayout(layout)
 
     def refresh_history(self):
-        history = self.client.get_history()
+        self.history_requests.cancel()
+        self.refresh_btn.setEnabled(False)
+        if self.history_latest is None:
+            self.history_requests.submit(self.client.get_history, on_result=self.history_loaded,
+                                         on_finished=lambda: self.refresh_btn.setEnabled(True))
+        else:
+            self.history_requests.submit(self.client.get_history, since=self.history_latest,
+                                         limit=HISTORY_DELTA_LIMIT, on_result=self.history_delta_loaded,
+                                         on_finished=lambda: self.refresh_btn.setEnabled(True))
+
+    def history_loaded(self, page):
+        if not page:
+            return
         self.history_list.clear()
-        for item in history:
-            self.history_list.addItem(f"#{item['id']} ({item['uploaded_at'][:10]})")
-            self.history_list.item(self.history_list.count()-1).setData(Qt.UserRole, item['id'])
+        self.add_history(page['results'])
+        self.history_cursor = page['next_cursor']
+        self.history_latest = page['latest_id']
+
+    def history_delta_loaded(self, page):
+        if not page:
+            return
+        if page['next_cursor']:
+            # Too many new uploads to merge; start again from the first page
+            self.history_latest = None
+            self.refresh_history()
+            return
+        listed = {self.history_list.item(i).data(Qt.UserRole) for i in range(self.history_list.count())}
+        self.add_history([item for item in page['results'] if item['id'] not in listed], row=0)
+        self.history_latest = page['latest_id'] or self.history_latest
+
+    def load_more_history(self, value):
+        # Older uploads, a page at a time, once the list is scrolled to the bottom
+        if value < self.history_list.verticalScrollBar().maximum() or not self.history_cursor:
+            return
+        if self.history_requests.pending:
+            return
+        self.history_requests.submit(self.client.get_history, cursor=self.history_cursor,
+                                     on_result=self.more_history_loaded)
+
+    def more_history_loaded(self, page):
+        if page:
+            self.add_history(page['results'])
+            self.history_cursor = page['next_cursor']
+
+    def add_history(self, items, row=None):
+        """Insert uploads (newest first) at ``row``, or below the listed ones."""
+        row = self.history_list.count() if row is None else row
+        for offset, item in enumerate(items):
+            entry = QListWidgetItem(f"#{item['id']} ({item['uploaded_at'][:10]})")
+            entry.setData(Qt.UserRole, item['id'])
+            self.history_list.insertItem(row + offset, entry)
+
+    def load(self, fn, *args, on_result, **kwargs):
+        """Run an API call for the selected upload, counted in the progress bar."""
+        self.progress.setMaximum(self.progress.maximum() + 1)
+        self.progress.show()
+        self.requests.submit(fn, *args, on_result=on_result, on_finished=self.loaded, **kwargs)
+
+    def loaded(self):
+        self.progress.setValue(self.progress.value() + 1)
+        if not self.requests.pending:
+            self.progress.hide()
 
     def load_selected_upload(self, item):
-        self.current_upload_id = item.data(Qt.UserRole)
-        summary = self.client.get_summary(self.current_upload_id)
-        data = self.client.get_data(self.current_upload_id)
-        
-        if summary:
-            avgs = summary['averages']
-            self.stats_label.setText(
-                f"<b>Upload #{self.current_upload_id}</b> | Total: {summary['total_count']} | "
-                f"Avg Flow: {avgs['avg_flowrate']:.2f} | "
-                f"Pressure: {avgs['avg_pressure']:.2f} | "
-                f"Temp: {avgs['avg_temperature']:.2f}"
-            )
-            self.update_charts(summary, data)
-            self.download_btn.setEnabled(True)
-        
-        if data:
-            self.update_table(data)
+        # Results for the previously selected upload are no longer wanted
+        self.requests.cancel()
+        self.progress.setRange(0, 0)
+        self.progress.setValue(0)
+        self.current_upload_id = upload_id = item.data(Qt.UserRole)
+        self.summary = self.chart = None
+        self.arrays_requested = False
+        self.table_model.clear()
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.filter_edit.clear()
+        self.filter_timer.stop()
+        self.download_btn.setEnabled(False)
+        self.stats_label.setText(f"<b>Upload #{upload_id}</b> | Loading...")
+
+        # Summary, chart and first page are independent: fetch them at once
+        self.load(self.client.get_summary, upload_id, on_result=self.summary_loaded)
+        self.load(self.client.get_chart, upload_id, on_result=self.chart_loaded)
+        self.table_model.reload()
+        if self.chart_view.currentIndex() == SCATTER_VIEW:
+            self.load_arrays()
+
+    def summary_loaded(self, summary):
+        if not summary:
+            reason = "Not viewed before, unavailable offline" if self.client.offline else "Failed to load summary"
+            self.stats_label.setText(f"<b>Upload #{self.current_upload_id}</b> | {reason}")
+            return
+        avgs = summary['averages']
+        self.stats_label.setText(
+            f"<b>Upload #{self.current_upload_id}</b> | Total: {summary['total_count']} | "
+            f"Avg Flow: {avgs['avg_flowrate']:.2f} | "
+            f"Pressure: {avgs['avg_pressure']:.2f} | "
+            f"Temp: {avgs['avg_temperature']:.2f}"
+            + (" | <i>Offline copy</i>" if self.client.offline else "")
+        )
+        # Reports are rendered by the server
+        self.download_btn.setEnabled(not self.client.offline)
+        self.summary = summary
+        if self.chart:
+            self.charts.set_chart(self.summary, self.chart)
+
+    def chart_loaded(self, chart):
+        self.chart = chart
+        if self.summary and self.chart:
+            self.charts.set_chart(self.summary, self.chart)
+
+    def change_chart_view(self, view):
+        self.charts.set_view(view)
+        if view == SCATTER_VIEW and hasattr(self, 'current_upload_id') and not self.arrays_requested:
+            self.load_arrays()
+
+    def load_arrays(self):
+        # Every row's numeric columns, for the scatter view only; fetched on first use
+        self.arrays_requested = True
+        self.charts.clear_arrays()
+        self.load(self.client.get_arrays, self.current_upload_id,
+                  on_result=lambda arrays: arrays and self.charts.set_arrays(arrays))
+
+    def load_page(self, cursor, query):
+        # Columnar pages go straight into the model's NumPy arrays; ``query``
+        # holds the table's ordering and search
+        if not hasattr(self, 'current_upload_id'):
+            self.table_model.page_failed(query)  # Sorted or filtered before any upload was picked
+            return
+        self.load(self.client.get_data, self.current_upload_id, cursor=cursor, limit=TABLE_PAGE_SIZE,
+                  fields=FIELDS, layout='columnar', **query, on_result=lambda page: self.page_loaded(page, query))
+
+    def page_loaded(self, page, query):
+        if not page:
+            self.table_model.page_failed(query)
+            return
+        self.table_model.append_page(page['columns'], page['next_cursor'], query)
 
     def download_report(self):
         if not hasattr(self, 'current_upload_id'):
@@ -241,49 +394,34 @@ class DashboardTab(QWidget):
             
         path, _ = QFileDialog.getSaveFileName(self, "Save Report", f"report_{self.current_upload_id}.pdf", "PDF Files (*.pdf)")
         if path:
-            if self.client.download_report(self.current_upload_id, path):
-                QMessageBox.information(self, "Success", f"Report saved to {path}")
-            else:
-                QMessageBox.warning(self, "Error", "Failed to download report.")
-
-    def update_charts(self, summary, data):
-        self.figure.clear()
-        
-        # Line Chart
-        ax1 = self.figure.add_subplot(121)
-        names = [d['equipment_name'] for d in data]
-        ax1.plot(names, [d['flowrate'] for d in data], label='Flow')
-        ax1.plot(names, [d['pressure'] for d in data], label='Pressure')
-        ax1.legend()
-        ax1.set_title("Parameters")
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # Bar Chart
-        ax2 = self.figure.add_subplot(122)
-        types = [d['equipment_type'] for d in summary['type_distribution']]
-        counts = [d['count'] for d in summary['type_distribution']]
-        ax2.bar(types, counts, color='teal')
-        ax2.set_title("Distribution")
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
-
-    def update_table(self, data):
-        self.table.setRowCount(len(data))
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(['Name', 'Type', 'Flow', 'Press', 'Temp'])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        for i, row in enumerate(data):
-            self.table.setItem(i, 0, QTableWidgetItem(str(row['equipment_name'])))
-            self.table.setItem(i, 1, QTableWidgetItem(str(row['equipment_type'])))
-            self.table.setItem(i, 2, QTableWidgetItem(str(row['flowrate'])))
-            self.table.setItem(i, 3, QTableWidgetItem(str(row['pressure'])))
-            self.table.setItem(i, 4, QTableWidgetItem(str(row['temperature'])))
+            # The server may take a while to render the PDF; wait for it off the UI thread
+            self.download_btn.setEnabled(False)
+            self.download_btn.setText("Preparing Report...")
+            self.downloads.submit(self.client.download_report, self.current_upload_id, path, detail='top', with_cancel=True,
+                                  on_result=lambda ok: self.report_downloaded(ok, path),
+                                  on_finished=self.report_finished)
+
+    def report_downloaded(self, ok, path):
+        if ok:
+            QMessageBox.information(self, "Success", f"Report saved to {path}")
+        else:
+            QMessageBox.warning(self, "Error", "Failed to download report.")
+
+    def report_finished(self):
+        self.download_btn.setText("Download Report (PDF)")
+        self.download_btn.setEnabled(self.summary is not None and not self.client.offline)
 
 class UploadTab(QWidget):
     def __init__(self, client):
         super().__init__()
         self.client = client
+        self.uploads = RequestGroup()  # the upload being sent
+        self.polls = RequestGroup()  # job status requests
+        # Separate timers, so cancelling one kind of polling never leaves the other's slot connected
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.poll_job)
+        self.batch_timer = QTimer(self)
+        self.batch_timer.timeout.connect(self.poll_batch)
         self.init_ui()
 
     def init_ui(self):
@@ -300,29 +438,208 @@ class UploadTab(QWidget):
         btn.setFixedSize(200, 50)
         btn.setStyleSheet("font-size: 14px; background-color: #3b82f6; color: white; border-radius: 5px;")
         btn.clicked.connect(self.upload_file)
-        
+
+        # Batch mode: many CSVs / zip or tar archives, or every CSV in a folder, in one request
+        batch_row = QHBoxLayout()
+        files_btn = QPushButton("Select Multiple Files")
+        files_btn.clicked.connect(self.upload_many)
+        folder_btn = QPushButton("Select Folder")
+        folder_btn.clicked.connect(self.upload_folder)
+        batch_row.addStretch()
+        batch_row.addWidget(files_btn)
+        batch_row.addWidget(folder_btn)
+        batch_row.addStretch()
+        self.upload_buttons = (btn, files_btn, folder_btn)
+
+        # Shown while a file is being sent; large files report bytes and can be cancelled
+        progress_row = QHBoxLayout()
+        self.progress = QProgressBar()
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setStyleSheet("background-color: #ef4444; color: white;")
+        self.cancel_btn.clicked.connect(self.cancel_upload)
+        progress_row.addWidget(self.progress, stretch=1)
+        progress_row.addWidget(self.cancel_btn)
+        self.progress.hide()
+        self.cancel_btn.hide()
+
+        self.batch_list = QListWidget()
+        self.batch_list.hide()
+
         layout.addStretch()
         layout.addWidget(title)
         layout.addWidget(btn, alignment=Qt.AlignCenter)
+        layout.addLayout(batch_row)
         layout.addWidget(self.status)
+        layout.addLayout(progress_row)
+        layout.addWidget(self.batch_list)
         layout.addStretch()
         self.setLayout(layout)
 
+    def sending(self, active, cancellable=False):
+        for button in self.upload_buttons:
+            button.setEnabled(not active)
+        # Busy indicator until the first progress report
+        self.progress.setRange(0, 0)
+        self.progress.setVisible(active)
+        self.cancel_btn.setVisible(active and cancellable)
+
     def upload_file(self):
         fname, _ = QFileDialog.getOpenFileName(self, 'Open CSV', '', 'CSV Files (*.csv)')
         if fname:
+            self.job_timer.stop()
+            self.batch_timer.stop()
+            self.polls.cancel()
             self.status.setText("Uploading...")
-            res = self.client.upload_file(fname)
-            if res:
-                self.status.setText(f"Success! Upload ID: {res['id']}")
-                QMessageBox.information(self, "Success", "File uploaded successfully!")
+            self.sending(True, cancellable=True)
+            self.uploads.submit(self.client.upload_file, fname, with_cancel=True,
+                                on_progress=self.upload_progress, on_result=self.upload_done,
+                                on_error=self.upload_error, on_finished=lambda: self.sending(False))
+
+    def upload_progress(self, sent, total):
+        # Percent, as byte counts overflow QProgressBar's int range
+        self.progress.setRange(0, 100)
+        self.progress.setValue(int(sent * 100 / total))
+        self.status.setText(f"Uploading... {sent / 2**20:.0f} of {total / 2**20:.0f} MB")
+
+    def upload_error(self, error):
+        self.status.setText(f"Upload Failed: {error}")
+
+    def cancel_upload(self):
+        self.uploads.cancel()
+        self.sending(False)
+        self.status.setText("Upload cancelled; select the same file again to resume it")
+
+    def upload_done(self, res):
+        if not res:
+            self.status.setText("Upload Failed")
+            return
+
+        self.upload_id = res['id']
+        self.job_id = res['job']['id']
+        if res['job']['status'] == 'done':
+            self.job_finished(res['job'])
+        else:
+            # Ingestion runs on the server; poll its progress without blocking the UI
+            self.status.setText(f"Processing upload #{self.upload_id}...")
+            self.job_timer.start(500)
+
+    def poll_job(self):
+        # One request at a time, however slow the server answers
+        if self.polls.pending:
+            return
+        self.polls.submit(self.client.get_job, self.job_id, on_result=self.job_polled)
+
+    def job_polled(self, job):
+        if job is None:
+            self.job_timer.stop()
+            self.status.setText("Lost track of the upload job")
+            return
+        if job['status'] in ('done', 'failed'):
+            self.job_timer.stop()
+            self.job_finished(job)
+        else:
+            self.status.setText(
+                f"Processing upload #{self.upload_id}... {job['progress'] * 100:.0f}% "
+                f"({job['rows_processed']} rows)"
+            )
+
+    def job_finished(self, job):
+        if job['status'] == 'done':
+            self.status.setText(f"Success! Upload ID: {self.upload_id} ({job['rows_processed']} rows)")
+            QMessageBox.information(self, "Success", "File uploaded successfully!")
+        else:
+            self.status.setText("Upload Failed")
+            QMessageBox.warning(self, "Error", f"Upload failed: {job['error']}")
+
+    def upload_many(self):
+        fnames, _ = QFileDialog.getOpenFileNames(
+            self, 'Open CSVs or Archives', '',
+            'CSV Files and Archives (*.csv *.csv.gz *.csv.zst *.zip *.tar *.tgz *.tar.gz *.tar.bz2 *.tar.xz)')
+        if fnames:
+            self.upload_batch(fnames)
+
+    def upload_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, 'Select Folder of CSVs')
+        if not folder:
+            return
+        fnames = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith('.csv'))
+        if not fnames:
+            QMessageBox.warning(self, "Error", "No CSV files in that folder.")
+            return
+        self.upload_batch(fnames)
+
+    def upload_batch(self, fnames):
+        self.job_timer.stop()
+        self.batch_timer.stop()
+        self.polls.cancel()
+        self.status.setText(f"Uploading {len(fnames)} file(s)...")
+        self.sending(True)
+        self.uploads.submit(self.client.upload_files, fnames, on_result=self.batch_uploaded,
+                            on_error=self.upload_error, on_finished=lambda: self.sending(False))
+
+    def batch_uploaded(self, res):
+        if not res:
+            self.status.setText("Batch Upload Failed")
+            return
+
+        self.batch_list.clear()
+        self.batch_list.show()
+        self.batch_jobs = {}  # job id -> list row, for the jobs still being processed
+        for result in res['files']:
+            self.batch_list.addItem(self.batch_line(result['name'], result['job'], result.get('deduplicated'),
+                                                    result['deduplicated_from']))
+            if result['job']['status'] not in ('done', 'failed'):
+                self.batch_jobs[result['job']['id']] = (self.batch_list.count() - 1, result['name'])
+        self.batch_progress()
+        if self.batch_jobs:
+            self.batch_timer.start(500)
+
+    def batch_line(self, name, job, deduplicated=False, deduplicated_from=None):
+        if job['status'] == 'done':
+            if deduplicated_from:
+                note = f" (same data as upload #{deduplicated_from})"
             else:
-                self.status.setText("Upload Failed")
+                note = " (duplicate)" if deduplicated else ""
+            return f"{name}: upload #{job['upload']}, {job['rows_processed']} rows{note}"
+        if job['status'] == 'failed':
+            return f"{name}: failed - {job['error']}"
+        return f"{name}: processing... {job['progress'] * 100:.0f}%"
+
+    def poll_batch(self):
+        # The jobs are polled concurrently; the next round starts once all have answered
+        if self.polls.pending:
+            return
+        for job_id in self.batch_jobs:
+            self.polls.submit(self.client.get_job, job_id, on_result=self.batch_job_polled,
+                              on_finished=self.batch_polled)
+
+    def batch_job_polled(self, job):
+        if job is None or job['id'] not in self.batch_jobs:
+            return
+        row, name = self.batch_jobs[job['id']]
+        self.batch_list.item(row).setText(self.batch_line(name, job))
+        if job['status'] in ('done', 'failed'):
+            del self.batch_jobs[job['id']]
+
+    def batch_polled(self):
+        if self.polls.pending:
+            return
+        self.batch_progress()
+        if not self.batch_jobs:
+            self.batch_timer.stop()
+
+    def batch_progress(self):
+        total = self.batch_list.count()
+        if self.batch_jobs:
+            self.status.setText(f"Processing {len(self.batch_jobs)} of {total} file(s)...")
+        else:
+            self.status.setText(f"Batch finished: {total} file(s)")
 
 class UsersTab(QWidget):
     def __init__(self, client):
         super().__init__()
         self.client = client
+        self.requests = RequestGroup()
         layout = QVBoxLayout()
         
         self.table = QTableWidget()
@@ -341,7 +658,10 @@ class UsersTab(QWidget):
         self.load_users()
 
     def load_users(self):
-        users = self.client.get_users()
+        self.requests.cancel()
+        self.requests.submit(self.client.get_users, on_result=self.users_loaded)
+
+    def users_loaded(self, users):
         self.table.setRowCount(len(users))
         for i, u in enumerate(users):
             self.table.setItem(i, 0, QTableWidgetItem(str(u['id'])))
@@ -384,7 +704,7 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout()
         
         header = QHBoxLayout()
-        header.addWidget(QLabel("Logged in as User"))
+        header.addWidget(QLabel("Logged in as User (offline)" if self.client.offline else "Logged in as User"))
         
         self.theme_btn = QPushButton("Toggle Theme")
         self.theme_btn.setFixedSize(120, 30)
@@ -421,6 +741,7 @@ class MainWindow(QMainWindow):
         self.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     window = MainWindow()
@@ -0,0 +1,158 @@
+"""
+Table model for an upload's equipment rows.
+
+Rows are kept as one NumPy array per column rather than one item per cell, and
+QTableView asks the model only for the cells it paints, so memory and paint
+time do not grow with the number of cells. Pages arrive in the API's columnar
+layout and are copied into the arrays, which grow geometrically so loading N
+rows copies each one only a few times; QTableView calls ``fetchMore`` when the
+user scrolls near the end of the loaded rows.
+
+Sorting and filtering are done by the server (``ordering=`` and ``search=``),
+so they cover every row of the upload, not just the pages loaded so far:
+changing either drops the loaded rows and pages through the new order.
+"""
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+COLUMNS = [
+    ('equipment_name', 'Name'),
+    ('equipment_type', 'Type'),
+    ('flowrate', 'Flow'),
+    ('pressure', 'Press'),
+    ('temperature', 'Temp'),
+]
+FIELDS = [field for field, _ in COLUMNS]
+TEXT_FIELDS = ('equipment_name', 'equipment_type')
+INITIAL_CAPACITY = 1024  # rows; the arrays double from here as pages arrive
+
+
+class EquipmentTableModel(QAbstractTableModel):
+    """
+    ``fetch_page(cursor, query)`` is called to request the page after
+    ``cursor`` with the extra query parameters ``query`` (ordering, search);
+    it should answer, possibly later, with ``append_page(columns,
+    next_cursor, query)`` or ``page_failed(query)``. Answers for a query that
+    is no longer current are dropped.
+    """
+
+    def __init__(self, fetch_page=None, parent=None):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.clear()
+
+    def clear(self):
+        self.beginResetModel()
+        self.query = {}
+        self.sort_column, self.sort_order = None, Qt.AscendingOrder
+        self._reset_rows()
+        self.endResetModel()
+
+    def _reset_rows(self):
+        self.columns = {field: np.empty(INITIAL_CAPACITY, dtype=object if field in TEXT_FIELDS else 'float64')
+                        for field in FIELDS}
+        self.loaded = 0
+        self.next_cursor = None
+        self.loading = False
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field = FIELDS[index.column()]
+        if role == Qt.DisplayRole:
+            value = self.columns[field][index.row()]
+            return str(value) if field in TEXT_FIELDS else f"{value:g}"
+        if role == Qt.TextAlignmentRole and field not in TEXT_FIELDS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return COLUMNS[section][1] if orientation == Qt.Horizontal else str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and bool(self.next_cursor) and not self.loading and self.fetch_page is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._fetch(self.next_cursor)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # QTableView passes -1 to go back to the order the rows were uploaded in
+        self.sort_column = column if column >= 0 else None
+        self.sort_order = order
+        query = dict(self.query)
+        query.pop('ordering', None)
+        if self.sort_column is not None:
+            prefix = '-' if order == Qt.DescendingOrder else ''
+            query['ordering'] = prefix + FIELDS[self.sort_column]
+        self.requery(query)
+
+    # Loading and filtering
+
+    def set_filter(self, text):
+        """Show only rows whose name or type contains ``text`` (case-insensitive)."""
+        query = dict(self.query)
+        query.pop('search', None)
+        if text.strip():
+            query['search'] = text.strip()
+        self.requery(query)
+
+    def requery(self, query):
+        """Switch to ``query`` and reload, unless it is the current one."""
+        if query != self.query:
+            self.query = query
+            self.reload()
+
+    def reload(self):
+        """Drop the loaded rows and load the first page for the current query."""
+        self.beginResetModel()
+        self._reset_rows()
+        self.endResetModel()
+        if self.fetch_page is not None:
+            self._fetch(None)
+
+    def _fetch(self, cursor):
+        self.loading = True
+        self.fetch_page(cursor, dict(self.query))
+
+    def append_page(self, columns, next_cursor, query=None):
+        """Add a page in the API's columnar layout ({field: [values]})."""
+        if query is not None and query != self.query:
+            return
+        self.loading = False
+        self.next_cursor = next_cursor
+        count = len(columns.get(FIELDS[0], ()))
+        if not count:
+            return
+        start = self.loaded
+        self._reserve(start + count)
+        self.beginInsertRows(QModelIndex(), start, start + count - 1)
+        for field in FIELDS:
+            self.columns[field][start:start + count] = columns.get(field, ())
+        self.loaded = start + count
+        self.endInsertRows()
+
+    def page_failed(self, query=None):
+        if query is None or query == self.query:
+            self.loading = False
+
+    def _reserve(self, size):
+        """Grow the column arrays (doubling) to hold at least ``size`` rows."""
+        capacity = len(self.columns[FIELDS[0]])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for field, values in self.columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.loaded] = values[:self.loaded]
+            self.columns[field] = grown
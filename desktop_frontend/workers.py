@@ -0,0 +1,101 @@
+"""
+Background request layer for the desktop client.
+
+APIClient calls block, so widgets never make them on the GUI thread. They
+submit them to a RequestGroup instead, which runs each call as a QRunnable on
+the global QThreadPool and delivers the outcome back on the GUI thread through
+Qt signals. Calls in a group run concurrently.
+
+Cancelling a group (e.g. when the user picks another upload) drops the results
+of calls still in flight and sets the ``cancel`` event of calls that take one,
+such as uploads and report downloads, so they stop early.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Enough for a dashboard load (summary, chart, data) plus an upload and its polling
+QThreadPool.globalInstance().setMaxThreadCount(max(6, QThreadPool.globalInstance().maxThreadCount()))
+
+
+class WorkerSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    progress = pyqtSignal(object, object)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """
+    Runs ``fn(*args, **kwargs)`` on the thread pool.
+
+    With ``with_progress`` the call gets a ``callback`` that emits ``progress``;
+    with ``with_cancel`` it gets the worker's ``cancel`` event.
+    """
+
+    def __init__(self, fn, *args, with_progress=False, with_cancel=False, **kwargs):
+        super().__init__()
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.signals = WorkerSignals()
+        self.cancel = threading.Event()
+        if with_progress:
+            self.kwargs['callback'] = self.signals.progress.emit
+        if with_cancel:
+            self.kwargs['cancel'] = self.cancel
+        # The group keeps the Python object alive; Qt must not delete it under us
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            if self.cancel.is_set():
+                return
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except Exception as e:
+                if not self.cancel.is_set():
+                    self.signals.error.emit(e)
+                return
+            if not self.cancel.is_set():
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class RequestGroup:
+    """The in-flight requests of one view; see the module docstring."""
+
+    def __init__(self, pool=None):
+        self.pool = pool or QThreadPool.globalInstance()
+        # Every worker stays referenced until it finishes, cancelled or not:
+        # Qt would crash running a QRunnable whose Python object was collected
+        self.workers = set()
+
+    def submit(self, fn, *args, on_result=None, on_error=None, on_progress=None, on_finished=None, **kwargs):
+        worker = Worker(fn, *args, with_progress=on_progress is not None, **kwargs)
+        # Slots are only called while the worker is not cancelled, so a
+        # cancelled request can never update a view that has moved on
+        cancelled = worker.cancel.is_set
+        if on_result:
+            worker.signals.result.connect(lambda value: cancelled() or on_result(value))
+        if on_error:
+            worker.signals.error.connect(lambda e: cancelled() or on_error(e))
+        if on_progress:
+            worker.signals.progress.connect(lambda *values: cancelled() or on_progress(*values))
+        worker.signals.finished.connect(lambda: self._finished(worker, on_finished))
+        self.workers.add(worker)
+        self.pool.start(worker)
+        return worker
+
+    def _finished(self, worker, on_finished):
+        self.workers.discard(worker)
+        if on_finished and not worker.cancel.is_set():
+            on_finished()
+
+    @property
+    def pending(self):
+        """Requests submitted and neither finished nor cancelled."""
+        return sum(not worker.cancel.is_set() for worker in self.workers)
+
+    def cancel(self):
+        for worker in self.workers:
+            worker.cancel.set()
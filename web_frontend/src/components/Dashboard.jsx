@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import api from '../api';
 import { useTheme } from '../context/ThemeContext';
@@ -28,6 +28,9 @@ ChartJS.register(
     Filler
 );
 
+// New uploads fetched per history refresh before falling back to a full reload
+const HISTORY_DELTA_LIMIT = 500;
+
 const chartOptions = {
     responsive: true,
     maintainAspectRatio: false,
@@ -51,9 +54,13 @@ const chartOptions = {
 const Dashboard = () => {
     const [activeTab, setActiveTab] = useState('dashboard');
     const [history, setHistory] = useState([]);
+    const [historyCursor, setHistoryCursor] = useState(null);
+    const historyLatest = useRef(null);  // newest upload id listed; refreshes ask only for newer ones
     const [currentUpload, setCurrentUpload] = useState(null);
     const [stats, setStats] = useState(null);
     const [loading, setLoading] = useState(false);
+    const [uploadStatus, setUploadStatus] = useState('');
+    const [batchResults, setBatchResults] = useState([]);
     const [users, setUsers] = useState([]);
     const [user, setUser] = useState(null);
     const navigate = useNavigate();
@@ -75,16 +82,37 @@ const Dashboard = () => {
 
     const fetchHistory = async () => {
         try {
-            const res = await api.get('history/');
-            setHistory(res.data);
-            if (res.data.length > 0 && !currentUpload && activeTab === 'dashboard') {
-                // Optionally auto-load first, but kept manual for now
+            const since = historyLatest.current;
+            const res = await api.get('history/', { params: since !== null ? { since, limit: HISTORY_DELTA_LIMIT } : {} });
+            const { results, next_cursor, latest_id } = res.data;
+            if (since === null) {
+                setHistory(results);
+                setHistoryCursor(next_cursor);
+            } else if (next_cursor) {
+                // Too many new uploads to merge; start again from the first page
+                historyLatest.current = null;
+                return fetchHistory();
+            } else {
+                setHistory(prev => [...results, ...prev.filter(item => !results.some(r => r.id === item.id))]);
+            }
+            if (latest_id !== null) {
+                historyLatest.current = latest_id;
             }
         } catch (err) {
             console.error("Failed to fetch history", err);
         }
     };
 
+    const loadMoreHistory = async () => {
+        try {
+            const res = await api.get('history/', { params: { cursor: historyCursor } });
+            setHistory(prev => [...prev, ...res.data.results]);
+            setHistoryCursor(res.data.next_cursor);
+        } catch (err) {
+            console.error("Failed to fetch history", err);
+        }
+    };
+
     const handleLogout = () => {
         localStorage.removeItem('token');
         navigate('/login');
@@ -92,7 +120,11 @@ const Dashboard = () => {
     };
 
     const handleFileUpload = async (e) => {
-        const file = e.target.files[0];
+        const files = Array.from(e.target.files);
+        if (files.length > 1 || (files.length === 1 && !files[0].name.toLowerCase().endsWith('.csv'))) {
+            return handleBatchUpload(files);
+        }
+        const file = files[0];
         if (!file) return;
 
         const formData = new FormData();
@@ -103,26 +135,82 @@ const Dashboard = () => {
             const res = await api.post('upload/', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' },
             });
+            const job = await waitForJob(res.data.job);
+            if (job.status === 'failed') {
+                throw new Error(job.error);
+            }
             await fetchHistory();
             await loadDashboard(res.data.id);
             setActiveTab('dashboard');
         } catch (err) {
             console.error(err);
             alert(`Upload failed: ${err.response?.data?.error || err.message}`);
+        } finally {
+            setLoading(false);
+            setUploadStatus('');
+        }
+    };
+
+    // Several CSVs, a folder of them or zip/tar archives: one request, parsed in parallel on the server
+    const handleBatchUpload = async (files) => {
+        // Plain or gzip/zstd-compressed CSVs (decompressed while parsing) and zip/tar archives of them
+        const csvs = files.filter(f => /\.(csv|csv\.gz|csv\.zst|zip|tar|tgz|tar\.gz|tar\.bz2|tar\.xz)$/i.test(f.name));
+        if (csvs.length === 0) {
+            alert('No CSV files or archives selected.');
+            return;
+        }
+        const formData = new FormData();
+        csvs.forEach(f => formData.append('files', f));
+
+        setLoading(true);
+        setBatchResults([]);
+        try {
+            setUploadStatus(`Uploading ${csvs.length} file(s)...`);
+            const res = await api.post('upload/batch/', formData, {
+                headers: { 'Content-Type': 'multipart/form-data' },
+            });
+            let results = res.data.files;
+            setBatchResults(results);
+            results = await Promise.all(results.map(async (result, i) => {
+                const job = await waitForJob(result.job, `${i + 1}/${results.length} ${result.name}`);
+                const settled = { ...result, job };
+                setBatchResults(prev => prev.map((r, j) => (j === i ? settled : r)));
+                return settled;
+            }));
+            await fetchHistory();
+            const failed = results.filter(r => r.job.status === 'failed').length;
+            setUploadStatus(`${results.length - failed} of ${results.length} file(s) uploaded`);
+        } catch (err) {
+            console.error(err);
+            const detail = err.response?.data?.files || err.response?.data?.error || err.message;
+            alert(`Batch upload failed: ${detail}`);
+            setUploadStatus('');
         } finally {
             setLoading(false);
         }
     };
 
+    // The server ingests uploads in the background; poll the job until it settles.
+    const waitForJob = async (job, label = '') => {
+        while (job.status !== 'done' && job.status !== 'failed') {
+            setUploadStatus(`Processing${label && ` ${label}`}... ${Math.round(job.progress * 100)}% (${job.rows_processed} rows)`);
+            await new Promise(resolve => setTimeout(resolve, 500));
+            const res = await api.get(`jobs/${job.id}/`);
+            job = res.data;
+        }
+        return job;
+    };
+
     const loadDashboard = async (id) => {
         setLoading(true);
         try {
-            const [summaryRes, dataRes] = await Promise.all([
+            const [summaryRes, dataRes, chartRes] = await Promise.all([
                 api.get(`summary/${id}/`),
-                api.get(`data/${id}/`)
+                api.get(`data/${id}/`),
+                api.get(`chart/${id}/`)
             ]);
             setStats(summaryRes.data);
-            setCurrentUpload({ id, data: dataRes.data });
+            setCurrentUpload({ id, data: dataRes.data.results, nextCursor: dataRes.data.next_cursor, chart: chartRes.data });
             setActiveTab('dashboard');
         } catch (err) {
             console.error(err);
@@ -132,6 +220,21 @@ const Dashboard = () => {
         }
     };
 
+    // Data is cursor paginated; append the next page to the table on demand.
+    const loadMoreRows = async () => {
+        if (!currentUpload?.nextCursor) return;
+        try {
+            const res = await api.get(`data/${currentUpload.id}/`, { params: { cursor: currentUpload.nextCursor } });
+            setCurrentUpload(prev => ({
+                ...prev,
+                data: [...prev.data, ...res.data.results],
+                nextCursor: res.data.next_cursor,
+            }));
+        } catch (err) {
+            console.error("Failed to load more rows", err);
+        }
+    };
+
     const fetchUsers = async () => {
         try {
             const res = await api.get('users/');
@@ -149,9 +252,15 @@ const Dashboard = () => {
 
     const handleDownloadReport = async (uploadId) => {
         try {
-            const res = await api.get(`report/${uploadId}/`, {
-                responseType: 'blob',
-            });
+            // Reports are rendered in the background; 202 means "not ready yet".
+            // 'top' adds the Top-50 equipment table to the default summary.
+            const options = { responseType: 'blob', params: { detail: 'top' } };
+            let res = await api.get(`report/${uploadId}/`, options);
+            while (res.status === 202) {
+                const retryAfter = Number(res.headers['retry-after'] || 2);
+                await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+                res = await api.get(`report/${uploadId}/`, options);
+            }
             const url = window.URL.createObjectURL(new Blob([res.data]));
             const link = document.createElement('a');
             link.href = url;
@@ -167,26 +276,29 @@ const Dashboard = () => {
 
     const getChartData = () => {
         if (!currentUpload || !stats) return null;
-        const labels = currentUpload.data.map(d => d.equipment_name);
+        // Downsampled on the server: one point per bucket of rows, whatever the upload size
+        const { index, series } = currentUpload.chart;
         return {
             parameters: {
-                labels,
+                labels: index,
                 datasets: [
                     {
                         label: 'Flow (L/min)',
-                        data: currentUpload.data.map(d => d.flowrate),
+                        data: series.flowrate.mean,
                         borderColor: '#38bdf8',
                         backgroundColor: 'rgba(56, 189, 248, 0.1)',
                         borderWidth: 2,
+                        pointRadius: 0,
                         tension: 0.4,
                         fill: true,
                     },
                     {
                         label: 'Press (bar)',
-                        data: currentUpload.data.map(d => d.pressure),
+                        data: series.pressure.mean,
                         borderColor: '#f87171',
                         backgroundColor: 'rgba(248, 113, 113, 0.1)',
                         borderWidth: 2,
+                        pointRadius: 0,
                         tension: 0.4,
                         fill: true,
                     }
@@ -297,6 +409,11 @@ const Dashboard = () => {
                                             </tbody>
                                         </table>
                                     </div>
+                                    {currentUpload.nextCursor && (
+                                        <button className="btn-primary" style={{ marginTop: '1rem' }} onClick={loadMoreRows}>
+                                            Load More
+                                        </button>
+                                    )}
                                 </div>
                             </>
                         )}
@@ -333,6 +450,11 @@ const Dashboard = () => {
                                     ))}
                                 </tbody>
                             </table>
+                            {historyCursor && (
+                                <button className="btn-primary" style={{ marginTop: '1rem' }} onClick={loadMoreHistory}>
+                                    Load older uploads
+                                </button>
+                            )}
                         </div>
                     </div>
                 )}
@@ -342,12 +464,36 @@ const Dashboard = () => {
                     <div className="animate-fade-in glass-card" style={{ maxWidth: '600px', margin: '0 auto', textAlign: 'center', padding: '3rem' }}>
                         <h2 style={{ fontSize: '2rem', marginBottom: '1rem' }}>Upload Data</h2>
                         <label className="upload-zone" style={{ display: 'block', padding: '4rem' }}>
-                            <input type="file" accept=".csv" hidden onChange={handleFileUpload} />
+                            <input type="file" accept=".csv,.zip,.tar,.tgz,.gz,.zst,.bz2,.xz" multiple hidden onChange={handleFileUpload} />
                             <div style={{ fontSize: '3rem', marginBottom: '1rem' }}>☁️</div>
                             <div style={{ fontWeight: 600, fontSize: '1.2rem', color: 'var(--accent)' }}>
-                                {loading ? 'Processing...' : 'Click to Select CSV File'}
+                                {loading ? (uploadStatus || 'Uploading...') : 'Click to Select CSV File(s) or Archives'}
                             </div>
                         </label>
+                        <label className="btn-primary" style={{ display: 'inline-block', marginTop: '1rem', cursor: 'pointer' }}>
+                            <input type="file" webkitdirectory="" directory="" multiple hidden onChange={handleFileUpload} />
+                            Upload a Folder
+                        </label>
+                        {!loading && uploadStatus && <p style={{ marginTop: '1rem' }}>{uploadStatus}</p>}
+                        {batchResults.length > 0 && (
+                            <div className="table-container" style={{ marginTop: '1.5rem', textAlign: 'left' }}>
+                                <table>
+                                    <thead>
+                                        <tr><th>File</th><th>Status</th><th>Upload</th><th>Rows</th></tr>
+                                    </thead>
+                                    <tbody>
+                                        {batchResults.map((r, i) => (
+                                            <tr key={i}>
+                                                <td>{r.name}</td>
+                                                <td>{r.job.status === 'failed' ? `failed: ${r.job.error}` : r.job.status}{r.deduplicated ? ' (duplicate)' : ''}</td>
+                                                <td>{r.job.upload ? `#${r.job.upload}` : '-'}</td>
+                                                <td>{r.job.rows_processed}</td>
+                                            </tr>
+                                        ))}
+                                    </tbody>
+                                </table>
+                            </div>
+                        )}
                     </div>
                 )}
 